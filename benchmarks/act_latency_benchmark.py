@@ -0,0 +1,202 @@
+"""
+Per-call latency benchmark for ``Policy.act_inference``.
+
+Times ``act`` under ``torch.no_grad`` against ``act_inference`` (eager, with
+preallocated outputs, and with a scripted or compiled policy net when the
+net supports it) for the policies of ``policies/`` and
+``PointNavBaselinePolicy`` at several batch sizes.
+
+Usage:
+    python -m benchmarks.act_latency_benchmark --policies Baseline DRRN \
+        --batch-sizes 1 4 16 64
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+import torch
+from gym import spaces
+
+from config.config import MAP_DIMENSIONS, MID_LEVEL_DIMENSIONS
+from habitat.tasks.nav.nav import IntegratedPointGoalGPSAndCompassSensor
+from policies.get_policy import get_current_policy_object
+
+
+def policy_observation_space(resolution):
+    r"""Union of the sensors read by the policies, every policy picks the
+    ones it uses.
+    """
+    return spaces.Dict(
+        {
+            "rgb": spaces.Box(
+                low=0,
+                high=255,
+                shape=(resolution, resolution, 3),
+                dtype=np.uint8,
+            ),
+            "depth": spaces.Box(
+                low=0,
+                high=1,
+                shape=(resolution, resolution, 1),
+                dtype=np.float32,
+            ),
+            "map": spaces.Box(
+                low=0,
+                high=1,
+                shape=MAP_DIMENSIONS[1:] + MAP_DIMENSIONS[:1],
+                dtype=np.float32,
+            ),
+            "midlevel": spaces.Box(
+                low=0, high=1, shape=MID_LEVEL_DIMENSIONS, dtype=np.float32
+            ),
+            "midlevel_map": spaces.Box(
+                low=0, high=1, shape=MAP_DIMENSIONS, dtype=np.float32
+            ),
+            IntegratedPointGoalGPSAndCompassSensor.cls_uuid: spaces.Box(
+                low=-1, high=1, shape=(2,), dtype=np.float32
+            ),
+        }
+    )
+
+
+def _inputs(policy, observation_space, batch_size, device):
+    observations = {
+        sensor: torch.rand((batch_size,) + space.shape, device=device)
+        * float(space.high.max())
+        for sensor, space in observation_space.spaces.items()
+    }
+    hidden_states = torch.zeros(
+        policy.net.num_recurrent_layers,
+        batch_size,
+        policy.net.output_size,
+        device=device,
+    )
+    prev_actions = torch.zeros(batch_size, 1, dtype=torch.long, device=device)
+    masks = torch.ones(batch_size, 1, device=device)
+    return observations, hidden_states, prev_actions, masks
+
+
+def _time(fn, device, repeats):
+    for _ in range(3):
+        fn()
+    if device.type == "cuda":
+        torch.cuda.synchronize()
+    t_start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    if device.type == "cuda":
+        torch.cuda.synchronize()
+    return (time.perf_counter() - t_start) / repeats
+
+
+def measure(policy_name, batch_size, resolution, device, repeats, compile_net):
+    r"""Returns the seconds per call of every act variant."""
+    observation_space = policy_observation_space(resolution)
+    policy = get_current_policy_object(policy_name)(
+        observation_space=observation_space,
+        action_space=spaces.Discrete(3),
+        hidden_size=512,
+    )
+    policy.to(device)
+    policy.eval()
+    inputs = _inputs(policy, observation_space, batch_size, device)
+    out = (
+        torch.zeros(batch_size, 1, device=device),
+        torch.zeros(batch_size, 1, dtype=torch.long, device=device),
+        torch.zeros(batch_size, 1, device=device),
+    )
+
+    def act():
+        with torch.no_grad():
+            policy.act(*inputs)
+
+    result = dict(policy=policy_name, batch_size=batch_size)
+    result["act_seconds"] = _time(act, device, repeats)
+    result["inference_seconds"] = _time(
+        lambda: policy.act_inference(*inputs), device, repeats
+    )
+    result["inference_out_seconds"] = _time(
+        lambda: policy.act_inference(*inputs, out=out), device, repeats
+    )
+
+    result["inference_{}_seconds".format(compile_net)] = None
+    try:
+        if compile_net == "script":
+            policy.set_inference_net(torch.jit.script(policy.net))
+        else:
+            policy.set_inference_net(torch.compile(policy.net))
+        result["inference_{}_seconds".format(compile_net)] = _time(
+            lambda: policy.act_inference(*inputs, out=out), device, repeats
+        )
+    except Exception as e:
+        print(
+            "{}: could not {} the net: {}".format(policy_name, compile_net, e)
+        )
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--policies",
+        type=str,
+        nargs="+",
+        default=["Baseline", "BaselineMidLevel", "DRRN", "DRRNActualMap"],
+    )
+    parser.add_argument(
+        "--batch-sizes", type=int, nargs="+", default=[1, 4, 16, 64]
+    )
+    parser.add_argument("--resolution", type=int, default=256)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument(
+        "--compile-net",
+        type=str,
+        default="script",
+        choices=["script", "compile"],
+    )
+    parser.add_argument("--device", type=str, default="cpu")
+    parser.add_argument("--output", type=str, default=None)
+    args = parser.parse_args()
+    device = torch.device(args.device)
+
+    results = []
+    compiled_key = "inference_{}_seconds".format(args.compile_net)
+    print(
+        "{:>16} {:>6} {:>10} {:>10} {:>10} {:>10}".format(
+            "policy", "batch", "act", "inference", "+out", args.compile_net
+        )
+    )
+    for policy_name in args.policies:
+        for batch_size in args.batch_sizes:
+            result = measure(
+                policy_name,
+                batch_size,
+                args.resolution,
+                device,
+                args.repeats,
+                args.compile_net,
+            )
+            results.append(result)
+            compiled = result[compiled_key]
+            print(
+                "{:>16} {:>6} {:>8.2f}ms {:>8.2f}ms {:>8.2f}ms {:>10}".format(
+                    policy_name,
+                    batch_size,
+                    result["act_seconds"] * 1000,
+                    result["inference_seconds"] * 1000,
+                    result["inference_out_seconds"] * 1000,
+                    "-"
+                    if compiled is None
+                    else "{:.2f}ms".format(compiled * 1000),
+                )
+            )
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
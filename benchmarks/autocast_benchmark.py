@@ -0,0 +1,147 @@
+"""
+Benchmark and validation of the autocast mode of ``PPO.update``.
+
+Runs the same short sequence of PPO updates on a fixed random rollout once in
+fp32 and once per autocast mode, starting from the same weights, and reports
+the seconds per update and the loss curves of every mode with their largest
+relative difference to the fp32 curve.
+
+Usage:
+    python -m benchmarks.autocast_benchmark --policy DRRN --modes bf16
+"""
+
+import argparse
+import json
+import time
+
+import torch
+from gym import spaces
+
+from benchmarks.act_latency_benchmark import policy_observation_space
+from habitat_baselines.common.rollout_storage import RolloutStorage
+from habitat_baselines.rl.ppo import PPO
+from policies.get_policy import get_current_policy_object
+
+
+def _filled_rollouts(policy, observation_space, num_steps, num_envs, device):
+    rollouts = RolloutStorage(
+        num_steps,
+        num_envs,
+        observation_space,
+        spaces.Discrete(3),
+        policy.net.output_size,
+        num_recurrent_layers=policy.net.num_recurrent_layers,
+    )
+    rollouts.to(device)
+    for sensor, observation in rollouts.observations.items():
+        high = float(observation_space.spaces[sensor].high.max())
+        observation.copy_(torch.rand(observation.shape) * high)
+    rollouts.actions.random_(0, 3)
+    rollouts.prev_actions.random_(0, 3)
+    rollouts.action_log_probs.fill_(-1.0986)
+    rollouts.value_preds.normal_()
+    rollouts.returns.normal_()
+    rollouts.masks.bernoulli_(0.99)
+    rollouts.step = num_steps
+    return rollouts
+
+
+def measure(args, autocast, device):
+    r"""Returns the seconds per update and the losses of every update."""
+    observation_space = policy_observation_space(args.resolution)
+    torch.manual_seed(0)
+    policy = get_current_policy_object(args.policy)(
+        observation_space=observation_space,
+        action_space=spaces.Discrete(3),
+        hidden_size=args.hidden_size,
+    )
+    policy.to(device)
+    agent = PPO(
+        actor_critic=policy,
+        clip_param=0.1,
+        ppo_epoch=args.ppo_epoch,
+        num_mini_batch=args.num_mini_batch,
+        value_loss_coef=0.5,
+        entropy_coef=0.01,
+        lr=2.5e-4,
+        eps=1e-5,
+        max_grad_norm=0.5,
+        autocast=autocast,
+    )
+    torch.manual_seed(1)
+    rollouts = _filled_rollouts(
+        policy, observation_space, args.num_steps, args.num_envs, device
+    )
+
+    losses = []
+    update_time = 0.0
+    for _ in range(args.num_updates):
+        # same minibatches in every mode
+        torch.manual_seed(2)
+        t_start = time.perf_counter()
+        value_loss, action_loss, _ = agent.update(rollouts)
+        if device.type == "cuda":
+            torch.cuda.synchronize()
+        update_time += time.perf_counter() - t_start
+        losses.append(value_loss * agent.value_loss_coef + action_loss)
+    return update_time / args.num_updates, losses
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--policy", type=str, default="DRRN")
+    parser.add_argument("--modes", type=str, nargs="+", default=["bf16"])
+    parser.add_argument("--num-steps", type=int, default=32)
+    parser.add_argument("--num-envs", type=int, default=4)
+    parser.add_argument("--num-updates", type=int, default=10)
+    parser.add_argument("--num-mini-batch", type=int, default=2)
+    parser.add_argument("--ppo-epoch", type=int, default=2)
+    parser.add_argument("--hidden-size", type=int, default=512)
+    parser.add_argument("--resolution", type=int, default=64)
+    parser.add_argument("--device", type=str, default="cpu")
+    parser.add_argument("--output", type=str, default=None)
+    args = parser.parse_args()
+    device = torch.device(args.device)
+
+    fp32_time, fp32_losses = measure(args, "", device)
+    results = [
+        dict(mode="fp32", seconds_per_update=fp32_time, losses=fp32_losses)
+    ]
+    print(
+        "{:>6} {:>12} {:>8} {:>14}".format(
+            "mode", "update s", "speedup", "max rel diff"
+        )
+    )
+    print(
+        "{:>6} {:>12.3f} {:>8.2f} {:>14}".format("fp32", fp32_time, 1.0, "-")
+    )
+    for mode in args.modes:
+        mode_time, mode_losses = measure(args, mode, device)
+        max_relative_difference = max(
+            abs(loss - reference) / max(abs(reference), 1e-8)
+            for loss, reference in zip(mode_losses, fp32_losses)
+        )
+        results.append(
+            dict(
+                mode=mode,
+                seconds_per_update=mode_time,
+                losses=mode_losses,
+                max_relative_difference=max_relative_difference,
+            )
+        )
+        print(
+            "{:>6} {:>12.3f} {:>8.2f} {:>14.4f}".format(
+                mode,
+                mode_time,
+                fp32_time / mode_time,
+                max_relative_difference,
+            )
+        )
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Microbenchmark for writing env observations into ``RolloutStorage``.
+
+Compares the trainer's previous path, ``batch_obs`` followed by a copy into
+the rollout slot, with ``RolloutStorage.insert_observations`` writing the
+per-env observations straight into the slot. Reports the bytes allocated by
+torch and the wall time per step.
+
+Usage:
+    python -m benchmarks.batch_obs_benchmark --env-counts 1 8 16 --sizes 256
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+import torch
+from gym import spaces
+from torch.autograd.profiler import profile
+
+from habitat_baselines.common.rollout_storage import RolloutStorage
+from habitat_baselines.common.utils import batch_obs
+
+
+def _observation_space(size):
+    return spaces.Dict(
+        {
+            "rgb": spaces.Box(
+                low=0, high=255, shape=(size, size, 3), dtype=np.uint8
+            ),
+            "map": spaces.Box(
+                low=0, high=1, shape=(2, size, size), dtype=np.float32
+            ),
+            "egomotion": spaces.Box(
+                low=np.finfo(np.float32).min,
+                high=np.finfo(np.float32).max,
+                shape=(1, 1, 3),
+                dtype=np.float32,
+            ),
+        }
+    )
+
+
+def _observations(observation_space, num_envs):
+    return [
+        {
+            sensor: space.sample()
+            for sensor, space in observation_space.spaces.items()
+        }
+        for _ in range(num_envs)
+    ]
+
+
+def _batch_obs_step(rollouts, observations, device):
+    batch = batch_obs(observations, device=device)
+    rollouts.set_observations(1, batch)
+
+
+def _insert_observations_step(rollouts, observations, device):
+    rollouts.insert_observations(1, observations)
+
+
+def measure(step_fn, num_envs, size, num_steps, device):
+    r"""Returns bytes allocated and mean seconds per step for ``step_fn``."""
+    observation_space = _observation_space(size)
+    rollouts = RolloutStorage(
+        1,
+        num_envs,
+        observation_space,
+        spaces.Box(low=0, high=1, shape=(1,), dtype=np.float32),
+        8,
+    )
+    rollouts.to(device)
+    observations = _observations(observation_space, num_envs)
+
+    # warm up so that lazily created buffers are not counted
+    step_fn(rollouts, observations, device)
+
+    with profile(profile_memory=True) as prof:
+        step_fn(rollouts, observations, device)
+    allocated_bytes = sum(
+        max(event.self_cpu_memory_usage, 0)
+        + max(getattr(event, "self_cuda_memory_usage", 0), 0)
+        for event in prof.function_events
+    )
+
+    if device.type == "cuda":
+        torch.cuda.synchronize()
+    t_start = time.perf_counter()
+    for _ in range(num_steps):
+        step_fn(rollouts, observations, device)
+    if device.type == "cuda":
+        torch.cuda.synchronize()
+    return allocated_bytes, (time.perf_counter() - t_start) / num_steps
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--env-counts", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[64, 256])
+    parser.add_argument("--num-steps", type=int, default=50)
+    parser.add_argument("--device", type=str, default="cpu")
+    parser.add_argument("--output", type=str, default=None)
+    args = parser.parse_args()
+    device = torch.device(args.device)
+
+    results = []
+    print(
+        "{:>6} {:>6} {:>14} {:>14} {:>12} {:>12}".format(
+            "envs", "size", "batch KB/step", "direct KB/step", "batch ms",
+            "direct ms",
+        )
+    )
+    for num_envs in args.env_counts:
+        for size in args.sizes:
+            batch_bytes, batch_time = measure(
+                _batch_obs_step, num_envs, size, args.num_steps, device
+            )
+            direct_bytes, direct_time = measure(
+                _insert_observations_step, num_envs, size, args.num_steps,
+                device,
+            )
+            result = dict(
+                num_envs=num_envs,
+                size=size,
+                batch_obs_bytes_per_step=batch_bytes,
+                insert_observations_bytes_per_step=direct_bytes,
+                batch_obs_seconds_per_step=batch_time,
+                insert_observations_seconds_per_step=direct_time,
+            )
+            results.append(result)
+            print(
+                "{:>6} {:>6} {:>14.1f} {:>14.1f} {:>12.3f} {:>12.3f}".format(
+                    num_envs,
+                    size,
+                    batch_bytes / 1024,
+                    direct_bytes / 1024,
+                    batch_time * 1000,
+                    direct_time * 1000,
+                )
+            )
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Scaling benchmark for ``DDPPOTrainer``.
+
+Launches several local ranks over the gloo backend, each one driving its own
+``VectorEnv`` of ``DummyRLEnv`` workers (optionally with randomly slow steps)
+and its own copy of a ``DummyPolicy``. Every rank collects preemptible
+rollouts and runs DD-PPO updates with gradients all-reduced over the ranks.
+Reports the total steps per second and the scaling efficiency relative to a
+single rank.
+
+Usage:
+    python -m benchmarks.ddppo_scaling_benchmark --world-sizes 1 2 4
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import torch
+import torch.distributed as distrib
+import torch.multiprocessing as mp
+
+from benchmarks.dummy_env import make_dummy_env
+from benchmarks.dummy_policy import DummyPolicy
+from habitat import VectorEnv
+from habitat_baselines.common.rollout_storage import RolloutStorage
+from habitat_baselines.config.default import get_config
+from habitat_baselines.rl.ddppo.algo.ddp_utils import init_distrib
+from habitat_baselines.rl.ddppo.algo.ddppo import DDPPO
+from habitat_baselines.rl.ddppo.algo.ddppo_trainer import DDPPOTrainer
+
+OBSERVATION_SHAPES = {
+    "rgb": ((64, 64, 3), np.uint8),
+    "map": ((2, 32, 32), np.float32),
+}
+
+
+def _run_rank(rank, world_size, port, args, results):
+    os.environ.update(
+        MASTER_ADDR="127.0.0.1",
+        MASTER_PORT=str(port),
+        RANK=str(rank),
+        LOCAL_RANK=str(rank),
+        WORLD_SIZE=str(world_size),
+    )
+    torch.set_num_threads(1)
+    _, tcp_store = init_distrib("gloo")
+    num_rollouts_done_store = distrib.PrefixStore(
+        "rollout_tracker", tcp_store
+    )
+    num_rollouts_done_store.set("num_done", "0")
+
+    config = get_config()
+    config.defrost()
+    config.RL.PPO.num_steps = args.num_steps
+    config.RL.PPO.num_mini_batch = min(
+        config.RL.PPO.num_mini_batch, args.num_envs
+    )
+    config.RL.DDPPO.sync_frac = args.sync_frac
+    config.freeze()
+    ppo_cfg = config.RL.PPO
+
+    env_fn_args = tuple(
+        (
+            OBSERVATION_SHAPES,
+            args.step_delay,
+            rank * args.num_envs + index,
+            args.straggler_prob,
+            args.straggler_delay,
+        )
+        for index in range(args.num_envs)
+    )
+    with VectorEnv(
+        make_env_fn=make_dummy_env, env_fn_args=env_fn_args
+    ) as envs:
+        trainer = DDPPOTrainer(config)
+        trainer.envs = envs
+        trainer.device = torch.device("cpu")
+        trainer.world_rank = rank
+        trainer.world_size = world_size
+        trainer.actor_critic = DummyPolicy(
+            envs.observation_spaces[0], hidden_size=args.hidden_size
+        )
+        trainer.agent = DDPPO(
+            actor_critic=trainer.actor_critic,
+            clip_param=ppo_cfg.clip_param,
+            ppo_epoch=ppo_cfg.ppo_epoch,
+            num_mini_batch=ppo_cfg.num_mini_batch,
+            value_loss_coef=ppo_cfg.value_loss_coef,
+            entropy_coef=ppo_cfg.entropy_coef,
+            lr=ppo_cfg.lr,
+            eps=ppo_cfg.eps,
+            max_grad_norm=ppo_cfg.max_grad_norm,
+            use_normalized_advantage=ppo_cfg.use_normalized_advantage,
+        )
+        trainer.agent.init_distributed()
+
+        rollouts = RolloutStorage(
+            ppo_cfg.num_steps,
+            args.num_envs,
+            envs.observation_spaces[0],
+            envs.action_spaces[0],
+            args.hidden_size,
+        )
+        rollouts.insert_observations(0, envs.reset())
+        current_episode_reward = torch.zeros(args.num_envs, 1)
+        running_episode_stats = dict(
+            count=torch.zeros(args.num_envs, 1),
+            reward=torch.zeros(args.num_envs, 1),
+        )
+
+        count_steps = 0
+        distrib.barrier()
+        t_start = time.time()
+        for _ in range(args.num_updates):
+            _, _, delta_steps = trainer._collect_rollout_preemptible(
+                ppo_cfg,
+                rollouts,
+                current_episode_reward,
+                running_episode_stats,
+                num_rollouts_done_store,
+            )
+            trainer._update_agent(ppo_cfg, rollouts)
+
+            steps = torch.tensor([delta_steps], dtype=torch.float)
+            distrib.all_reduce(steps)
+            count_steps += int(steps.item())
+            if rank == 0:
+                num_rollouts_done_store.set("num_done", "0")
+        elapsed = time.time() - t_start
+
+    if rank == 0:
+        results.put(count_steps / elapsed)
+    distrib.barrier()
+    distrib.destroy_process_group()
+
+
+def measure(world_size, port, args):
+    r"""Returns the total steps per second of ``world_size`` local ranks."""
+    ctx = mp.get_context("spawn")
+    results = ctx.SimpleQueue()
+    mp.spawn(
+        _run_rank, args=(world_size, port, args, results), nprocs=world_size
+    )
+    return results.get()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--world-sizes", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--num-envs", type=int, default=4)
+    parser.add_argument("--num-steps", type=int, default=64)
+    parser.add_argument("--num-updates", type=int, default=5)
+    parser.add_argument("--hidden-size", type=int, default=256)
+    parser.add_argument("--step-delay", type=float, default=0.005)
+    parser.add_argument("--straggler-prob", type=float, default=0.0)
+    parser.add_argument("--straggler-delay", type=float, default=0.1)
+    parser.add_argument("--sync-frac", type=float, default=0.6)
+    parser.add_argument("--port", type=int, default=8738)
+    parser.add_argument("--output", type=str, default=None)
+    args = parser.parse_args()
+
+    results = []
+    print("{:>6} {:>12} {:>11}".format("ranks", "sps", "efficiency"))
+    single_rank_sps = None
+    for index, world_size in enumerate(args.world_sizes):
+        sps = measure(world_size, args.port + index, args)
+        if single_rank_sps is None:
+            single_rank_sps = sps / world_size
+        efficiency = sps / (world_size * single_rank_sps)
+        results.append(
+            dict(world_size=world_size, sps=sps, efficiency=efficiency)
+        )
+        print("{:>6} {:>12.1f} {:>11.1%}".format(world_size, sps, efficiency))
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Benchmark for the double-buffered rollout collection of ``PPOTrainer``.
+
+Collects rollouts from ``DummyRLEnv`` workers with a fixed simulation delay
+using a ``DummyPolicy`` of configurable cost, once with the lockstep
+``_collect_rollout_step`` loop and once with
+``_collect_rollout_double_buffered``, and reports steps per second and the
+share of inference time that overlapped with simulation.
+
+Usage:
+    python -m benchmarks.double_buffered_benchmark --env-counts 4 8 16
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+import torch
+
+from benchmarks.dummy_env import make_dummy_env
+from benchmarks.dummy_policy import DummyPolicy
+from habitat import Config, VectorEnv
+from habitat_baselines.common.rollout_storage import RolloutStorage
+from habitat_baselines.rl.ppo.ppo_trainer import PPOTrainer
+
+OBSERVATION_SHAPES = {
+    "rgb": ((128, 128, 3), np.uint8),
+    "map": ((2, 64, 64), np.float32),
+}
+
+
+def measure(num_envs, num_steps, num_updates, step_delay, hidden_size, mode):
+    r"""Returns steps per second, pth-time, env-time and overlapped
+    pth-time of ``num_updates`` rollouts collected with ``mode``.
+    """
+    env_fn_args = tuple(
+        (OBSERVATION_SHAPES, step_delay, rank) for rank in range(num_envs)
+    )
+    with VectorEnv(
+        make_env_fn=make_dummy_env, env_fn_args=env_fn_args
+    ) as envs:
+        trainer = PPOTrainer(Config())
+        trainer.envs = envs
+        trainer.device = torch.device("cpu")
+        trainer.actor_critic = DummyPolicy(
+            envs.observation_spaces[0], hidden_size=hidden_size
+        )
+        rollouts = RolloutStorage(
+            num_steps,
+            num_envs,
+            envs.observation_spaces[0],
+            envs.action_spaces[0],
+            hidden_size,
+        )
+        rollouts.insert_observations(0, envs.reset())
+        current_episode_reward = torch.zeros(num_envs, 1)
+        running_episode_stats = dict(
+            count=torch.zeros(num_envs, 1), reward=torch.zeros(num_envs, 1)
+        )
+
+        pth_time = 0.0
+        env_time = 0.0
+        overlap_time = 0.0
+        count_steps = 0
+        t_start = time.time()
+        for _ in range(num_updates):
+            if mode == "double_buffered":
+                (
+                    delta_pth_time,
+                    delta_env_time,
+                    delta_steps,
+                    delta_overlap_time,
+                ) = trainer._collect_rollout_double_buffered(
+                    rollouts, current_episode_reward, running_episode_stats
+                )
+                overlap_time += delta_overlap_time
+            else:
+                delta_pth_time, delta_env_time, delta_steps = 0.0, 0.0, 0
+                for _ in range(num_steps):
+                    step_stats = trainer._collect_rollout_step(
+                        rollouts, current_episode_reward, running_episode_stats
+                    )
+                    delta_pth_time += step_stats[0]
+                    delta_env_time += step_stats[1]
+                    delta_steps += step_stats[2]
+            pth_time += delta_pth_time
+            env_time += delta_env_time
+            count_steps += delta_steps
+            rollouts.after_update()
+
+        return dict(
+            sps=count_steps / (time.time() - t_start),
+            pth_time=pth_time,
+            env_time=env_time,
+            overlap_time=overlap_time,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--env-counts", type=int, nargs="+", default=[2, 8, 16])
+    parser.add_argument("--num-steps", type=int, default=32)
+    parser.add_argument("--num-updates", type=int, default=4)
+    parser.add_argument("--step-delay", type=float, default=0.01)
+    parser.add_argument("--hidden-size", type=int, default=1024)
+    parser.add_argument("--output", type=str, default=None)
+    args = parser.parse_args()
+
+    results = []
+    print(
+        "{:>6} {:>12} {:>12} {:>8} {:>10}".format(
+            "envs", "lockstep sps", "double sps", "speedup", "overlap"
+        )
+    )
+    for num_envs in args.env_counts:
+        lockstep = measure(
+            num_envs,
+            args.num_steps,
+            args.num_updates,
+            args.step_delay,
+            args.hidden_size,
+            "lockstep",
+        )
+        double_buffered = measure(
+            num_envs,
+            args.num_steps,
+            args.num_updates,
+            args.step_delay,
+            args.hidden_size,
+            "double_buffered",
+        )
+        results.append(
+            dict(
+                num_envs=num_envs,
+                lockstep=lockstep,
+                double_buffered=double_buffered,
+            )
+        )
+        print(
+            "{:>6} {:>12.1f} {:>12.1f} {:>8.2f} {:>10.1%}".format(
+                num_envs,
+                lockstep["sps"],
+                double_buffered["sps"],
+                double_buffered["sps"] / lockstep["sps"],
+                double_buffered["overlap_time"]
+                / max(double_buffered["pth_time"], 1e-9),
+            )
+        )
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
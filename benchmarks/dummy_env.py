@@ -0,0 +1,98 @@
+"""
+Minimal stand-in environments used by the benchmarks to exercise
+``habitat.VectorEnv`` without a simulator or scene data.
+"""
+
+import time
+
+import gym
+import numpy as np
+from gym import spaces
+
+from habitat.core.spaces import ActionSpace, EmptySpace
+
+
+class DummyRLEnv(gym.Env):
+    r"""Returns fixed-size random observations and never ends an episode on
+    its own.
+
+    Args:
+        observation_shapes: dict of sensor uuid to (shape, dtype).
+        step_delay: seconds spent "simulating" in every step.
+        episode_length: steps after which ``done`` is returned.
+        seed: seed of the observation generator.
+        straggler_prob: probability of a step being slow, standing in for
+            scene loads or map rebuilds.
+        straggler_delay: extra seconds spent in a slow step.
+    """
+
+    def __init__(
+        self,
+        observation_shapes,
+        step_delay=0.0,
+        episode_length=500,
+        seed=0,
+        straggler_prob=0.0,
+        straggler_delay=0.0,
+    ):
+        self.observation_space = spaces.Dict(
+            {
+                uuid: spaces.Box(
+                    low=0,
+                    high=255 if np.dtype(dtype) == np.uint8 else 1,
+                    shape=shape,
+                    dtype=dtype,
+                )
+                for uuid, (shape, dtype) in observation_shapes.items()
+            }
+        )
+        self.action_space = ActionSpace(
+            {
+                action: EmptySpace()
+                for action in ("MOVE_FORWARD", "TURN_LEFT", "TURN_RIGHT")
+            }
+        )
+        self.number_of_episodes = 1
+        self._step_delay = step_delay
+        self._straggler_prob = straggler_prob
+        self._straggler_delay = straggler_delay
+        self._episode_length = episode_length
+        self._rng = np.random.RandomState(seed)
+        self._observations = {
+            uuid: self._rng.randint(0, 2, size=shape).astype(dtype)
+            for uuid, (shape, dtype) in observation_shapes.items()
+        }
+        self._elapsed_steps = 0
+
+    def reset(self):
+        self._elapsed_steps = 0
+        return dict(self._observations)
+
+    def step(self, action):
+        if self._step_delay > 0:
+            time.sleep(self._step_delay)
+        if self._rng.random_sample() < self._straggler_prob:
+            time.sleep(self._straggler_delay)
+        self._elapsed_steps += 1
+        done = self._elapsed_steps >= self._episode_length
+        return dict(self._observations), 0.0, done, {}
+
+    def close(self):
+        pass
+
+
+def make_dummy_env(
+    observation_shapes,
+    step_delay=0.0,
+    seed=0,
+    straggler_prob=0.0,
+    straggler_delay=0.0,
+):
+    r"""Picklable env constructor to pass to ``habitat.VectorEnv``."""
+    return DummyRLEnv(
+        observation_shapes,
+        step_delay=step_delay,
+        seed=seed,
+        straggler_prob=straggler_prob,
+        straggler_delay=straggler_delay,
+    )
@@ -0,0 +1,87 @@
+"""
+Stand-in policy used by the benchmarks to put a configurable amount of
+inference work on the trainer side without loading a real model.
+"""
+
+import numpy as np
+import torch
+from torch import nn
+
+from habitat_baselines.common.utils import CategoricalNet
+
+
+class DummyPolicy(nn.Module):
+    r"""Runs an MLP over the flattened observations followed by a
+    categorical action head and a value head, following the ``act``,
+    ``get_value`` and ``evaluate_actions`` interface of
+    :ref:`habitat_baselines.rl.ppo.policy.Policy` without a recurrent state.
+
+    Args:
+        observation_space: gym Dict space of the env observations.
+        num_actions: number of discrete actions.
+        hidden_size: width of the MLP, controls the inference cost.
+        num_layers: depth of the MLP.
+    """
+
+    def __init__(
+        self, observation_space, num_actions=3, hidden_size=512, num_layers=4
+    ):
+        super().__init__()
+        input_size = sum(
+            int(np.prod(space.shape))
+            for space in observation_space.spaces.values()
+        )
+        layers = [nn.Linear(input_size, hidden_size), nn.ReLU()]
+        for _ in range(num_layers - 1):
+            layers += [nn.Linear(hidden_size, hidden_size), nn.ReLU()]
+        self.mlp = nn.Sequential(*layers)
+        self.action_distribution = CategoricalNet(hidden_size, num_actions)
+        self.value = nn.Linear(hidden_size, 1)
+        self.num_actions = num_actions
+        self.hidden_size = hidden_size
+
+    def _features(self, observations):
+        features = torch.cat(
+            [
+                observations[sensor].flatten(1)
+                for sensor in sorted(observations)
+            ],
+            dim=1,
+        )
+        return self.mlp(features)
+
+    def act(
+        self,
+        observations,
+        rnn_hidden_states,
+        prev_actions,
+        masks,
+        deterministic=False,
+    ):
+        features = self._features(observations)
+        distribution = self.action_distribution(features)
+        if deterministic:
+            actions = distribution.mode()
+        else:
+            actions = distribution.sample()
+        return (
+            self.value(features),
+            actions,
+            distribution.log_probs(actions),
+            rnn_hidden_states,
+        )
+
+    def get_value(self, observations, rnn_hidden_states, prev_actions, masks):
+        return self.value(self._features(observations))
+
+    def evaluate_actions(
+        self, observations, rnn_hidden_states, prev_actions, masks, action
+    ):
+        features = self._features(observations)
+        distribution = self.action_distribution(features)
+        return (
+            self.value(features),
+            distribution.log_probs(action),
+            distribution.entropy().mean(),
+            rnn_hidden_states,
+        )
@@ -0,0 +1,104 @@
+"""
+Microbenchmark for the ``habitat.VectorEnv`` observation transport.
+
+Steps ``DummyRLEnv`` workers that return an RGB frame and a float map of a
+given resolution and reports the achieved steps per second with observations
+pickled through the pipes versus written into shared-memory buffers.
+
+Usage:
+    python -m benchmarks.ipc_benchmark --env-counts 1 4 8 16 --sizes 64 256
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from benchmarks.dummy_env import make_dummy_env
+from habitat import VectorEnv
+
+
+def _observation_shapes(size):
+    return {
+        "rgb": ((size, size, 3), np.uint8),
+        "map": ((2, size, size), np.float32),
+    }
+
+
+def _payload_bytes(size):
+    return sum(
+        int(np.prod(shape)) * np.dtype(dtype).itemsize
+        for shape, dtype in _observation_shapes(size).values()
+    )
+
+
+def time_transport(num_envs, size, num_steps, use_shared_memory):
+    r"""Returns the mean wall time of one ``VectorEnv.step`` call."""
+    env_fn_args = tuple(
+        (_observation_shapes(size), 0.0, rank) for rank in range(num_envs)
+    )
+    with VectorEnv(
+        make_env_fn=make_dummy_env,
+        env_fn_args=env_fn_args,
+        use_shared_memory=use_shared_memory,
+    ) as envs:
+        envs.reset()
+        actions = [0] * num_envs
+        for _ in range(5):
+            envs.step(actions)
+
+        t_start = time.perf_counter()
+        for _ in range(num_steps):
+            envs.step(actions)
+        return (time.perf_counter() - t_start) / num_steps
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--env-counts", type=int, nargs="+", default=[1, 2, 4, 8, 16]
+    )
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[64, 128, 256, 512]
+    )
+    parser.add_argument("--num-steps", type=int, default=200)
+    parser.add_argument("--output", type=str, default=None)
+    args = parser.parse_args()
+
+    results = []
+    print(
+        "{:>6} {:>6} {:>10} {:>12} {:>12} {:>8}".format(
+            "envs", "size", "MB/step", "pipe sps", "shm sps", "speedup"
+        )
+    )
+    for num_envs in args.env_counts:
+        for size in args.sizes:
+            pipe_time = time_transport(num_envs, size, args.num_steps, False)
+            shm_time = time_transport(num_envs, size, args.num_steps, True)
+            result = dict(
+                num_envs=num_envs,
+                size=size,
+                payload_bytes=_payload_bytes(size) * num_envs,
+                pipe_step_time=pipe_time,
+                shared_memory_step_time=shm_time,
+            )
+            results.append(result)
+            print(
+                "{:>6} {:>6} {:>10.2f} {:>12.1f} {:>12.1f} {:>7.2f}x".format(
+                    num_envs,
+                    size,
+                    result["payload_bytes"] / 2 ** 20,
+                    num_envs / pipe_time,
+                    num_envs / shm_time,
+                    pipe_time / shm_time,
+                )
+            )
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Benchmark of the map encoders of the DRRN policy.
+
+Compares ``MapPlanner`` and ``CompactMapPlanner`` on ``MAP_DIMENSIONS`` maps:
+parameters, checkpoint size, multiply-accumulates of the convolutions and
+linear layers per map, and forward / forward+backward latency per batch.
+
+SPL needs the simulator: train and evaluate the DRRN experiment once per
+``MAP_PLANNER`` in ``config/config.py`` for the same number of updates, and
+pass the eval logs with ``--eval-logs`` to add the final SPL of each run,
+parsed from the "Average episode spl" line of the trainer.
+
+Usage:
+    python -m benchmarks.map_planner_benchmark --batch-sizes 1 8 32 \
+        --eval-logs MapPlanner=results/a/eval.log \
+        CompactMapPlanner=results/b/eval.log
+"""
+
+import argparse
+import io
+import json
+import re
+import time
+
+import torch
+from torch import nn
+
+from config.config import MAP_DIMENSIONS
+from planner.drrn_cnn import get_map_planner_object
+
+MAP_PLANNERS = ["MapPlanner", "CompactMapPlanner"]
+
+
+def count_macs(model, batch):
+    r"""Returns the multiply-accumulates of the Conv2d and Linear layers of
+    model per sample of batch.
+    """
+    macs = []
+
+    def conv_hook(module, inputs, output):
+        kernel_macs = (
+            module.in_channels
+            // module.groups
+            * module.kernel_size[0]
+            * module.kernel_size[1]
+        )
+        macs.append(output[0].numel() * kernel_macs)
+
+    def linear_hook(module, inputs, output):
+        macs.append(module.in_features * module.out_features)
+
+    handles = []
+    for module in model.modules():
+        if isinstance(module, nn.Conv2d):
+            handles.append(module.register_forward_hook(conv_hook))
+        elif isinstance(module, nn.Linear):
+            handles.append(module.register_forward_hook(linear_hook))
+    with torch.no_grad():
+        model(batch[:1])
+    for handle in handles:
+        handle.remove()
+    return sum(macs)
+
+
+def _time(fn, repeats):
+    fn()
+    t_start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - t_start) / repeats
+
+
+def eval_spl(log_path):
+    r"""Returns the last SPL logged by an evaluation run."""
+    spl = None
+    with open(log_path) as f:
+        for line in f:
+            match = re.search(r"Average episode spl: ([-\d.]+)", line)
+            if match is not None:
+                spl = float(match.group(1))
+    return spl
+
+
+def measure(name, batch_size, hidden_size, repeats):
+    torch.manual_seed(0)
+    model = get_map_planner_object(name)(output_size=hidden_size)
+    batch = torch.rand((batch_size,) + MAP_DIMENSIONS)
+    checkpoint = io.BytesIO()
+    torch.save(model.state_dict(), checkpoint)
+
+    def forward():
+        with torch.no_grad():
+            model(batch)
+
+    def forward_backward():
+        model.zero_grad()
+        model(batch).sum().backward()
+
+    return dict(
+        map_planner=name,
+        batch_size=batch_size,
+        parameters=sum(param.numel() for param in model.parameters()),
+        checkpoint_bytes=checkpoint.tell(),
+        macs_per_map=count_macs(model, batch),
+        forward_seconds=_time(forward, repeats),
+        forward_backward_seconds=_time(forward_backward, repeats),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--batch-sizes", type=int, nargs="+", default=[1, 8, 32]
+    )
+    parser.add_argument("--hidden-size", type=int, default=512)
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument(
+        "--eval-logs",
+        type=str,
+        nargs="*",
+        default=[],
+        help="MAP_PLANNER=path of the eval log of a run with that encoder",
+    )
+    parser.add_argument("--output", type=str, default=None)
+    args = parser.parse_args()
+    torch.set_num_threads(1)
+
+    spl = {}
+    for eval_log in args.eval_logs:
+        name, path = eval_log.split("=", 1)
+        spl[name] = eval_spl(path)
+
+    results = []
+    print(
+        "{:>18} {:>6} {:>10} {:>8} {:>10} {:>10} {:>10} {:>6}".format(
+            "map planner",
+            "batch",
+            "params",
+            "ckpt MB",
+            "MMACs",
+            "fwd ms",
+            "fwd+bwd ms",
+            "SPL",
+        )
+    )
+    for name in MAP_PLANNERS:
+        for batch_size in args.batch_sizes:
+            result = measure(name, batch_size, args.hidden_size, args.repeats)
+            result["spl"] = spl.get(name)
+            results.append(result)
+            print(
+                "{:>18} {:>6} {:>10} {:>8.1f} {:>10.1f} {:>10.2f} {:>10.2f} "
+                "{:>6}".format(
+                    name,
+                    batch_size,
+                    result["parameters"],
+                    result["checkpoint_bytes"] / 2 ** 20,
+                    result["macs_per_map"] / 1e6,
+                    result["forward_seconds"] * 1000,
+                    result["forward_backward_seconds"] * 1000,
+                    "-"
+                    if result["spl"] is None
+                    else "{:.3f}".format(result["spl"]),
+                )
+            )
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
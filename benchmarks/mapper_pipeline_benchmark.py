@@ -0,0 +1,193 @@
+"""
+Per-stage microbenchmark of the DRRN map pipeline of ``mapper/``.
+
+Feeds synthetic RGB frames and egomotion through the stages the
+``MIDLEVEL``, ``EGOMOTION`` and ``MIDLEVEL_MAP_SENSOR`` sensors chain every
+step, and times each stage on its own:
+
+- encode: ``encode_with_mid_level`` (``--stub-encoder`` replaces the
+  visualpriors networks by one strided convolution per representation with
+  the same output shape, so no weights need to be downloaded)
+- fc: the ``FC`` network of ``convert_midlevel_to_map``
+- decode: the ``UpResNet`` decoder of ``convert_midlevel_to_map``, upsampling
+  to the map size
+- warp: ``egomotion_transform``
+- fuse: ``update_map``
+
+for several batch sizes and map sizes, on CPU. Reports the latency per call,
+the throughput in frames per second and the bytes allocated per call. The
+rotation centre of ``egomotion_transform`` comes from ``MAP_DIMENSIONS``, so
+warps of other map sizes rotate around an offset centre, which does not
+change their cost.
+
+``update_map`` only fuses the first ``BATCHSIZE`` maps of a batch, the
+benchmark raises ``mapper.update.BATCHSIZE`` to the batch size so that every
+map is fused.
+
+Usage:
+    python -m benchmarks.mapper_pipeline_benchmark --batch-sizes 1 8 64 \
+        --map-sizes 128 256 512 --stub-encoder
+"""
+
+import argparse
+import json
+import time
+
+import torch
+from torch import nn
+
+import mapper.update
+from config.config import (
+    MAP_DIMENSIONS,
+    REPRESENTATION_NAMES,
+    RESIDUAL_LAYERS_PER_BLOCK,
+    RESIDUAL_NEURON_CHANNEL,
+    RESIDUAL_SIZE,
+    STRIDES,
+)
+from mapper.map import encode_with_mid_level
+from mapper.mid_level.decoder import UpResNet
+from mapper.mid_level.fc import FC
+from mapper.transform import egomotion_transform
+from mapper.update import update_map
+
+STAGES = ["encode", "fc", "decode", "warp", "fuse"]
+# stages before the decoder do not depend on the map size
+MAP_STAGES = ["decode", "warp", "fuse"]
+
+
+class StubEncoder(nn.Module):
+    r"""Random stand-in for the visualpriors encoders, one 16x16 strided
+    convolution to 8 channels per representation.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.encoders = nn.ModuleList(
+            nn.Conv2d(3, 8, kernel_size=16, stride=16)
+            for _ in REPRESENTATION_NAMES
+        )
+
+    def forward(self, image):
+        image = torch.swapaxes(image, 1, 3)
+        return torch.cat([encoder(image) for encoder in self.encoders], dim=1)
+
+
+def _time(fn, repeats):
+    fn()
+    t_start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - t_start) / repeats
+
+
+def allocated_bytes(fn):
+    r"""Returns the bytes allocated on the CPU by one call of fn."""
+    with torch.profiler.profile(
+        activities=[torch.profiler.ProfilerActivity.CPU], profile_memory=True
+    ) as profiler:
+        fn()
+    return sum(
+        max(event.self_cpu_memory_usage, 0)
+        for event in profiler.key_averages()
+    )
+
+
+def stage_inputs(batch_size, map_size, stub_encoder):
+    r"""Returns the callable of every stage, each with its input."""
+    torch.manual_seed(0)
+    channels = MAP_DIMENSIONS[0]
+    rgb = torch.rand(batch_size, 256, 256, 3) * 255
+    midlevel = torch.rand(batch_size, 8 * len(REPRESENTATION_NAMES), 16, 16)
+    fc = FC()
+    decoder = UpResNet(
+        layers=RESIDUAL_LAYERS_PER_BLOCK,
+        channels=RESIDUAL_NEURON_CHANNEL,
+        sizes=RESIDUAL_SIZE[:-1] + [map_size],
+        strides=STRIDES,
+    )
+    encoder = StubEncoder() if stub_encoder else encode_with_mid_level
+    previous_map = torch.rand(batch_size, channels, map_size, map_size)
+    decoded_map = torch.rand(batch_size, channels, map_size, map_size)
+    egomotion = torch.randn(batch_size, 1, 3) * 0.1
+
+    return dict(
+        encode=lambda: encoder(rgb),
+        fc=lambda: fc(midlevel.view(batch_size, 1, -1)),
+        decode=lambda: decoder(midlevel),
+        warp=lambda: egomotion_transform(previous_map, egomotion),
+        fuse=lambda: update_map(decoded_map, previous_map.clone()),
+    )
+
+
+def measure(batch_size, map_sizes, stub_encoder, repeats):
+    r"""Returns the measurements of every stage at batch_size, the stages
+    of MAP_STAGES once per map size.
+    """
+    mapper.update.BATCHSIZE = batch_size
+    results = []
+    for index, map_size in enumerate(map_sizes):
+        stages = stage_inputs(batch_size, map_size, stub_encoder)
+        with torch.no_grad():
+            for stage in STAGES:
+                if stage not in MAP_STAGES and index > 0:
+                    continue
+                seconds = _time(stages[stage], repeats)
+                results.append(
+                    dict(
+                        stage=stage,
+                        batch_size=batch_size,
+                        map_size=map_size if stage in MAP_STAGES else None,
+                        stub_encoder=stub_encoder,
+                        seconds=seconds,
+                        frames_per_second=batch_size / seconds,
+                        allocated_bytes=allocated_bytes(stages[stage]),
+                    )
+                )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--batch-sizes", type=int, nargs="+", default=[1, 4, 16, 64]
+    )
+    parser.add_argument(
+        "--map-sizes", type=int, nargs="+", default=[128, 256, 512]
+    )
+    parser.add_argument("--stub-encoder", action="store_true")
+    parser.add_argument("--num-threads", type=int, default=1)
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--output", type=str, default=None)
+    args = parser.parse_args()
+    torch.set_num_threads(args.num_threads)
+
+    results = []
+    print(
+        "{:>8} {:>6} {:>6} {:>10} {:>10} {:>12}".format(
+            "stage", "batch", "map", "ms", "frames/s", "alloc MB"
+        )
+    )
+    for batch_size in args.batch_sizes:
+        for result in measure(
+            batch_size, args.map_sizes, args.stub_encoder, args.repeats
+        ):
+            results.append(result)
+            print(
+                "{:>8} {:>6} {:>6} {:>10.2f} {:>10.1f} {:>12.2f}".format(
+                    result["stage"],
+                    batch_size,
+                    result["map_size"] or "-",
+                    result["seconds"] * 1000,
+                    result["frames_per_second"],
+                    result["allocated_bytes"] / 2 ** 20,
+                )
+            )
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Microbenchmark for ``RolloutStorage.recurrent_generator``.
+
+Compares the previous generator, which stacked per-env slices into lists and
+flattened them, with the index-based one and with the time-chunked one, on a
+rollout with large map observations. Reports the bytes allocated by torch and the wall time of one
+PPO epoch (a pass over all minibatches).
+
+Usage:
+    python -m benchmarks.minibatch_benchmark --num-mini-batches 1 2 4 \
+        --chunk-length 32
+"""
+
+import argparse
+import json
+import time
+from collections import defaultdict
+
+import numpy as np
+import torch
+from gym import spaces
+from torch.autograd.profiler import profile
+
+from habitat_baselines.common.rollout_storage import RolloutStorage
+
+
+def _stacking_generator(rollouts, advantages, num_mini_batch):
+    r"""The generator ``recurrent_generator`` used to be, kept as the
+    reference.
+    """
+    num_processes = rollouts.rewards.size(1)
+    num_envs_per_batch = num_processes // num_mini_batch
+    perm = torch.randperm(num_processes)
+    for start_ind in range(0, num_processes, num_envs_per_batch):
+        observations_batch = defaultdict(list)
+        tensors = defaultdict(list)
+        recurrent_hidden_states_batch = []
+        for offset in range(num_envs_per_batch):
+            ind = perm[start_ind + offset]
+            for sensor in rollouts.observations:
+                observations_batch[sensor].append(
+                    rollouts.observations[sensor][: rollouts.step, ind]
+                )
+            recurrent_hidden_states_batch.append(
+                rollouts.recurrent_hidden_states[0, :, ind]
+            )
+            for name in (
+                "actions",
+                "prev_actions",
+                "value_preds",
+                "returns",
+                "masks",
+                "action_log_probs",
+            ):
+                tensors[name].append(
+                    getattr(rollouts, name)[: rollouts.step, ind]
+                )
+            tensors["advantages"].append(advantages[: rollouts.step, ind])
+
+        T, N = rollouts.step, num_envs_per_batch
+        observations_batch = {
+            sensor: rollouts._decode_observation(
+                sensor,
+                RolloutStorage._flatten_helper(
+                    T, N, torch.stack(observations, 1)
+                ),
+            )
+            for sensor, observations in observations_batch.items()
+        }
+        tensors = {
+            name: RolloutStorage._flatten_helper(T, N, torch.stack(value, 1))
+            for name, value in tensors.items()
+        }
+        yield (
+            observations_batch,
+            torch.stack(recurrent_hidden_states_batch, 1),
+            tensors,
+        )
+
+
+def _index_generator(rollouts, advantages, num_mini_batch):
+    return rollouts.recurrent_generator(advantages, num_mini_batch)
+
+
+def _chunked_generator(chunk_length):
+    def generator(rollouts, advantages, num_mini_batch):
+        return rollouts.recurrent_generator(
+            advantages, num_mini_batch, chunk_length
+        )
+
+    return generator
+
+
+def _rollouts(num_steps, num_envs, map_size):
+    observation_space = spaces.Dict(
+        {
+            "map": spaces.Box(
+                low=0, high=1, shape=(2, map_size, map_size), dtype=np.float32
+            ),
+            "rgb": spaces.Box(
+                low=0, high=255, shape=(128, 128, 3), dtype=np.uint8
+            ),
+        }
+    )
+    rollouts = RolloutStorage(
+        num_steps,
+        num_envs,
+        observation_space,
+        spaces.Box(low=0, high=1, shape=(1,), dtype=np.float32),
+        512,
+    )
+    rollouts.step = num_steps
+    return rollouts
+
+
+def _epoch(generator_fn, rollouts, advantages, num_mini_batch):
+    for _ in generator_fn(rollouts, advantages, num_mini_batch):
+        pass
+
+
+def measure(generator_fn, num_steps, num_envs, map_size, num_mini_batch):
+    r"""Returns bytes allocated and seconds of one epoch of minibatches."""
+    rollouts = _rollouts(num_steps, num_envs, map_size)
+    advantages = torch.randn(num_steps, num_envs, 1)
+    _epoch(generator_fn, rollouts, advantages, num_mini_batch)
+
+    with profile(profile_memory=True) as prof:
+        _epoch(generator_fn, rollouts, advantages, num_mini_batch)
+    allocated_bytes = sum(
+        max(event.self_cpu_memory_usage, 0) for event in prof.function_events
+    )
+
+    t_start = time.perf_counter()
+    _epoch(generator_fn, rollouts, advantages, num_mini_batch)
+    return allocated_bytes, time.perf_counter() - t_start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num-steps", type=int, default=128)
+    parser.add_argument("--num-envs", type=int, default=8)
+    parser.add_argument("--map-size", type=int, default=256)
+    parser.add_argument(
+        "--num-mini-batches", type=int, nargs="+", default=[1, 2, 4]
+    )
+    parser.add_argument("--chunk-length", type=int, default=32)
+    parser.add_argument("--output", type=str, default=None)
+    args = parser.parse_args()
+
+    results = []
+    print(
+        "{:>12} {:>12} {:>12} {:>12} {:>10} {:>10} {:>10}".format(
+            "minibatches",
+            "stack MB",
+            "index MB",
+            "chunk MB",
+            "stack ms",
+            "index ms",
+            "chunk ms",
+        )
+    )
+    for num_mini_batch in args.num_mini_batches:
+        stack_bytes, stack_time = measure(
+            _stacking_generator,
+            args.num_steps,
+            args.num_envs,
+            args.map_size,
+            num_mini_batch,
+        )
+        index_bytes, index_time = measure(
+            _index_generator,
+            args.num_steps,
+            args.num_envs,
+            args.map_size,
+            num_mini_batch,
+        )
+        chunk_bytes, chunk_time = measure(
+            _chunked_generator(args.chunk_length),
+            args.num_steps,
+            args.num_envs,
+            args.map_size,
+            num_mini_batch,
+        )
+        results.append(
+            dict(
+                num_mini_batch=num_mini_batch,
+                stacking_bytes_per_epoch=stack_bytes,
+                index_bytes_per_epoch=index_bytes,
+                chunked_bytes_per_epoch=chunk_bytes,
+                stacking_seconds_per_epoch=stack_time,
+                index_seconds_per_epoch=index_time,
+                chunked_seconds_per_epoch=chunk_time,
+            )
+        )
+        print(
+            "{:>12} {:>12.1f} {:>12.1f} {:>12.1f} {:>10.1f} {:>10.1f} "
+            "{:>10.1f}".format(
+                num_mini_batch,
+                stack_bytes / 2 ** 20,
+                index_bytes / 2 ** 20,
+                chunk_bytes / 2 ** 20,
+                stack_time * 1000,
+                index_time * 1000,
+                chunk_time * 1000,
+            )
+        )
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
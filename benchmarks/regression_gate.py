@@ -0,0 +1,297 @@
+"""
+Performance regression gate over the benchmarks of ``benchmarks/``.
+
+Runs every benchmark of ``SUITE`` with a fixed, short configuration, matches
+its result rows to the rows of the baseline by their key fields and compares
+the metrics of ``SUITE`` with a per-benchmark tolerance. Prints a table of
+all differences and exits with status 1 on any regression.
+
+The baseline is ``benchmarks/baseline.json``. Measure and commit it on the
+reference machine with ``--rebaseline``, which overwrites the baseline of the
+benchmarks that were run. No baseline has been committed yet: until one is,
+benchmarks without a baseline are reported with a warning and do not fail
+the gate, so the gate only checks that the suite runs.
+
+Usage:
+    python -m benchmarks.regression_gate
+    python -m benchmarks.regression_gate --benchmarks mapper_pipeline \
+        batch_obs --repeats 3
+    python -m benchmarks.regression_gate --rebaseline
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+LOWER = "lower"
+HIGHER = "higher"
+
+# command line of every benchmark, the fields that identify a result row, the
+# compared metrics with the direction that is better, and the largest
+# relative change of a metric in the wrong direction that is not a
+# regression
+SUITE = dict(
+    mapper_pipeline=dict(
+        args="--batch-sizes 1 16 --map-sizes 256 --stub-encoder --repeats 20",
+        keys=["stage", "batch_size", "map_size"],
+        metrics=dict(seconds=LOWER),
+        tolerance=0.2,
+    ),
+    batch_obs=dict(
+        args="--env-counts 4 16 --sizes 256",
+        keys=["num_envs", "size"],
+        metrics=dict(
+            batch_obs_seconds_per_step=LOWER,
+            insert_observations_seconds_per_step=LOWER,
+            insert_observations_bytes_per_step=LOWER,
+        ),
+        tolerance=0.2,
+    ),
+    minibatch=dict(
+        args="--num-mini-batches 2 4",
+        keys=["num_mini_batch"],
+        metrics=dict(
+            chunked_seconds_per_epoch=LOWER,
+            index_seconds_per_epoch=LOWER,
+        ),
+        tolerance=0.2,
+    ),
+    returns=dict(
+        args="--num-steps 128 --env-counts 8",
+        keys=["num_steps", "num_envs"],
+        metrics=dict(gae_compiled_seconds=LOWER),
+        tolerance=0.25,
+    ),
+    rnn_seq_forward=dict(
+        args="--env-counts 4 16 --episode-lengths 50 --num-steps 64",
+        keys=["num_envs", "episode_length"],
+        metrics=dict(packed_seconds=LOWER),
+        tolerance=0.25,
+    ),
+    act_latency=dict(
+        args="--policies Baseline DRRN --batch-sizes 1 16",
+        keys=["policy", "batch_size"],
+        metrics=dict(inference_out_seconds=LOWER),
+        tolerance=0.25,
+    ),
+    throughput=dict(
+        args=(
+            "--experiments Baseline DRRN --num-envs 2 --num-steps 16 "
+            "--num-updates 3"
+        ),
+        keys=["experiment"],
+        metrics=dict(sps=HIGHER),
+        tolerance=0.25,
+    ),
+)
+
+
+def run_benchmark(name):
+    r"""Runs benchmark name and returns its result rows."""
+    with tempfile.NamedTemporaryFile(suffix=".json") as output:
+        subprocess.check_call(
+            [sys.executable, "-m", "benchmarks.{}_benchmark".format(name)]
+            + SUITE[name]["args"].split()
+            + ["--output", output.name]
+        )
+        results = json.load(output)
+    if isinstance(results, dict):
+        results = results["results"]
+    return results
+
+
+def best_of(name, runs):
+    r"""Merges the rows of several runs of benchmark name, keeping the best
+    value of every metric to filter out noise.
+    """
+    spec = SUITE[name]
+    best = {}
+    for rows in runs:
+        for row in rows:
+            key = row_key(spec, row)
+            if key not in best:
+                best[key] = dict(row)
+                continue
+            for metric, better in spec["metrics"].items():
+                pick = min if better == LOWER else max
+                best[key][metric] = pick(best[key][metric], row[metric])
+    return list(best.values())
+
+
+def row_key(spec, row):
+    return tuple(row.get(key) for key in spec["keys"])
+
+
+def relative_regression(better, baseline, current):
+    r"""Returns how much worse current is than baseline, relative to the
+    baseline, negative for an improvement.
+    """
+    if baseline == 0:
+        return 0.0 if current == 0 else float("inf")
+    if better == LOWER:
+        return current / baseline - 1
+    return baseline / current - 1 if current != 0 else float("inf")
+
+
+def compare(name, baseline_rows, rows, tolerance):
+    r"""Returns the comparison of every metric of every row of rows, and
+    whether any of them regressed.
+    """
+    spec = SUITE[name]
+    baseline = {row_key(spec, row): row for row in baseline_rows}
+    lines = []
+    regressed = False
+    for row in rows:
+        key = row_key(spec, row)
+        for metric, better in spec["metrics"].items():
+            line = dict(
+                benchmark=name,
+                row=list(key),
+                metric=metric,
+                baseline=baseline.get(key, {}).get(metric),
+                current=row[metric],
+                change=None,
+                status="new",
+            )
+            lines.append(line)
+            if line["baseline"] is None:
+                continue
+            change = relative_regression(better, line["baseline"], row[metric])
+            if change > tolerance:
+                status = "REGRESSION"
+                regressed = True
+            elif change < -tolerance:
+                status = "improved"
+            else:
+                status = "ok"
+            line.update(change=change, status=status)
+    return lines, regressed
+
+
+def _git_revision():
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "--short", "HEAD"],
+                stderr=subprocess.DEVNULL,
+            )
+            .decode()
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _format_value(value):
+    return "-" if value is None else "{:.4g}".format(value)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--benchmarks",
+        type=str,
+        nargs="+",
+        default=list(SUITE),
+        choices=list(SUITE),
+    )
+    parser.add_argument(
+        "--repeats",
+        type=int,
+        default=1,
+        help="runs of every benchmark, the best value of each metric counts",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=None,
+        help="overrides the tolerance of every benchmark",
+    )
+    parser.add_argument("--baseline", type=str, default=BASELINE_PATH)
+    parser.add_argument("--rebaseline", action="store_true")
+    parser.add_argument("--output", type=str, default=None)
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    measured = {}
+    for name in args.benchmarks:
+        measured[name] = best_of(
+            name, [run_benchmark(name) for _ in range(args.repeats)]
+        )
+
+    if args.rebaseline:
+        revision = _git_revision()
+        for name, rows in measured.items():
+            baseline[name] = dict(revision=revision, results=rows)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(
+            "Wrote the baseline of {} to {}".format(
+                ", ".join(measured), args.baseline
+            )
+        )
+        return
+
+    failed = False
+    lines = []
+    for name, rows in measured.items():
+        if name not in baseline:
+            print(
+                "WARNING: {} has no baseline and is not gated, run python -m "
+                "benchmarks.regression_gate --benchmarks {} --rebaseline on "
+                "the reference machine and commit {}".format(
+                    name, name, args.baseline
+                )
+            )
+            continue
+        tolerance = (
+            SUITE[name]["tolerance"]
+            if args.tolerance is None
+            else args.tolerance
+        )
+        benchmark_lines, regressed = compare(
+            name, baseline[name]["results"], rows, tolerance
+        )
+        lines += benchmark_lines
+        failed = failed or regressed
+
+    print(
+        "{:>16} {:>24} {:>36} {:>10} {:>10} {:>8} {:>10}".format(
+            "benchmark", "row", "metric", "baseline", "current", "change",
+            "status",
+        )
+    )
+    for line in lines:
+        print(
+            "{:>16} {:>24} {:>36} {:>10} {:>10} {:>8} {:>10}".format(
+                line["benchmark"],
+                "/".join(str(field) for field in line["row"]),
+                line["metric"],
+                _format_value(line["baseline"]),
+                _format_value(line["current"]),
+                "-"
+                if line["change"] is None
+                else "{:+.1%}".format(line["change"]),
+                line["status"],
+            )
+        )
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(dict(results=measured, comparison=lines), f, indent=2)
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
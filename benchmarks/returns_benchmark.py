@@ -0,0 +1,189 @@
+"""
+Microbenchmark for ``RolloutStorage.compute_returns``.
+
+Compares the previous Python loop over the rollout with the compiled
+``compute_returns`` for GAE and discounted returns, and with the GAE TD
+errors computed incrementally during collection (only the final call of
+``compute_returns`` is timed, the per-step cost is reported separately).
+Also reports the largest difference to the Python loop.
+
+Usage:
+    python -m benchmarks.returns_benchmark --num-steps 128 512 2048 \
+        --env-counts 1 8 64
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+import torch
+from gym import spaces
+
+from habitat_baselines.common.rollout_storage import RolloutStorage
+
+GAMMA = 0.99
+TAU = 0.95
+
+
+def _python_loop_returns(rollouts, next_value, use_gae):
+    r"""The loop ``compute_returns`` used to run, kept as the reference."""
+    returns = rollouts.returns.clone()
+    value_preds = rollouts.value_preds.clone()
+    if use_gae:
+        value_preds[rollouts.step] = next_value
+        gae = 0
+        for step in reversed(range(rollouts.step)):
+            delta = (
+                rollouts.rewards[step]
+                + GAMMA * value_preds[step + 1] * rollouts.masks[step + 1]
+                - value_preds[step]
+            )
+            gae = delta + GAMMA * TAU * rollouts.masks[step + 1] * gae
+            returns[step] = gae + value_preds[step]
+    else:
+        returns[rollouts.step] = next_value
+        for step in reversed(range(rollouts.step)):
+            returns[step] = (
+                returns[step + 1] * GAMMA * rollouts.masks[step + 1]
+                + rollouts.rewards[step]
+            )
+    return returns
+
+
+def _filled_rollouts(num_steps, num_envs, device, incremental):
+    observation_space = spaces.Dict(
+        {"x": spaces.Box(low=0, high=1, shape=(1,), dtype=np.float32)}
+    )
+    rollouts = RolloutStorage(
+        num_steps,
+        num_envs,
+        observation_space,
+        spaces.Box(low=0, high=1, shape=(1,), dtype=np.float32),
+        1,
+    )
+    rollouts.to(device)
+    if incremental:
+        rollouts.enable_incremental_returns(GAMMA, TAU)
+
+    # same rollout for every implementation
+    torch.manual_seed(0)
+    t_start = time.perf_counter()
+    for _ in range(num_steps):
+        rollouts.insert(
+            None,
+            torch.zeros(1, num_envs, 1, device=device),
+            torch.zeros(num_envs, 1, device=device),
+            torch.zeros(num_envs, 1, device=device),
+            torch.randn(num_envs, 1, device=device),
+            torch.randn(num_envs, 1, device=device),
+            (torch.rand(num_envs, 1, device=device) > 0.01).float(),
+        )
+    if device.type == "cuda":
+        torch.cuda.synchronize()
+    insert_time = (time.perf_counter() - t_start) / num_steps
+    return rollouts, insert_time
+
+
+def _time(fn, device, repeats):
+    fn()
+    if device.type == "cuda":
+        torch.cuda.synchronize()
+    t_start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    if device.type == "cuda":
+        torch.cuda.synchronize()
+    return (time.perf_counter() - t_start) / repeats
+
+
+def measure(num_steps, num_envs, device, repeats):
+    r"""Returns seconds per call and max error of every implementation."""
+    rollouts, base_insert_time = _filled_rollouts(
+        num_steps, num_envs, device, incremental=False
+    )
+    next_value = torch.randn(num_envs, 1, device=device)
+    result = dict(num_steps=num_steps, num_envs=num_envs)
+    for use_gae, name in ((True, "gae"), (False, "discounted")):
+        reference = _python_loop_returns(rollouts, next_value, use_gae)
+        result[name + "_loop_seconds"] = _time(
+            lambda: _python_loop_returns(rollouts, next_value, use_gae),
+            device,
+            repeats,
+        )
+        result[name + "_compiled_seconds"] = _time(
+            lambda: rollouts.compute_returns(next_value, use_gae, GAMMA, TAU),
+            device,
+            repeats,
+        )
+        result[name + "_compiled_max_error"] = (
+            (rollouts.returns[:num_steps] - reference[:num_steps])
+            .abs()
+            .max()
+            .item()
+        )
+
+    incremental, insert_time = _filled_rollouts(
+        num_steps, num_envs, device, incremental=True
+    )
+    t_start = time.perf_counter()
+    incremental.compute_returns(next_value, True, GAMMA, TAU)
+    if device.type == "cuda":
+        torch.cuda.synchronize()
+    result["gae_incremental_final_seconds"] = time.perf_counter() - t_start
+    result["gae_incremental_step_overhead_seconds"] = (
+        insert_time - base_insert_time
+    )
+    reference = _python_loop_returns(rollouts, next_value, True)
+    result["gae_incremental_max_error"] = (
+        (incremental.returns[:num_steps] - reference[:num_steps])
+        .abs()
+        .max()
+        .item()
+    )
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--num-steps", type=int, nargs="+", default=[128, 512, 2048]
+    )
+    parser.add_argument("--env-counts", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--device", type=str, default="cpu")
+    parser.add_argument("--output", type=str, default=None)
+    args = parser.parse_args()
+    device = torch.device(args.device)
+
+    results = []
+    print(
+        "{:>6} {:>6} {:>10} {:>10} {:>10} {:>10} {:>10}".format(
+            "T", "N", "gae loop", "gae jit", "gae incr", "disc loop",
+            "disc jit",
+        )
+    )
+    for num_steps in args.num_steps:
+        for num_envs in args.env_counts:
+            result = measure(num_steps, num_envs, device, args.repeats)
+            results.append(result)
+            print(
+                "{:>6} {:>6} {:>9.2f}ms {:>9.2f}ms {:>9.2f}ms {:>9.2f}ms "
+                "{:>9.2f}ms".format(
+                    num_steps,
+                    num_envs,
+                    result["gae_loop_seconds"] * 1000,
+                    result["gae_compiled_seconds"] * 1000,
+                    result["gae_incremental_final_seconds"] * 1000,
+                    result["discounted_loop_seconds"] * 1000,
+                    result["discounted_compiled_seconds"] * 1000,
+                )
+            )
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
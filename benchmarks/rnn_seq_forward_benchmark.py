@@ -0,0 +1,153 @@
+"""
+Microbenchmark for ``RNNStateEncoder.seq_forward``.
+
+Compares the previous implementation, which ran the RNN once per segment
+between steps where any env has an episode boundary, with the packed-sequence
+one, for several env counts and mean episode lengths. Reports the seconds per
+forward+backward and the largest difference of the outputs and final hidden
+states to the previous implementation.
+
+Usage:
+    python -m benchmarks.rnn_seq_forward_benchmark --env-counts 4 16 64 \
+        --episode-lengths 10 50 500
+"""
+
+import argparse
+import json
+import time
+
+import torch
+
+from habitat_baselines.rl.models.rnn_state_encoder import RNNStateEncoder
+
+
+def _segment_loop_seq_forward(encoder, x, hidden_states, masks):
+    r"""The ``seq_forward`` loop used to run, kept as the reference."""
+    n = hidden_states.size(1)
+    t = int(x.size(0) / n)
+    x = x.view(t, n, x.size(1))
+    masks = masks.view(t, n)
+
+    has_zeros = (masks[1:] == 0.0).any(dim=-1).nonzero().squeeze().cpu()
+    if has_zeros.dim() == 0:
+        has_zeros = [has_zeros.item() + 1]
+    else:
+        has_zeros = (has_zeros + 1).numpy().tolist()
+    has_zeros = [0] + has_zeros + [t]
+
+    hidden_states = encoder._unpack_hidden(hidden_states)
+    outputs = []
+    for i in range(len(has_zeros) - 1):
+        start_idx = has_zeros[i]
+        end_idx = has_zeros[i + 1]
+        rnn_scores, hidden_states = encoder.rnn(
+            x[start_idx:end_idx],
+            encoder._mask_hidden(
+                hidden_states, masks[start_idx].view(1, -1, 1)
+            ),
+        )
+        outputs.append(rnn_scores)
+
+    x = torch.cat(outputs, dim=0).view(t * n, -1)
+    return x, encoder._pack_hidden(hidden_states)
+
+
+def _inputs(encoder, num_steps, num_envs, episode_length, input_size):
+    x = torch.randn(num_steps * num_envs, input_size, requires_grad=True)
+    hidden_states = torch.randn(
+        encoder.num_recurrent_layers, num_envs, encoder.rnn.hidden_size
+    )
+    masks = (torch.rand(num_steps, num_envs, 1) > 1.0 / episode_length).float()
+    return x, hidden_states, masks.view(num_steps * num_envs, 1)
+
+
+def _time(fn, repeats):
+    fn()
+    t_start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - t_start) / repeats
+
+
+def measure(args, num_envs, episode_length):
+    r"""Returns the seconds per forward+backward and the largest differences
+    of both implementations.
+    """
+    torch.manual_seed(0)
+    encoder = RNNStateEncoder(
+        args.input_size, args.hidden_size, rnn_type=args.rnn_type
+    )
+    inputs = _inputs(
+        encoder, args.num_steps, num_envs, episode_length, args.input_size
+    )
+
+    def run(seq_forward):
+        x, hidden_states = seq_forward(*inputs)
+        (x.sum() + hidden_states.sum()).backward()
+        return x, hidden_states
+
+    def segment_loop(*inputs):
+        return _segment_loop_seq_forward(encoder, *inputs)
+
+    reference = run(segment_loop)
+    packed = run(encoder.seq_forward)
+    num_boundaries = int((inputs[2] == 0).sum())
+    return dict(
+        num_envs=num_envs,
+        episode_length=episode_length,
+        num_boundaries=num_boundaries,
+        segment_loop_seconds=_time(lambda: run(segment_loop), args.repeats),
+        packed_seconds=_time(lambda: run(encoder.seq_forward), args.repeats),
+        max_output_error=(packed[0] - reference[0]).abs().max().item(),
+        max_hidden_error=(packed[1] - reference[1]).abs().max().item(),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--env-counts", type=int, nargs="+", default=[4, 16, 64]
+    )
+    parser.add_argument(
+        "--episode-lengths", type=int, nargs="+", default=[10, 50, 500]
+    )
+    parser.add_argument("--num-steps", type=int, default=128)
+    parser.add_argument("--input-size", type=int, default=514)
+    parser.add_argument("--hidden-size", type=int, default=512)
+    parser.add_argument(
+        "--rnn-type", type=str, default="GRU", choices=["GRU", "LSTM"]
+    )
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", type=str, default=None)
+    args = parser.parse_args()
+
+    results = []
+    print(
+        "{:>6} {:>8} {:>10} {:>10} {:>10} {:>10}".format(
+            "envs", "ep len", "resets", "loop ms", "packed ms", "max error"
+        )
+    )
+    for num_envs in args.env_counts:
+        for episode_length in args.episode_lengths:
+            result = measure(args, num_envs, episode_length)
+            results.append(result)
+            print(
+                "{:>6} {:>8} {:>10} {:>10.1f} {:>10.1f} {:>10.2e}".format(
+                    num_envs,
+                    episode_length,
+                    result["num_boundaries"],
+                    result["segment_loop_seconds"] * 1000,
+                    result["packed_seconds"] * 1000,
+                    max(
+                        result["max_output_error"], result["max_hidden_error"]
+                    ),
+                )
+            )
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
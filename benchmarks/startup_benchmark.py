@@ -0,0 +1,269 @@
+"""
+Start-up benchmark: import time of the modules every run or env worker
+imports, and time to the first ``env.reset()``.
+
+Every module of ``MODULES`` is imported in a fresh interpreter with
+``python -X importtime``, the benchmark reports its cumulative import time
+and the packages that took the longest to import. Then, for every number of
+envs, a fresh process builds the ``VectorEnv`` of an experiment with
+``construct_envs`` on ``SyntheticSim-v0`` (as ``throughput_benchmark`` does)
+and times the imports, the construction of the envs and their first reset,
+then the time to retarget the same workers to the config again and reset
+them, which is what every evaluated checkpoint after the first one pays with
+``EVAL.REUSE_ENVS``.
+
+Import-time budget: importing ``config.config`` or the sensors module, which
+every env worker does, must stay under its budget in ``MODULES``. Heavy
+dependencies (torch for ``config.config``; torch, cv2, scipy, matplotlib,
+cupy, visualpriors and the mapper networks for the sensors) are imported on
+first use. Modules over the budget are flagged in the table and make the
+benchmark exit with status 1.
+
+Usage:
+    python -m benchmarks.startup_benchmark --num-envs 1 16 \
+        --experiment DRRN --output startup.json
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+
+# module imported by the benchmark, and its import-time budget in seconds,
+# or None if it has none
+MODULES = {
+    "config.config": 0.1,
+    "habitat.sims.habitat_simulator.sensors": 1.0,
+    "habitat": None,
+    "habitat_baselines.rl.ppo.ppo_trainer": None,
+}
+
+
+def parse_importtime(stderr, module):
+    r"""Returns the cumulative seconds of ``import module`` from the
+    ``-X importtime`` output stderr, and the cumulative seconds of every
+    top-level package imported by it, excluding the imports of the
+    interpreter start-up.
+    """
+    lines = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        name = fields[2].rstrip()
+        depth = len(name) - len(name.lstrip())
+        lines.append((name.strip(), int(fields[1]) / 1e6, depth))
+
+    # a module is printed after the modules it imported, which are indented
+    # deeper, so the subtree of the statement ends with the last line of its
+    # top-level package
+    root = module.split(".")[0]
+    end = max(
+        index
+        for index, (name, _, depth) in enumerate(lines)
+        if name == root
+    )
+    _, seconds, root_depth = lines[end]
+    begin = end
+    while begin > 0 and lines[begin - 1][2] > root_depth:
+        begin -= 1
+    packages = {
+        name: package_seconds
+        for name, package_seconds, _ in lines[begin:end]
+        if "." not in name and name != root
+    }
+    return seconds, packages
+
+
+def measure_import(module, top):
+    r"""Imports module in a fresh interpreter and returns its cumulative
+    import time and the top packages it imported.
+    """
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + module],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    if output.returncode != 0:
+        return dict(module=module, failed=True)
+    seconds, packages = parse_importtime(output.stderr, module)
+    heaviest = sorted(packages.items(), key=lambda item: -item[1])
+    return dict(
+        module=module,
+        failed=False,
+        seconds=seconds,
+        budget_seconds=MODULES.get(module),
+        top_packages=[
+            dict(package=name, seconds=package_seconds)
+            for name, package_seconds in heaviest[:top]
+        ],
+    )
+
+
+def run_first_reset(args, num_envs):
+    r"""Builds the envs in this process and returns the time of each start-up
+    phase.
+    """
+    t_start = time.time()
+    from benchmarks.throughput_benchmark import experiment_config
+    from habitat_baselines.common.env_utils import construct_envs
+    from habitat_baselines.common.environments import get_env_class
+
+    import_time = time.time() - t_start
+
+    config_args = argparse.Namespace(
+        num_envs=num_envs,
+        episodes_per_scene=args.episodes_per_scene,
+        seed=args.seed,
+        num_updates=1,
+        warmup_updates=0,
+        num_steps=1,
+    )
+    work_dir = tempfile.mkdtemp(prefix="startup_benchmark_")
+    config = experiment_config(config_args, args.experiment, work_dir)
+
+    t_construct = time.time()
+    envs = construct_envs(config, get_env_class(config.ENV_NAME))
+    construct_time = time.time() - t_construct
+    t_reset = time.time()
+    envs.reset()
+    reset_time = time.time() - t_reset
+    total_time = time.time() - t_start
+
+    t_retarget = time.time()
+    construct_envs(config, get_env_class(config.ENV_NAME), envs=envs)
+    envs.reset()
+    retarget_time = time.time() - t_retarget
+    envs.close()
+
+    return dict(
+        experiment=args.experiment,
+        num_envs=num_envs,
+        import_seconds=import_time,
+        construct_seconds=construct_time,
+        first_reset_seconds=reset_time,
+        time_to_first_reset_seconds=total_time,
+        retarget_and_reset_seconds=retarget_time,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--modules", type=str, nargs="+", default=list(MODULES)
+    )
+    parser.add_argument("--num-envs", type=int, nargs="+", default=[1, 16])
+    parser.add_argument("--experiment", type=str, default="DRRN")
+    parser.add_argument("--episodes-per-scene", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=100)
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=5,
+        help="number of the slowest packages reported per module",
+    )
+    parser.add_argument("--skip-reset", action="store_true")
+    parser.add_argument("--output", type=str, default=None)
+    # measures the first reset with a single number of envs and writes its
+    # result to this file, used to start every measurement from a fresh
+    # process
+    parser.add_argument("--result-file", type=str, default=None)
+    args = parser.parse_args()
+
+    if args.result_file is not None:
+        (num_envs,) = args.num_envs
+        with open(args.result_file, "w") as f:
+            json.dump(run_first_reset(args, num_envs), f)
+        return
+
+    over_budget = False
+    imports = []
+    print("{:>40} {:>10} {:>10}  {}".format("module", "s", "budget", "top"))
+    for module in args.modules:
+        result = measure_import(module, args.top)
+        imports.append(result)
+        if result["failed"]:
+            print("{:>40} failed".format(module))
+            continue
+        budget = result["budget_seconds"]
+        status = ""
+        if budget is not None and result["seconds"] > budget:
+            status = " OVER BUDGET"
+            over_budget = True
+        print(
+            "{:>40} {:>10.3f} {:>10} {}{}".format(
+                module,
+                result["seconds"],
+                "-" if budget is None else "{:.3f}".format(budget),
+                ", ".join(
+                    "{} {:.3f}".format(top["package"], top["seconds"])
+                    for top in result["top_packages"]
+                ),
+                status,
+            )
+        )
+
+    first_resets = []
+    if not args.skip_reset:
+        print(
+            "{:>8} {:>10} {:>12} {:>10} {:>10} {:>11}".format(
+                "envs",
+                "import s",
+                "construct s",
+                "reset s",
+                "total s",
+                "retarget s",
+            )
+        )
+    for num_envs in [] if args.skip_reset else args.num_envs:
+        with tempfile.NamedTemporaryFile(suffix=".json") as result_file:
+            command = [
+                sys.executable,
+                "-m",
+                "benchmarks.startup_benchmark",
+                "--num-envs",
+                str(num_envs),
+                "--experiment",
+                args.experiment,
+                "--episodes-per-scene",
+                str(args.episodes_per_scene),
+                "--seed",
+                str(args.seed),
+                "--result-file",
+                result_file.name,
+            ]
+            if subprocess.call(command) != 0:
+                print("{:>8} failed".format(num_envs))
+                continue
+            result = json.load(result_file)
+        first_resets.append(result)
+        print(
+            "{:>8} {:>10.2f} {:>12.2f} {:>10.2f} {:>10.2f} {:>11.2f}".format(
+                num_envs,
+                result["import_seconds"],
+                result["construct_seconds"],
+                result["first_reset_seconds"],
+                result["time_to_first_reset_seconds"],
+                result["retarget_and_reset_seconds"],
+            )
+        )
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(
+                dict(imports=imports, first_resets=first_resets),
+                f,
+                indent=2,
+            )
+
+    if over_budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
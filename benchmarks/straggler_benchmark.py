@@ -0,0 +1,165 @@
+"""
+Benchmark for the first-ready rollout collection of ``PPOTrainer``.
+
+Collects rollouts from ``DummyRLEnv`` workers where a fraction of the steps
+is artificially slow, once with the lockstep ``_collect_rollout_step`` loop
+and once with ``_collect_rollout_first_ready``, and reports steps per second
+of both. With ``--device cuda`` the policy and the rollout storage live on
+the GPU, which exercises the indexed writes of the first-ready path into
+device storage.
+
+Usage:
+    python -m benchmarks.straggler_benchmark --env-counts 8 16 \
+        --straggler-prob 0.05 --straggler-delay 0.2
+    python -m benchmarks.straggler_benchmark --env-counts 8 --device cuda
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+import torch
+
+from benchmarks.dummy_env import make_dummy_env
+from benchmarks.dummy_policy import DummyPolicy
+from habitat import Config, VectorEnv
+from habitat_baselines.common.rollout_storage import RolloutStorage
+from habitat_baselines.rl.ppo.ppo_trainer import PPOTrainer
+
+OBSERVATION_SHAPES = {
+    "rgb": ((128, 128, 3), np.uint8),
+    "map": ((2, 64, 64), np.float32),
+}
+
+
+def measure(
+    num_envs,
+    num_steps,
+    num_updates,
+    step_delay,
+    straggler_prob,
+    straggler_delay,
+    min_ready_fraction,
+    mode,
+    device,
+):
+    r"""Returns steps per second, pth-time and env-time of ``num_updates``
+    rollouts collected with ``mode``.
+    """
+    env_fn_args = tuple(
+        (OBSERVATION_SHAPES, step_delay, rank, straggler_prob, straggler_delay)
+        for rank in range(num_envs)
+    )
+    with VectorEnv(
+        make_env_fn=make_dummy_env, env_fn_args=env_fn_args
+    ) as envs:
+        trainer = PPOTrainer(Config())
+        trainer.envs = envs
+        trainer.device = torch.device(device)
+        trainer.actor_critic = DummyPolicy(envs.observation_spaces[0]).to(
+            trainer.device
+        )
+        rollouts = RolloutStorage(
+            num_steps,
+            num_envs,
+            envs.observation_spaces[0],
+            envs.action_spaces[0],
+            trainer.actor_critic.hidden_size,
+        )
+        rollouts.to(trainer.device)
+        rollouts.insert_observations(0, envs.reset())
+        current_episode_reward = torch.zeros(num_envs, 1)
+        running_episode_stats = dict(
+            count=torch.zeros(num_envs, 1), reward=torch.zeros(num_envs, 1)
+        )
+        min_ready = max(1, int(min_ready_fraction * num_envs))
+
+        pth_time = 0.0
+        env_time = 0.0
+        count_steps = 0
+        t_start = time.time()
+        for _ in range(num_updates):
+            if mode == "first_ready":
+                (
+                    delta_pth_time,
+                    delta_env_time,
+                    delta_steps,
+                ) = trainer._collect_rollout_first_ready(
+                    rollouts,
+                    current_episode_reward,
+                    running_episode_stats,
+                    min_ready,
+                )
+            else:
+                delta_pth_time, delta_env_time, delta_steps = 0.0, 0.0, 0
+                for _ in range(num_steps):
+                    step_stats = trainer._collect_rollout_step(
+                        rollouts, current_episode_reward, running_episode_stats
+                    )
+                    delta_pth_time += step_stats[0]
+                    delta_env_time += step_stats[1]
+                    delta_steps += step_stats[2]
+            pth_time += delta_pth_time
+            env_time += delta_env_time
+            count_steps += delta_steps
+            rollouts.after_update()
+
+        return dict(
+            sps=count_steps / (time.time() - t_start),
+            pth_time=pth_time,
+            env_time=env_time,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--env-counts", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--num-steps", type=int, default=32)
+    parser.add_argument("--num-updates", type=int, default=4)
+    parser.add_argument("--step-delay", type=float, default=0.005)
+    parser.add_argument("--straggler-prob", type=float, default=0.05)
+    parser.add_argument("--straggler-delay", type=float, default=0.1)
+    parser.add_argument("--min-ready-fraction", type=float, default=0.5)
+    parser.add_argument("--device", type=str, default="cpu")
+    parser.add_argument("--output", type=str, default=None)
+    args = parser.parse_args()
+
+    results = []
+    print(
+        "{:>6} {:>12} {:>12} {:>8}".format(
+            "envs", "lockstep sps", "ready sps", "speedup"
+        )
+    )
+    for num_envs in args.env_counts:
+        stats = {
+            mode: measure(
+                num_envs,
+                args.num_steps,
+                args.num_updates,
+                args.step_delay,
+                args.straggler_prob,
+                args.straggler_delay,
+                args.min_ready_fraction,
+                mode,
+                args.device,
+            )
+            for mode in ("lockstep", "first_ready")
+        }
+        results.append(dict(num_envs=num_envs, device=args.device, **stats))
+        print(
+            "{:>6} {:>12.1f} {:>12.1f} {:>8.2f}".format(
+                num_envs,
+                stats["lockstep"]["sps"],
+                stats["first_ready"]["sps"],
+                stats["first_ready"]["sps"] / stats["lockstep"]["sps"],
+            )
+        )
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""
+End-to-end training throughput benchmark per experiment.
+
+Runs a fixed number of rollout+update iterations of ``PPOTrainer`` for every
+experiment of ``config/create_habitat_configs.py`` (its policy and sensors)
+on ``SyntheticSim-v0`` with ``SyntheticPointNav-v1`` episodes, so no scene
+data or habitat-sim is needed. Every experiment runs in its own process and
+reports the seconds spent stepping the envs, in the policy, in the rest of
+rollout collection and in the PPO update, the peak RSS of the trainer and of
+the env workers, and the steps per second.
+
+Usage:
+    python -m benchmarks.throughput_benchmark --experiments Baseline DRRN \
+        --num-envs 4 --num-steps 32 --num-updates 5 --output sps.json
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+EXPERIMENTS = ["Baseline", "BaselineMidLevel", "DRRN", "DRRNActualMap"]
+
+
+def peak_rss_mb(pid="self"):
+    r"""Returns the peak resident set size of process pid in MB."""
+    with open("/proc/{}/status".format(pid)) as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return None
+
+
+def _git_revision():
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "--short", "HEAD"],
+                stderr=subprocess.DEVNULL,
+            )
+            .decode()
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def experiment_config(args, experiment_id, work_dir):
+    r"""Returns the habitat_baselines config of experiment_id, on the
+    synthetic simulator.
+    """
+    import yaml
+
+    from config.create_habitat_configs import (
+        create_habitat_config_for_experiment,
+        create_habitat_pointnav_config_for_experiment,
+    )
+    from habitat_baselines.config.default import get_config
+
+    task_config_path = os.path.join(work_dir, "pointnav.yaml")
+    with open(task_config_path, "w") as f:
+        yaml.dump(
+            create_habitat_pointnav_config_for_experiment(experiment_id), f
+        )
+    exp_config_path = os.path.join(work_dir, "experiment.yaml")
+    with open(exp_config_path, "w") as f:
+        yaml.dump(
+            create_habitat_config_for_experiment(experiment_id, work_dir), f
+        )
+
+    opts = [
+        "BASE_TASK_CONFIG_PATH",
+        task_config_path,
+        "TASK_CONFIG.SIMULATOR.TYPE",
+        "SyntheticSim-v0",
+        "TASK_CONFIG.DATASET.TYPE",
+        "SyntheticPointNav-v1",
+        "TASK_CONFIG.DATASET.SYNTHETIC.NUM_SCENES",
+        str(args.num_envs),
+        "TASK_CONFIG.DATASET.SYNTHETIC.EPISODES_PER_SCENE",
+        str(args.episodes_per_scene),
+        "TASK_CONFIG.SEED",
+        str(args.seed),
+        "NUM_PROCESSES",
+        str(args.num_envs),
+        "NUM_UPDATES",
+        str(args.num_updates + args.warmup_updates),
+        "RL.PPO.num_steps",
+        str(args.num_steps),
+        "LOG_FILE",
+        os.path.join(work_dir, "train.log"),
+    ]
+    return get_config(exp_config_path, opts)
+
+
+def run_experiment(args, experiment_id):
+    r"""Runs the experiment in this process and returns its measurements."""
+    import numpy as np
+    import torch
+
+    from habitat_baselines.common.env_utils import construct_envs
+    from habitat_baselines.common.environments import get_env_class
+    from habitat_baselines.common.rollout_storage import RolloutStorage
+    from habitat_baselines.rl.ppo.ppo_trainer import PPOTrainer
+
+    class TimedPPOTrainer(PPOTrainer):
+        r"""Also accumulates the seconds spent running the policy."""
+
+        inference_time = 0.0
+
+        def _act(self, *args, **kwargs):
+            t_start = time.time()
+            outputs = super()._act(*args, **kwargs)
+            if self.device.type == "cuda":
+                torch.cuda.synchronize()
+            self.inference_time += time.time() - t_start
+            return outputs
+
+    random.seed(args.seed)
+    np.random.seed(args.seed)
+    torch.manual_seed(args.seed)
+
+    work_dir = tempfile.mkdtemp(prefix="throughput_benchmark_")
+    config = experiment_config(args, experiment_id, work_dir)
+    ppo_cfg = config.RL.PPO
+
+    trainer = TimedPPOTrainer(config)
+    trainer.policy_name = experiment_id
+    trainer.device = torch.device(args.device)
+    t_start = time.time()
+    trainer.envs = construct_envs(config, get_env_class(config.ENV_NAME))
+    env_setup_time = time.time() - t_start
+    trainer._setup_actor_critic_agent(ppo_cfg)
+    trainer._setup_inference_act(ppo_cfg)
+
+    rollouts = RolloutStorage(
+        ppo_cfg.num_steps,
+        trainer.envs.num_envs,
+        trainer.envs.observation_spaces[0],
+        trainer.envs.action_spaces[0],
+        ppo_cfg.hidden_size,
+        observation_storage=trainer._get_observation_storage(ppo_cfg),
+    )
+    rollouts.to(trainer.device)
+    rollouts.insert_observations(0, trainer.envs.reset())
+
+    current_episode_reward = torch.zeros(trainer.envs.num_envs, 1)
+    running_episode_stats = dict(
+        count=torch.zeros(trainer.envs.num_envs, 1),
+        reward=torch.zeros(trainer.envs.num_envs, 1),
+    )
+
+    def iteration():
+        pth_time = 0.0
+        env_time = 0.0
+        count_steps = 0
+        for _ in range(ppo_cfg.num_steps):
+            (
+                delta_pth_time,
+                delta_env_time,
+                delta_steps,
+            ) = trainer._collect_rollout_step(
+                rollouts, current_episode_reward, running_episode_stats
+            )
+            pth_time += delta_pth_time
+            env_time += delta_env_time
+            count_steps += delta_steps
+        update_time = trainer._update_agent(ppo_cfg, rollouts)[0]
+        return pth_time, env_time, update_time, count_steps
+
+    for _ in range(args.warmup_updates):
+        iteration()
+
+    trainer.inference_time = 0.0
+    pth_time = 0.0
+    env_time = 0.0
+    update_time = 0.0
+    count_steps = 0
+    t_start = time.time()
+    for _ in range(args.num_updates):
+        (
+            delta_pth_time,
+            delta_env_time,
+            delta_update_time,
+            delta_steps,
+        ) = iteration()
+        pth_time += delta_pth_time
+        env_time += delta_env_time
+        update_time += delta_update_time
+        count_steps += delta_steps
+    wall_time = time.time() - t_start
+
+    env_worker_peak_rss = [
+        peak_rss_mb(worker.pid)
+        for worker in trainer.envs._workers
+        if getattr(worker, "pid", None) is not None
+    ]
+    trainer.envs.close()
+
+    return dict(
+        experiment=experiment_id,
+        num_envs=args.num_envs,
+        num_steps=args.num_steps,
+        num_updates=args.num_updates,
+        device=args.device,
+        steps=count_steps,
+        wall_seconds=wall_time,
+        env_setup_seconds=env_setup_time,
+        env_seconds=env_time,
+        inference_seconds=trainer.inference_time,
+        rollout_other_seconds=pth_time - trainer.inference_time,
+        update_seconds=update_time,
+        sps=count_steps / wall_time,
+        trainer_peak_rss_mb=peak_rss_mb(),
+        env_worker_peak_rss_mb=max(env_worker_peak_rss, default=None),
+        env_workers_total_peak_rss_mb=sum(env_worker_peak_rss),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--experiments", type=str, nargs="+", default=EXPERIMENTS
+    )
+    parser.add_argument("--num-envs", type=int, default=4)
+    parser.add_argument("--num-steps", type=int, default=32)
+    parser.add_argument("--num-updates", type=int, default=5)
+    parser.add_argument("--warmup-updates", type=int, default=1)
+    parser.add_argument("--episodes-per-scene", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=100)
+    parser.add_argument("--device", type=str, default="cpu")
+    parser.add_argument("--output", type=str, default=None)
+    # runs a single experiment and writes its result to this file, used
+    # to give every experiment its own process
+    parser.add_argument("--result-file", type=str, default=None)
+    args = parser.parse_args()
+
+    if args.result_file is not None:
+        (experiment_id,) = args.experiments
+        with open(args.result_file, "w") as f:
+            json.dump(run_experiment(args, experiment_id), f)
+        return
+
+    results = dict(revision=_git_revision(), args=vars(args), results=[])
+    print(
+        "{:>14} {:>8} {:>8} {:>11} {:>8} {:>10} {:>11}".format(
+            "experiment",
+            "SPS",
+            "env s",
+            "inference s",
+            "update s",
+            "trainer MB",
+            "env peak MB",
+        )
+    )
+    for experiment_id in args.experiments:
+        with tempfile.NamedTemporaryFile(suffix=".json") as result_file:
+            command = [
+                sys.executable,
+                "-m",
+                "benchmarks.throughput_benchmark",
+                "--experiments",
+                experiment_id,
+                "--result-file",
+                result_file.name,
+            ]
+            for name in [
+                "num_envs",
+                "num_steps",
+                "num_updates",
+                "warmup_updates",
+                "episodes_per_scene",
+                "seed",
+                "device",
+            ]:
+                command += [
+                    "--" + name.replace("_", "-"),
+                    str(getattr(args, name)),
+                ]
+            if subprocess.call(command) != 0:
+                print("{:>14} failed".format(experiment_id))
+                continue
+            result = json.load(result_file)
+
+        results["results"].append(result)
+        print(
+            "{:>14} {:>8.1f} {:>8.2f} {:>11.2f} {:>8.2f} {:>10.0f} "
+            "{:>11.0f}".format(
+                experiment_id,
+                result["sps"],
+                result["env_seconds"],
+                result["inference_seconds"],
+                result["update_seconds"],
+                result["trainer_peak_rss_mb"],
+                result["env_worker_peak_rss_mb"] or 0,
+            )
+        )
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
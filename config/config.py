@@ -1,6 +1,3 @@
-import torch
-
-device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
 # DEVICE = 'cpu'
 EXPERIMENT_IDS = ['Baseline', 'BaselineMidLevel', 'DRRN', 'DRRNActualMap','DRRNSupervisedMap']
 
@@ -21,7 +18,15 @@ IMG_DIMENSIONS = (3, 256, 256)  # mid level reps are in colour right now
 MAP_DIMENSIONS = (2, 256, 256)
 MID_LEVEL_DIMENSIONS = (16, 16, 16)
 MAP_DOWNSAMPLE = 2 ** 3
+# Map encoder of the DRRN policy, 'MapPlanner' or the smaller 'CompactMapPlanner'
+MAP_PLANNER = 'MapPlanner'
 BATCHSIZE = 1
+# By default every PPO minibatch holds the whole rollout of one env. Setting
+# PPO_CHUNK_LENGTH > 0 (a divisor of the rollout length) makes minibatches of
+# rollout chunks of that many steps instead, so that PPO_NUM_MINI_BATCH no
+# longer depends on BATCHSIZE, e.g. 4 minibatches of 32-step chunks
+PPO_NUM_MINI_BATCH = BATCHSIZE
+PPO_CHUNK_LENGTH = 0
 
 """ Config to create image map dataset for supervised training of mapper architecture + RL architecture. """
 DATASET_SAVE_PERIOD = 20
@@ -32,4 +37,15 @@ MAP_SIZE = (5, 5)  # map size (in [m]), given a 256x256 map, picking map size =
 
 HABITAT_CONFIGS_PATH = 'configs/'
 
-DEBUG = False
\ No newline at end of file
+DEBUG = False
+
+
+def __getattr__(name):
+    # device is picked on first access, so importing the config does not
+    # import torch
+    if name == 'device':
+        import torch
+        global device
+        device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
+        return device
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -4,7 +4,7 @@ from shutil import copyfile
 
 import yaml
 
-from config.config import CURRENT_POLICY, BATCHSIZE, MAP_DIMENSIONS
+from config.config import CURRENT_POLICY, BATCHSIZE, MAP_DIMENSIONS, PPO_NUM_MINI_BATCH, PPO_CHUNK_LENGTH
 
 experiment_id_custom_details = dict(
     Baseline=dict(
@@ -52,13 +52,16 @@ def create_habitat_config_for_experiment(experiment_id, results_base_dir):
         NUM_UPDATES=5000,
         LOG_INTERVAL=10,
         LOG_FILE=f"{results_base_dir}/train.log",
+        # touch profiles/profile.trigger to profile the trainer and workers
+        PROFILE_TRIGGER_DIR=f"{results_base_dir}/profiles",
         CHECKPOINT_INTERVAL=200,
         RL=dict(
             PPO=dict(
                 # ppo params
                 clip_param=0.1,
                 ppo_epoch=4,
-                num_mini_batch=BATCHSIZE,
+                num_mini_batch=PPO_NUM_MINI_BATCH,
+                recurrent_chunk_length=PPO_CHUNK_LENGTH,
                 value_loss_coef=0.5,
                 entropy_coef=0.01,
                 lr=2.5e-4,
@@ -335,6 +335,13 @@ _C.DATASET.CONTENT_SCENES = ["*"]
 _C.DATASET.DATA_PATH = (
     "data/datasets/pointnav/habitat-test-scenes/v1/{split}/{split}.json.gz"
 )
+# -----------------------------------------------------------------------------
+# SYNTHETIC DATASET, generated on the floorplans of SyntheticSim-v0
+# -----------------------------------------------------------------------------
+_C.DATASET.SYNTHETIC = CN()
+_C.DATASET.SYNTHETIC.NUM_SCENES = 8
+_C.DATASET.SYNTHETIC.EPISODES_PER_SCENE = 100
+_C.DATASET.SYNTHETIC.MIN_GEODESIC_DISTANCE = 1.0  # in metres
 
 # -----------------------------------------------------------------------------
 
@@ -7,8 +7,18 @@ r"""Implements tasks and measurements needed for training and benchmarking of
 ``habitat.Agent`` inside ``habitat.Env``.
 """
 
-from collections import OrderedDict
-from typing import Any, Dict, Iterable, List, Optional, Type, Union
+import time
+from collections import OrderedDict, defaultdict
+from typing import (
+    Any,
+    DefaultDict,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Type,
+    Union,
+)
 
 import numpy as np
 
@@ -147,6 +157,7 @@ class Measurements:
     """
 
     measures: Dict[str, Measure]
+    timings: DefaultDict[str, float]
 
     def __init__(self, measures: Iterable[Measure]) -> None:
         """Constructor
@@ -155,6 +166,8 @@ class Measurements:
             :ref:`Measure` must be unique.
         """
         self.measures = OrderedDict()
+        # seconds spent in every measure since the timings were last cleared
+        self.timings = defaultdict(float)
         for measure in measures:
             assert (
                 measure.uuid not in self.measures
@@ -162,12 +175,16 @@ class Measurements:
             self.measures[measure.uuid] = measure
 
     def reset_measures(self, *args: Any, **kwargs: Any) -> None:
-        for measure in self.measures.values():
+        for uuid, measure in self.measures.items():
+            t_start = time.perf_counter()
             measure.reset_metric(*args, **kwargs)
+            self.timings[uuid] += time.perf_counter() - t_start
 
     def update_measures(self, *args: Any, **kwargs: Any) -> None:
-        for measure in self.measures.values():
+        for uuid, measure in self.measures.items():
+            t_start = time.perf_counter()
             measure.update_metric(*args, **kwargs)
+            self.timings[uuid] += time.perf_counter() - t_start
 
     def get_metrics(self) -> Metrics:
         r"""Collects measurement from all :ref:`Measure`\ s and returns it
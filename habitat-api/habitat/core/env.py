@@ -22,6 +22,13 @@ from habitat.sims import make_sim
 from habitat.tasks import make_task
 
 
+def _sim_config_without_scene(config: Config) -> Config:
+    sim_config = config.SIMULATOR.clone()
+    sim_config.defrost()
+    sim_config.SCENE = ""
+    return sim_config
+
+
 class Env:
     r"""Fundamental environment class for :ref:`habitat`.
 
@@ -71,19 +78,27 @@ class Env:
             "environment, use config.freeze()."
         )
         self._config = config
+        self._setup_dataset(dataset)
+        self._sim = make_sim(
+            id_sim=self._config.SIMULATOR.TYPE, config=self._config.SIMULATOR
+        )
+        self._setup_task()
+
+    def _setup_dataset(self, dataset: Optional[Dataset]) -> None:
         self._dataset = dataset
         self._current_episode_index = None
-        if self._dataset is None and config.DATASET.TYPE:
+        if self._dataset is None and self._config.DATASET.TYPE:
             self._dataset = make_dataset(
-                id_dataset=config.DATASET.TYPE, config=config.DATASET
+                id_dataset=self._config.DATASET.TYPE,
+                config=self._config.DATASET,
             )
         self._episodes = self._dataset.episodes if self._dataset else []
         self._current_episode = None
         iter_option_dict = {
             k.lower(): v
-            for k, v in config.ENVIRONMENT.ITERATOR_OPTIONS.items()
+            for k, v in self._config.ENVIRONMENT.ITERATOR_OPTIONS.items()
         }
-        iter_option_dict["seed"] = config.SEED
+        iter_option_dict["seed"] = self._config.SEED
         self._episode_iterator = self._dataset.get_episode_iterator(
             **iter_option_dict
         )
@@ -101,9 +116,7 @@ class Env:
         else:
             self.number_of_episodes = None
 
-        self._sim = make_sim(
-            id_sim=self._config.SIMULATOR.TYPE, config=self._config.SIMULATOR
-        )
+    def _setup_task(self) -> None:
         self._task = make_task(
             self._config.TASK.TYPE,
             config=self._config.TASK,
@@ -179,6 +192,21 @@ class Env:
     def get_metrics(self) -> Metrics:
         return self._task.measurements.get_metrics()
 
+    def pop_timings(self) -> Dict[str, float]:
+        r"""Returns the seconds spent in every sensor and measure since the
+        previous call, keyed by ``sensor.<uuid>`` and ``measure.<uuid>``.
+        """
+        timings = {}
+        for prefix, counters in (
+            ("sensor", self._sim.sensor_suite.timings),
+            ("sensor", self._task.sensor_suite.timings),
+            ("measure", self._task.measurements.timings),
+        ):
+            for uuid, seconds in counters.items():
+                timings["{}.{}".format(prefix, uuid)] = seconds
+            counters.clear()
+        return timings
+
     def _past_limit(self) -> bool:
         if (
             self._max_episode_steps != 0
@@ -295,6 +323,40 @@ class Env:
 
         self._sim.reconfigure(self._config.SIMULATOR)
 
+    def can_retarget(self, config: Config) -> bool:
+        r"""Whether :ref:`retarget` can move this env to config, which is
+        the case when the simulator config only differs by its scene.
+        """
+        return _sim_config_without_scene(
+            config
+        ) == _sim_config_without_scene(self._config)
+
+    def retarget(
+        self, config: Config, dataset: Optional[Dataset] = None
+    ) -> None:
+        r"""Moves the env to a new config and dataset, e.g. other scenes,
+        episodes or task measures, keeping its simulator and sensors alive
+        (with their loaded networks) instead of building new ones. The
+        simulator loads the scene of the first episode and the state its
+        sensors carried over from the previous episodes is cleared, so the
+        env behaves like a new one. Call :ref:`reset` before stepping.
+
+        :param config: new config, :ref:`can_retarget` must hold for it.
+        :param dataset: new dataset, made from config if :py:`None`.
+        """
+        assert config.is_frozen(), (
+            "Freeze the config before retargeting the "
+            "environment, use config.freeze()."
+        )
+        assert self.can_retarget(
+            config
+        ), "only the scene of the simulator config can be retargeted"
+        self._config = config
+        self._setup_dataset(dataset)
+        self._sim.reconfigure(self._config.SIMULATOR)
+        self._sim.sensor_suite.reset_state()
+        self._setup_task()
+
     def render(self, mode="rgb") -> np.ndarray:
         return self._sim.render(mode)
 
@@ -405,6 +467,20 @@ class RLEnv(gym.Env):
 
         return observations, reward, done, info
 
+    def can_retarget(self, config: Config) -> bool:
+        return self._env.can_retarget(config)
+
+    def retarget(
+        self, config: Config, dataset: Optional[Dataset] = None
+    ) -> None:
+        r"""Moves the env to a new config and dataset keeping its simulator,
+        see :ref:`Env.retarget`.
+        """
+        self._env.retarget(config, dataset)
+        self.observation_space = self._env.observation_space
+        self.action_space = self._env.action_space
+        self.number_of_episodes = self._env.number_of_episodes
+
     def seed(self, seed: Optional[int] = None) -> None:
         self._env.seed(seed)
 
@@ -4,9 +4,10 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
-from collections import OrderedDict
+import time
+from collections import OrderedDict, defaultdict
 from enum import Enum
-from typing import Any, Dict, Iterable, List, Optional, Union
+from typing import Any, DefaultDict, Dict, Iterable, List, Optional, Union
 
 import attr
 from gym import Space
@@ -85,6 +86,12 @@ class Sensor:
         """
         raise NotImplementedError
 
+    def reset_state(self) -> None:
+        r"""Clears the state the sensor carries from one observation to the
+        next, e.g. accumulated maps or the previous pose, as if it was just
+        created. Called when its env is retargeted.
+        """
+
     @property
     def current_scene_name(self):
         return self._sim._current_scene.split('/')[-1].split('.')[0]
@@ -95,24 +102,30 @@ class Observations(dict):
     """
 
     def __init__(
-        self, sensors: Dict[str, Sensor], *args: Any, **kwargs: Any
+        self,
+        sensors: Dict[str, Sensor],
+        *args: Any,
+        timings: Optional[Dict[str, float]] = None,
+        **kwargs: Any
     ) -> None:
         """Constructor
 
         :param sensors: list of sensors whose observations are fetched and
             packaged.
+        :param timings: if given, the seconds spent in every sensor are
+            added to it, keyed by sensor uuid.
         """
 
         if EXPERIMENT_ID_INDEX == 2 and len(sensors) == 4:
             uuids = ['rgb', 'midlevel', 'egomotion', 'midlevel_map']
-            data = []
-            for uuid in uuids:
-                data.append((uuid, sensors[uuid].get_observation(*args, **kwargs)))
         else:
-            data = [
-                (uuid, sensor.get_observation(*args, **kwargs))
-                for uuid, sensor in sensors.items()
-            ]
+            uuids = list(sensors)
+        data = []
+        for uuid in uuids:
+            t_start = time.perf_counter()
+            data.append((uuid, sensors[uuid].get_observation(*args, **kwargs)))
+            if timings is not None:
+                timings[uuid] += time.perf_counter() - t_start
         super().__init__(data)
 
 
@@ -191,6 +204,7 @@ class SensorSuite:
 
     sensors: Dict[str, Sensor]
     observation_spaces: SpaceDict
+    timings: DefaultDict[str, float]
 
     def __init__(self, sensors: Iterable[Sensor]) -> None:
         """Constructor
@@ -199,6 +213,8 @@ class SensorSuite:
             each sensor must be unique.
         """
         self.sensors = OrderedDict()
+        # seconds spent in every sensor since the timings were last cleared
+        self.timings = defaultdict(float)
         spaces: OrderedDict[str, Space] = OrderedDict()
         for sensor in sensors:
             assert (
@@ -211,11 +227,17 @@ class SensorSuite:
     def get(self, uuid: str) -> Sensor:
         return self.sensors[uuid]
 
+    def reset_state(self) -> None:
+        for sensor in self.sensors.values():
+            sensor.reset_state()
+
     def get_observations(self, *args: Any, **kwargs: Any) -> Observations:
         r"""Collects data from all sensors and returns it packaged inside
         :ref:`Observations`.
         """
-        return Observations(self.sensors, *args, **kwargs)
+        return Observations(
+            self.sensors, *args, timings=self.timings, **kwargs
+        )
 
 
 @attr.s(auto_attribs=True)
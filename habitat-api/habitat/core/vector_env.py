@@ -5,7 +5,9 @@
 # LICENSE file in the root directory of this source tree.
 
 import signal
+import time
 from multiprocessing.connection import Connection
+from multiprocessing.connection import wait as connection_wait
 from multiprocessing.context import BaseContext
 from queue import Queue
 from threading import Thread
@@ -31,6 +33,7 @@ from habitat.core.env import Env, Observations, RLEnv
 from habitat.core.logging import logger
 from habitat.core.utils import tile_images
 from habitat.utils import profiling_utils
+from habitat.utils.profile_trigger import ProfileTrigger
 
 try:
     # Use torch.multiprocessing if we can.
@@ -53,6 +56,12 @@ EPISODE_COMMAND = "current_episode"
 COUNT_EPISODES_COMMAND = "count_episodes"
 EPISODE_OVER = "episode_over"
 GET_METRICS = "get_metrics"
+SET_OBSERVATION_BUFFERS_COMMAND = "set_observation_buffers"
+RETARGET_COMMAND = "retarget"
+
+# seconds a ThreadedVectorEnv blocks on a pending env before polling all of
+# them again, queues cannot be waited on together
+READY_POLL_TIMEOUT = 1e-3
 
 
 def _make_env_fn(
@@ -70,6 +79,46 @@ def _make_env_fn(
     return habitat_env
 
 
+def _write_observation_buffers(
+    observations: Dict[str, Any], observation_buffers: Dict[str, Any]
+) -> Dict[str, Any]:
+    r"""Writes every observation that has a shared-memory buffer into it in
+    place.
+
+    :param observations: observations returned by the environment.
+    :param observation_buffers: this worker's slot of each shared buffer.
+    :return: the observations that still have to be sent through the pipe.
+    """
+    if len(observation_buffers) == 0:
+        return observations
+
+    import torch
+
+    remaining = {}
+    for sensor, value in observations.items():
+        buffer = observation_buffers.get(sensor)
+        if buffer is None or tuple(np.shape(value)) != tuple(buffer.shape):
+            remaining[sensor] = value
+        elif torch.is_tensor(value):
+            buffer.copy_(value)
+        else:
+            buffer.numpy()[...] = value
+    return remaining
+
+
+def _make_queue_poll_fn(queue: Queue) -> Callable[[float], bool]:
+    r"""Returns a function that tells whether :p:`queue` has an item to
+    read, with the same signature as :py:`Connection.poll`.
+    """
+
+    def poll(timeout: float = 0.0) -> bool:
+        if queue.empty() and timeout > 0:
+            time.sleep(timeout)
+        return not queue.empty()
+
+    return poll
+
+
 class VectorEnv:
     r"""Vectorized environment which creates multiple processes where each
     process runs its own environment. Main class for parallelization of
@@ -89,6 +138,12 @@ class VectorEnv:
     _mp_ctx: BaseContext
     _connection_read_fns: List[Callable[[], Any]]
     _connection_write_fns: List[Callable[[Any], None]]
+    _connection_poll_fns: List[Callable[[float], bool]]
+    _parent_connections: List[Connection]
+    _step_pending: List[bool]
+    observation_buffers: Dict[str, Any]
+    _observation_buffer_views: List[Dict[str, np.ndarray]]
+    _active_env_indices: List[int]
 
     def __init__(
         self,
@@ -97,6 +152,10 @@ class VectorEnv:
         auto_reset_done: bool = True,
         multiprocessing_start_method: str = "forkserver",
         workers_ignore_signals: bool = False,
+        use_shared_memory: bool = False,
+        profile_trigger_kwargs: Optional[Dict[str, Any]] = None,
+        retarget_env_fn: Optional[Callable[..., Union[Env, RLEnv]]] = None,
+        forkserver_preload: Optional[Sequence[str]] = None,
     ) -> None:
         """..
 
@@ -114,8 +173,33 @@ class VectorEnv:
             used, the subproccess  must be started before any other GPU useage.
         :param workers_ignore_signals: Whether or not workers will ignore SIGINT and SIGTERM
             and instead will only exit when :ref:`close` is called
+        :param use_shared_memory: preallocate one shared-memory buffer per
+            :py:`Box` sensor, sized from the observation space. Workers write
+            observations into their slot in place and only the remaining
+            (non-``Box``) observations, rewards, dones and infos are pickled
+            through the pipe. Observations returned by :ref:`step` and
+            :ref:`reset` are then views into these buffers and are
+            overwritten by the next call, so consume them before stepping
+            again.
+        :param profile_trigger_kwargs: if given, every worker creates a
+            :ref:`ProfileTrigger` with these arguments, named
+            ``worker<index>``, and polls it between commands.
+        :param retarget_env_fn: function called by :ref:`retarget` in every
+            worker as :py:`retarget_env_fn(env, *env_fn_args)`, returning the
+            env to use from then on, e.g. the same env moved to new scenes
+            with :ref:`env.Env.retarget`. If :py:`None`, :ref:`retarget`
+            closes the env of the worker and makes a new one with
+            :p:`make_env_fn`.
+        :param forkserver_preload: modules imported once by the forkserver
+            and inherited by every worker it forks, instead of being imported
+            again by each worker. Only applies if the forkserver of this
+            process was not started yet, modules that fail to import are
+            skipped.
         """
         self._is_waiting = False
+        self._profile_trigger_kwargs = profile_trigger_kwargs
+        self._retarget_env_fn = retarget_env_fn
+        self._use_shared_memory = use_shared_memory
         self._is_closed = True
 
         assert (
@@ -129,10 +213,16 @@ class VectorEnv:
         ).format(self._valid_start_methods, multiprocessing_start_method)
         self._auto_reset_done = auto_reset_done
         self._mp_ctx = mp.get_context(multiprocessing_start_method)
+        if (
+            multiprocessing_start_method == "forkserver"
+            and forkserver_preload is not None
+        ):
+            self._mp_ctx.set_forkserver_preload(list(forkserver_preload))
         self._workers = []
         (
             self._connection_read_fns,
             self._connection_write_fns,
+            self._connection_poll_fns,
         ) = self._spawn_workers(  # noqa
             env_fn_args,
             make_env_fn,
@@ -140,7 +230,17 @@ class VectorEnv:
         )
 
         self._is_closed = False
+        # whether the step sent by async_step_at to the env at each position
+        # was not read yet
+        self._step_pending = [False] * self._num_envs
+        self._paused = []
+        self._active_env_indices = list(range(self._num_envs))
+        self._setup_envs()
 
+    def _setup_envs(self) -> None:
+        r"""Fetches the spaces and episode counts of the envs of the workers
+        and sets up their observation buffers.
+        """
         for write_fn in self._connection_write_fns:
             write_fn((OBSERVATION_SPACE_COMMAND, None))
         self.observation_spaces = [
@@ -156,7 +256,84 @@ class VectorEnv:
         self.number_of_episodes = [
             read_fn() for read_fn in self._connection_read_fns
         ]
-        self._paused = []
+
+        self.observation_buffers = {}
+        self._observation_buffer_views = [{} for _ in range(self._num_envs)]
+        if self._use_shared_memory:
+            self._setup_observation_buffers()
+
+    def _setup_observation_buffers(self) -> None:
+        r"""Allocates a :py:`(num_envs, *shape)` shared-memory tensor for
+        every :py:`Box` sensor and hands each worker its slice.
+        """
+        import torch
+
+        for sensor, space in self.observation_spaces[0].spaces.items():
+            if not isinstance(space, gym.spaces.Box):
+                continue
+            dtype = torch.from_numpy(np.zeros(0, dtype=space.dtype)).dtype
+            self.observation_buffers[sensor] = torch.zeros(
+                (self._num_envs, *space.shape), dtype=dtype
+            ).share_memory_()
+
+        for index, write_fn in enumerate(self._connection_write_fns):
+            write_fn(
+                (
+                    SET_OBSERVATION_BUFFERS_COMMAND,
+                    {
+                        sensor: buffer[index]
+                        for sensor, buffer in self.observation_buffers.items()
+                    },
+                )
+            )
+            self._observation_buffer_views[index] = {
+                sensor: buffer[index].numpy()
+                for sensor, buffer in self.observation_buffers.items()
+            }
+        for read_fn in self._connection_read_fns:
+            read_fn()
+
+    def _merge_observation_buffers(self, index: int, result: Any) -> Any:
+        r"""Puts the shared-memory observations of the env at position
+        :p:`index` back into the (reduced) result sent through its pipe.
+        """
+        views = self._observation_buffer_views[index]
+        if len(views) == 0:
+            return result
+
+        if isinstance(result, tuple):
+            observations, *rest = result
+        else:
+            observations, rest = result, None
+
+        merged = {
+            sensor: view
+            for sensor, view in views.items()
+            if sensor not in observations
+        }
+        merged.update(observations)
+
+        if rest is None:
+            return merged
+        return (merged, *rest)
+
+    @property
+    def batched_observations(self) -> Dict[str, Any]:
+        r"""Shared-memory observations of the active environments as
+        :py:`(num_envs, ...)` tensors.
+
+        These are the :ref:`observation_buffers` themselves (no copy) unless
+        some environments are paused, in which case the active rows are
+        gathered. Empty if the env was not created with
+        :py:`use_shared_memory=True`.
+        """
+        if len(self._paused) == 0:
+            return self.observation_buffers
+
+        return {
+            sensor: buffer[self._active_env_indices]
+            for sensor, buffer in self.observation_buffers.items()
+        }
 
     @property
     def num_envs(self):
@@ -174,6 +351,8 @@ class VectorEnv:
         mask_signals: bool = False,
         child_pipe: Optional[Connection] = None,
         parent_pipe: Optional[Connection] = None,
+        profile_trigger_kwargs: Optional[Dict[str, Any]] = None,
+        retarget_env_fn: Optional[Callable] = None,
     ) -> None:
         r"""process worker for creating and interacting with the environment.
         """
@@ -185,9 +364,17 @@ class VectorEnv:
             signal.signal(signal.SIGUSR1, signal.SIG_IGN)
             signal.signal(signal.SIGUSR2, signal.SIG_IGN)
 
+        profile_trigger = None
+        if profile_trigger_kwargs is not None:
+            profile_trigger = ProfileTrigger(
+                install_signal_handler=not mask_signals,
+                **profile_trigger_kwargs
+            )
+
         env = env_fn(*env_fn_args)
         if parent_pipe is not None:
             parent_pipe.close()
+        observation_buffers = {}
         try:
             command, data = connection_read_fn()
             while command != CLOSE_COMMAND:
@@ -200,6 +387,9 @@ class VectorEnv:
                         observations, reward, done, info = env.step(**data)
                         if auto_reset_done and done:
                             observations = env.reset()
+                        observations = _write_observation_buffers(
+                            observations, observation_buffers
+                        )
                         profiling_utils.range_push("_worker_env send")
                         connection_write_fn((observations, reward, done, info))
                         profiling_utils.range_pop()  # _worker_env send
@@ -208,13 +398,37 @@ class VectorEnv:
                         observations = env.step(**data)
                         if auto_reset_done and env.episode_over:
                             observations = env.reset()
-                        connection_write_fn(observations)
+                        connection_write_fn(
+                            _write_observation_buffers(
+                                observations, observation_buffers
+                            )
+                        )
                     else:
                         raise NotImplementedError
 
                 elif command == RESET_COMMAND:
                     observations = env.reset()
-                    connection_write_fn(observations)
+                    connection_write_fn(
+                        _write_observation_buffers(
+                            observations, observation_buffers
+                        )
+                    )
+
+                elif command == SET_OBSERVATION_BUFFERS_COMMAND:
+                    observation_buffers = data
+                    connection_write_fn(None)
+
+                elif command == RETARGET_COMMAND:
+                    profiling_utils.range_push("_worker_env retarget")
+                    if retarget_env_fn is None:
+                        env.close()
+                        env = env_fn(*data)
+                    else:
+                        env = retarget_env_fn(env, *data)
+                    # the buffers are set again for the new spaces
+                    observation_buffers = {}
+                    profiling_utils.range_pop()  # _worker_env retarget
+                    connection_write_fn(None)
 
                 elif command == RENDER_COMMAND:
                     connection_write_fn(env.render(*data[0], **data[1]))
@@ -250,6 +464,9 @@ class VectorEnv:
                 else:
                     raise NotImplementedError
 
+                if profile_trigger is not None:
+                    profile_trigger.poll()
+
                 profiling_utils.range_push("_worker_env recv")
                 command, data = connection_read_fn()
                 profiling_utils.range_pop()  # _worker_env recv
@@ -259,6 +476,8 @@ class VectorEnv:
         except KeyboardInterrupt:
             logger.info("Worker KeyboardInterrupt")
         finally:
+            if profile_trigger is not None:
+                profile_trigger.stop()
             env.close()
         profiling_utils.range_pop()  # _worker_env
 
@@ -267,10 +486,17 @@ class VectorEnv:
         env_fn_args: Sequence[Tuple],
         make_env_fn: Callable[..., Union[Env, RLEnv]] = _make_env_fn,
         workers_ignore_signals: bool = False,
-    ) -> Tuple[List[Callable[[], Any]], List[Callable[[Any], None]]]:
+    ) -> Tuple[
+        List[Callable[[], Any]],
+        List[Callable[[Any], None]],
+        List[Callable[[float], bool]],
+    ]:
         parent_connections, worker_connections = zip(
             *[self._mp_ctx.Pipe(duplex=True) for _ in range(self._num_envs)]
         )
+        # indexed by env rather than by active position, through
+        # _active_env_indices, so that pausing envs leaves them in place
+        self._parent_connections = list(parent_connections)
         self._workers = []
         for worker_conn, parent_conn, env_args in zip(
             worker_connections, parent_connections, env_fn_args
@@ -286,6 +512,8 @@ class VectorEnv:
                     workers_ignore_signals,
                     worker_conn,
                     parent_conn,
+                    self._worker_profile_trigger_kwargs(len(self._workers)),
+                    self._retarget_env_fn,
                 ),
             )
             self._workers.append(ps)
@@ -295,8 +523,59 @@ class VectorEnv:
         return (
             [p.recv for p in parent_connections],
             [p.send for p in parent_connections],
+            [p.poll for p in parent_connections],
+        )
+
+    def _worker_profile_trigger_kwargs(
+        self, index: int
+    ) -> Optional[Dict[str, Any]]:
+        if self._profile_trigger_kwargs is None:
+            return None
+        return dict(
+            self._profile_trigger_kwargs, name="worker{}".format(index)
         )
 
+    def retarget(self, env_fn_args: Sequence[Tuple]) -> None:
+        r"""Points the workers to new envs, e.g. of other configs or scenes,
+        without starting new processes: every worker calls the
+        :p:`retarget_env_fn` given to the constructor with its new
+        arguments, or rebuilds its env with :p:`make_env_fn`. Paused envs
+        are resumed first. Call :ref:`reset` before stepping.
+
+        :param env_fn_args: tuple of args of every worker, as passed to the
+            constructor, one per worker.
+        """
+        assert not self._is_closed, "the workers of the env were closed"
+        self._drain_replies()
+        self.resume_all()
+        assert len(env_fn_args) == self._num_envs, (
+            "retargeting needs one env_fn_args per worker, "
+            "{} != {}".format(len(env_fn_args), self._num_envs)
+        )
+
+        for write_fn, args in zip(self._connection_write_fns, env_fn_args):
+            write_fn((RETARGET_COMMAND, args))
+        for read_fn in self._connection_read_fns:
+            read_fn()
+        self._setup_envs()
+
+    def _drain_replies(self) -> None:
+        r"""Reads the replies still in the pipes, of the last command sent to
+        every env or of the steps started with :ref:`async_step_at`, so that
+        the next command is not answered by a stale reply.
+        """
+        if self._is_waiting:
+            for read_fn in self._connection_read_fns:
+                read_fn()
+            self._is_waiting = False
+        else:
+            for read_fn, pending in zip(
+                self._connection_read_fns, self._step_pending
+            ):
+                if pending:
+                    read_fn()
+        self._step_pending = [False] * len(self._step_pending)
+
     def current_episodes(self):
         self._is_waiting = True
         for write_fn in self._connection_write_fns:
@@ -346,8 +625,10 @@ class VectorEnv:
         for write_fn in self._connection_write_fns:
             write_fn((RESET_COMMAND, None))
         results = []
-        for read_fn in self._connection_read_fns:
-            results.append(read_fn())
+        for index, read_fn in enumerate(self._connection_read_fns):
+            results.append(
+                self._merge_observation_buffers(index, read_fn())
+            )
         self._is_waiting = False
         return results
 
@@ -359,7 +640,11 @@ class VectorEnv:
         """
         self._is_waiting = True
         self._connection_write_fns[index_env]((RESET_COMMAND, None))
-        results = [self._connection_read_fns[index_env]()]
+        results = [
+            self._merge_observation_buffers(
+                index_env, self._connection_read_fns[index_env]()
+            )
+        ]
         self._is_waiting = False
         return results
 
@@ -372,10 +657,89 @@ class VectorEnv:
         """
         self._is_waiting = True
         self._connection_write_fns[index_env]((STEP_COMMAND, action))
-        results = [self._connection_read_fns[index_env]()]
+        results = [
+            self._merge_observation_buffers(
+                index_env, self._connection_read_fns[index_env]()
+            )
+        ]
         self._is_waiting = False
         return results
 
+    def async_step_at(
+        self, index_env: int, action: Union[int, str, Dict[str, Any]]
+    ) -> None:
+        r"""Asynchronously step in the index_env environment in the vector,
+        the result is collected with :ref:`wait_step_at`. Other environments
+        can be stepped and waited on in the meantime.
+
+        :param index_env: index of the environment to be stepped into
+        :param action: action to be taken
+        """
+        # Backward compatibility
+        if isinstance(action, (int, np.integer, str)):
+            action = {"action": {"action": action}}
+
+        self._connection_write_fns[index_env]((STEP_COMMAND, action))
+        self._step_pending[index_env] = True
+
+    def wait_step_at(self, index_env: int) -> Any:
+        r"""Wait for the step of the index_env environment started with
+        :ref:`async_step_at`.
+
+        :param index_env: index of the environment to wait for
+        :return: output of step method of indexed env.
+        """
+        result = self._connection_read_fns[index_env]()
+        self._step_pending[index_env] = False
+        return self._merge_observation_buffers(index_env, result)
+
+    def wait_step_ready(
+        self, index_envs: Sequence[int], min_ready: int = 1
+    ) -> Tuple[List[int], List[Any]]:
+        r"""Wait until at least :p:`min_ready` of the environments stepped
+        with :ref:`async_step_at` have finished and collect every one of them
+        that is done by then. The other environments keep simulating and can
+        be waited on later, so a slow environment does not block the others.
+
+        :param index_envs: indices of the environments with a pending step.
+        :param min_ready: number of environments to wait for, at most
+            :py:`len(index_envs)`.
+        :return: indices of the collected environments, in increasing order,
+            and the outputs of their step methods.
+        """
+        profiling_utils.range_push("wait_step_ready")
+        min_ready = min(min_ready, len(index_envs))
+        while True:
+            ready = [
+                index_env
+                for index_env in index_envs
+                if self._connection_poll_fns[index_env](0.0)
+            ]
+            if len(ready) >= min_ready:
+                break
+            self._wait_any(
+                [
+                    index_env
+                    for index_env in index_envs
+                    if index_env not in ready
+                ]
+            )
+
+        ready = sorted(ready)
+        outputs = [self.wait_step_at(index_env) for index_env in ready]
+        profiling_utils.range_pop()  # wait_step_ready
+        return ready, outputs
+
+    def _wait_any(self, index_envs: List[int]) -> None:
+        r"""Blocks until at least one of the envs at index_envs has a reply.
+        """
+        connection_wait(
+            [
+                self._parent_connections[self._active_env_indices[index_env]]
+                for index_env in index_envs
+            ]
+        )
+
     def async_step(self, data: List[Union[int, str, Dict[str, Any]]]) -> None:
         r"""Asynchronously step in the environments.
 
@@ -396,8 +760,10 @@ class VectorEnv:
         """
         profiling_utils.range_push("wait_step")
         observations = []
-        for read_fn in self._connection_read_fns:
-            observations.append(read_fn())
+        for index, read_fn in enumerate(self._connection_read_fns):
+            observations.append(
+                self._merge_observation_buffers(index, read_fn())
+            )
         self._is_waiting = False
         profiling_utils.range_pop()  # wait_step
         return observations
@@ -417,20 +783,18 @@ class VectorEnv:
         if self._is_closed:
             return
 
-        if self._is_waiting:
-            for read_fn in self._connection_read_fns:
-                read_fn()
+        self._drain_replies()
 
         for write_fn in self._connection_write_fns:
             write_fn((CLOSE_COMMAND, None))
 
-        for _, _, write_fn, _ in self._paused:
+        for _, _, write_fn, _, _, _, _ in self._paused:
             write_fn((CLOSE_COMMAND, None))
 
         for process in self._workers:
             process.join()
 
-        for _, _, _, process in self._paused:
+        for _, _, _, process, _, _, _ in self._paused:
             process.join()
 
         self._is_closed = True
@@ -445,21 +809,45 @@ class VectorEnv:
         only some are active (for example during the last episodes of running
         eval episodes).
         """
-        if self._is_waiting:
-            for read_fn in self._connection_read_fns:
-                read_fn()
+        self._drain_replies()
+        self._step_pending.pop(index)
         read_fn = self._connection_read_fns.pop(index)
         write_fn = self._connection_write_fns.pop(index)
+        poll_fn = self._connection_poll_fns.pop(index)
         worker = self._workers.pop(index)
-        self._paused.append((index, read_fn, write_fn, worker))
+        buffer_views = self._observation_buffer_views.pop(index)
+        env_index = self._active_env_indices.pop(index)
+        self._paused.append(
+            (
+                index,
+                read_fn,
+                write_fn,
+                poll_fn,
+                worker,
+                buffer_views,
+                env_index,
+            )
+        )
 
     def resume_all(self) -> None:
         r"""Resumes any paused envs.
         """
-        for index, read_fn, write_fn, worker in reversed(self._paused):
+        for (
+            index,
+            read_fn,
+            write_fn,
+            poll_fn,
+            worker,
+            buffer_views,
+            env_index,
+        ) in reversed(self._paused):
             self._connection_read_fns.insert(index, read_fn)
             self._connection_write_fns.insert(index, write_fn)
+            self._connection_poll_fns.insert(index, poll_fn)
+            self._step_pending.insert(index, False)
             self._workers.insert(index, worker)
+            self._observation_buffer_views.insert(index, buffer_views)
+            self._active_env_indices.insert(index, env_index)
         self._paused = []
 
     def call_at(
@@ -559,15 +947,25 @@ class ThreadedVectorEnv(VectorEnv):
     performance.
     """
 
+    def _wait_any(self, index_envs: List[int]) -> None:
+        # block on a straggler for a short while instead of spinning
+        self._connection_poll_fns[index_envs[0]](READY_POLL_TIMEOUT)
+
     def _spawn_workers(
         self,
         env_fn_args: Sequence[Tuple],
         make_env_fn: Callable[..., Env] = _make_env_fn,
         workers_ignore_signals: bool = False,
-    ) -> Tuple[List[Callable[[], Any]], List[Callable[[Any], None]]]:
+    ) -> Tuple[
+        List[Callable[[], Any]],
+        List[Callable[[Any], None]],
+        List[Callable[[float], bool]],
+    ]:
         parent_read_queues, parent_write_queues = zip(
             *[(Queue(), Queue()) for _ in range(self._num_envs)]
         )
+        # threads talk through queues, which cannot be waited on
+        self._parent_connections = []
         self._workers = []
         for parent_read_queue, parent_write_queue, env_args in zip(
             parent_read_queues, parent_write_queues, env_fn_args
@@ -581,6 +979,12 @@ class ThreadedVectorEnv(VectorEnv):
                     env_args,
                     self._auto_reset_done,
                 ),
+                kwargs=dict(
+                    profile_trigger_kwargs=self._worker_profile_trigger_kwargs(
+                        len(self._workers)
+                    ),
+                    retarget_env_fn=self._retarget_env_fn,
+                ),
             )
             self._workers.append(thread)
             thread.daemon = True
@@ -588,4 +992,5 @@ class ThreadedVectorEnv(VectorEnv):
         return (
             [q.get for q in parent_read_queues],
             [q.put for q in parent_write_queues],
+            [_make_queue_poll_fn(q) for q in parent_read_queues],
         )
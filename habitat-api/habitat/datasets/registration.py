@@ -9,6 +9,9 @@ from habitat.core.registry import registry
 from habitat.datasets.eqa import _try_register_mp3d_eqa_dataset
 from habitat.datasets.object_nav import _try_register_objectnavdatasetv1
 from habitat.datasets.pointnav import _try_register_pointnavdatasetv1
+from habitat.datasets.synthetic import (
+    _try_register_syntheticpointnavdatasetv1,
+)
 from habitat.datasets.vln import _try_register_r2r_vln_dataset
 
 
@@ -23,4 +26,5 @@ def make_dataset(id_dataset, **kwargs):
 _try_register_objectnavdatasetv1()
 _try_register_mp3d_eqa_dataset()
 _try_register_pointnavdatasetv1()
+_try_register_syntheticpointnavdatasetv1()
 _try_register_r2r_vln_dataset()
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from habitat.core.dataset import Dataset
+from habitat.core.registry import registry
+
+
+def _try_register_syntheticpointnavdatasetv1():
+    try:
+        from habitat.datasets.synthetic.synthetic_pointnav_dataset import (
+            SyntheticPointNavDatasetV1,
+        )
+
+        has_synthetic_pointnav = True
+    except ImportError as e:
+        has_synthetic_pointnav = False
+        synthetic_pointnav_import_error = e
+
+    if not has_synthetic_pointnav:
+
+        @registry.register_dataset(name="SyntheticPointNav-v1")
+        class SyntheticPointNavDatasetImportError(Dataset):
+            def __init__(self, *args, **kwargs):
+                raise synthetic_pointnav_import_error
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import math
+from typing import List, Optional
+
+import numpy as np
+
+from habitat.config import Config
+from habitat.core.dataset import ALL_SCENES_MASK, Dataset
+from habitat.core.registry import registry
+from habitat.sims.synthetic.synthetic_simulator import (
+    SyntheticFloorplan,
+    scene_seed,
+)
+from habitat.tasks.nav.nav import NavigationEpisode, NavigationGoal
+
+
+def generate_synthetic_episodes(
+    scene: str, num_episodes: int, min_geodesic_distance: float
+) -> List[NavigationEpisode]:
+    r"""Generates the point navigation episodes of a synthetic scene, the
+    same ones on every call.
+
+    The goals are navigable for the default agent radius, every start is
+    connected to its goal and at least min_geodesic_distance away from it.
+    """
+    floorplan = SyntheticFloorplan(scene)
+    rng = np.random.RandomState(scene_seed(scene))
+    episodes = []
+    while len(episodes) < num_episodes:
+        goal = floorplan.sample_navigable_point(rng)
+        distances = floorplan.distance_field([goal])
+        starts = np.nonzero(
+            np.isfinite(distances) & (distances >= min_geodesic_distance)
+        )[0]
+        if len(starts) == 0:
+            continue
+
+        start = starts[rng.randint(len(starts))]
+        heading = rng.uniform(0, 2 * math.pi)
+        episodes.append(
+            NavigationEpisode(
+                episode_id=str(len(episodes)),
+                scene_id=scene,
+                start_position=floorplan.position(
+                    floorplan.node_cells[start]
+                ).tolist(),
+                start_rotation=[
+                    0.0,
+                    math.sin(heading / 2),
+                    0.0,
+                    math.cos(heading / 2),
+                ],
+                goals=[NavigationGoal(position=goal)],
+                info={"geodesic_distance": float(distances[start])},
+            )
+        )
+    return episodes
+
+
+@registry.register_dataset(name="SyntheticPointNav-v1")
+class SyntheticPointNavDatasetV1(Dataset):
+    r"""Point navigation episodes on the floorplans of
+    :ref:`SyntheticSim`, generated on load instead of read from disk.
+
+    The scenes of a split are :py:`synthetic/{split}_{index}` for the
+    first :py:`SYNTHETIC.NUM_SCENES` indices.
+    """
+
+    episodes: List[NavigationEpisode]
+
+    @staticmethod
+    def check_config_paths_exist(config: Config) -> bool:
+        return True
+
+    @classmethod
+    def get_scenes_to_load(cls, config: Config) -> List[str]:
+        return [
+            "synthetic/{}_{}".format(config.SPLIT, index)
+            for index in range(config.SYNTHETIC.NUM_SCENES)
+        ]
+
+    def __init__(self, config: Optional[Config] = None) -> None:
+        self.episodes = []
+
+        if config is None:
+            return
+
+        scenes = config.CONTENT_SCENES
+        if ALL_SCENES_MASK in scenes:
+            scenes = self.get_scenes_to_load(config)
+
+        for scene in scenes:
+            self.episodes.extend(
+                generate_synthetic_episodes(
+                    scene,
+                    config.SYNTHETIC.EPISODES_PER_SCENE,
+                    config.SYNTHETIC.MIN_GEODESIC_DISTANCE,
+                )
+            )
@@ -21,6 +21,9 @@ def _try_register_habitat_sim():
             HabitatSimV1ActionSpaceConfiguration,
         )
     else:
+        # the sensors only need the Simulator interface, keep them available
+        # to the other simulators
+        from habitat.sims.habitat_simulator import sensors
 
         @registry.register_simulator(name="Sim-v0")
         class HabitatSimImportError(Simulator):
@@ -9,11 +9,17 @@ from typing import Dict
 
 import attr
 
-import habitat_sim
 from habitat.core.registry import registry
 from habitat.core.simulator import ActionSpaceConfiguration, Config
 from habitat.core.utils import Singleton
 
+# The action names are shared by every simulator, only the action space
+# configurations below need habitat_sim
+try:
+    import habitat_sim
+except ImportError:
+    habitat_sim = None
+
 
 class _DefaultHabitatSimActions(Enum):
     STOP = 0
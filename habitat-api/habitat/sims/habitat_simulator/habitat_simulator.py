@@ -3,66 +3,34 @@
 # Copyright (c) Facebook, Inc. and its affiliates.
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
-import os.path
-from os import stat
-import cv2.cv2
-import torch
-from typing import Any, List, Optional, Union
+from typing import Any, List, Optional
 
 import numpy as np
 from gym import spaces
 
 import habitat_sim
 
-import numpy as np
-import scipy.ndimage as nd
-from matplotlib.transforms import Affine2D
-
-from mapper.map import convert_midlevel_to_map
-from mapper.mid_level.decoder import UpResNet
-from mapper.mid_level.encoder import mid_level_representations
-from mapper.mid_level.fc import FC
-from mapper.transform import egomotion_transform
-from mapper.update import update_map
-
-try:
-    import cupy
-    import cupyx.scipy.ndimage as ndc
-    CUPYAVAILABLE = True
-    print('Using cupyx')
-except ImportError:
-    print("cuda not enabled for affine transforms")
-    CUPYAVAILABLE = False
-
-import habitat
-from config.config import MAP_DIMENSIONS, MAP_SIZE, MAP_DOWNSAMPLE, DATASET_SAVE_PERIOD, DATASET_SAVE_FOLDER, \
-    START_IMAGE_NUMBER, MID_LEVEL_DIMENSIONS, DEBUG, REPRESENTATION_NAMES, device, RESIDUAL_LAYERS_PER_BLOCK, \
-    RESIDUAL_NEURON_CHANNEL, RESIDUAL_SIZE, STRIDES, BATCHSIZE
 from habitat.core.dataset import Episode
-from habitat.core.logging import logger
 from habitat.core.registry import registry
 from habitat.core.simulator import (
     AgentState,
     Config,
-    DepthSensor,
     Observations,
-    RGBSensor,
-    SemanticSensor,
-    Sensor,
     SensorSuite,
     ShortestPathPoint,
     Simulator,
-    SensorTypes,
 )
 from habitat.core.spaces import Space
+from habitat.sims.habitat_simulator.sensors import (  # noqa: F401
+    RGBSENSOR_DIMENSION,
+    AgentPositionSensor,
+    HabitatSimMapSensor,
+    HabitatSimMidLevelMapSensor,
+    HabitatSimMidLevelSensor,
+    HabitatSimRGBSensor,
+    check_sim_obs,
+)
 from habitat.utils import profiling_utils
-from habitat.utils.visualizations import fog_of_war, maps
-
-import matplotlib.pyplot as plt
-
-from habitat.utils.visualizations.maps import quat_to_angle_axis
-
-RGBSENSOR_DIMENSION = 3
 
 
 def overwrite_config(config_from: Config, config_to: Any) -> None:
@@ -87,325 +55,6 @@ def overwrite_config(config_from: Config, config_to: Any) -> None:
             setattr(config_to, attr.lower(), if_config_to_lower(value))
 
 
-def check_sim_obs(obs, sensor):
-    assert obs is not None, (
-        "Observation corresponding to {} not present in "
-        "simulator's observations".format(sensor.uuid)
-    )
-
-
-@registry.register_sensor
-class HabitatSimRGBSensor(RGBSensor):
-    sim_sensor_type: habitat_sim.SensorType
-
-    def __init__(self, sim, config):
-        self._sim = sim
-        self.sim_sensor_type = habitat_sim.SensorType.COLOR
-        super().__init__(config=config)
-        self.image_number = 0
-        self.prev_pose = None
-
-    def _get_observation_space(self, *args: Any, **kwargs: Any):
-        return spaces.Box(
-            low=0,
-            high=255,
-            shape=(self.config.HEIGHT, self.config.WIDTH, RGBSENSOR_DIMENSION),
-            dtype=np.uint8,
-        )
-
-    def get_observation(self, sim_obs):
-        obs = sim_obs.get(self.uuid, None)
-        check_sim_obs(obs, self)
-
-        # remove alpha channel
-        obs = obs[:, :, :RGBSENSOR_DIMENSION]
-
-        # if self.image_number % DATASET_SAVE_PERIOD == 0:
-            # print('Saving RGB image: ', self.image_number)
-            # plt.imsave(os.path.join(DATASET_SAVE_FOLDER, 'images', f'rgb_{self.current_scene_name}_{str((self.image_number // DATASET_SAVE_PERIOD) + START_IMAGE_NUMBER)}.jpeg'), obs)
-
-        self.image_number = self.image_number + 1
-        return obs
-
-
-@registry.register_sensor(name='MIDLEVEL')
-class HabitatSimMidLevelSensor(Sensor):
-    """ Holds mid level encodings """
-
-    sim_sensor_type: habitat_sim.SensorType
-
-    def __init__(self, sim, config):
-        self._sim = sim
-        self.sim_sensor_type = habitat_sim.SensorType.NONE
-        super().__init__(config=config)
-
-    def _get_uuid(self, *args: Any, **kwargs: Any) -> str:
-        return 'midlevel'
-
-    def _get_sensor_type(self, *args: Any, **kwargs: Any) -> SensorTypes:
-        return self.sim_sensor_type
-
-    def _get_observation_space(self, *args: Any, **kwargs: Any):
-        return spaces.Box(
-            low=0,
-            high=255,
-            shape=MID_LEVEL_DIMENSIONS,
-            dtype=np.uint8,
-        )
-
-    def get_observation(self, sim_obs):
-        obs = sim_obs.get('rgb', None)
-        check_sim_obs(obs, self)
-
-        # remove alpha channel
-        obs = obs[:, :, :RGBSENSOR_DIMENSION]
-
-        obs = torch.Tensor(obs)
-        obs = obs.to(device)
-        obs = torch.transpose(obs, 0, 2)
-        obs = obs.unsqueeze(0)
-
-        if DEBUG:
-            print(f"Encoding image of shape {obs.shape} with mid level encoders.")
-        obs = mid_level_representations(obs, REPRESENTATION_NAMES)
-        if DEBUG:
-            print(f'Returning encoded representation of shape {obs.shape}.')
-        sim_obs['midlevel'] = obs
-        obs = obs[0, :, :, :]
-        return obs
-
-
-@registry.register_sensor(name="EGOMOTION")
-class AgentPositionSensor(Sensor):
-    def __init__(self, sim, config):
-        self.sim_sensor_type = habitat_sim.SensorType.NONE
-        super().__init__(config=config)
-        self._sim = sim
-        self.prev_pose = None
-
-    # Defines the name of the sensor in the sensor suite dictionary
-    def _get_uuid(self, *args, **kwargs):
-        return "egomotion"
-
-    # Defines the type of the sensor
-    def _get_sensor_type(self, *args, **kwargs):
-        return self.sim_sensor_type
-
-    # Defines the size and range of the observations of the sensor
-    def _get_observation_space(self, *args, **kwargs):
-        return spaces.Box(
-            low=np.finfo(np.float32).min,
-            high=np.finfo(np.float32).max,
-            shape=(1,1,3),
-            dtype=np.float32,
-        )
-
-    # This is called whenver reset is called or an action is taken
-    def get_observation(self, sim_obs) -> Any:
-        pos = (self._sim.get_agent_state().position[0],self._sim.get_agent_state().position[2])
-        sim_quat = self._sim.get_agent_state().rotation
-        alpha = -quat_to_angle_axis(sim_quat)[0] + np.pi/2
-
-        state = np.array([pos[0],pos[1],alpha])
-
-        if self.prev_pose is None:
-            self.prev_pose = state
-            initial_displacement = torch.Tensor(np.zeros((1, 1, 3)))
-            initial_displacement = initial_displacement.to(device)
-            sim_obs['egomotion'] = initial_displacement
-            return initial_displacement
-
-        world_displacement = state - self.prev_pose  # displacement in the world frame
-        world_to_robot_transformation_matrix = Affine2D().rotate_around(0, 0, np.pi/2-self.prev_pose[2]).get_matrix()  # negative rotation to compensate for positive rotation
-        robot_displacement = torch.Tensor(world_to_robot_transformation_matrix @ world_displacement)
-        robot_displacement = robot_displacement.to(device)
-        robot_displacement = torch.unsqueeze(robot_displacement, 0)
-        robot_displacement = torch.unsqueeze(robot_displacement, 0)
-        self.prev_pose = state
-        sim_obs['egomotion'] = robot_displacement
-        return robot_displacement
-
-
-@registry.register_sensor(name='MIDLEVEL_MAP_SENSOR')
-class HabitatSimMidLevelMapSensor(Sensor):
-    """ Holds the map generated from mid level representations. """
-
-    sim_sensor_type: habitat_sim.SensorType
-
-    def __init__(self, sim, config):
-        self._sim = sim
-        self.sim_sensor_type = habitat_sim.SensorType.NONE
-        super().__init__(config=config)
-        # zero confidence, so this is not taken into account in first map update.
-        self.previous_map = torch.zeros((BATCHSIZE, *MAP_DIMENSIONS))
-        self.previous_map = self.previous_map.to(device)
-        # self.previous_map.requires_grad_(True)
-        self.fc = FC()
-        self.fc.to(device)
-        self.upresnet = UpResNet(
-            layers=RESIDUAL_LAYERS_PER_BLOCK,
-            channels=RESIDUAL_NEURON_CHANNEL,
-            sizes=RESIDUAL_SIZE,
-            strides=STRIDES
-        )
-        self.upresnet.to(device)
-
-    def _get_uuid(self, *args: Any, **kwargs: Any) -> str:
-        return 'midlevel_map'
-
-    def _get_sensor_type(self, *args: Any, **kwargs: Any) -> SensorTypes:
-        return self.sim_sensor_type
-
-    def _get_observation_space(self, *args: Any, **kwargs: Any):
-        return spaces.Box(
-            low=0,
-            high=1,
-            shape=MAP_DIMENSIONS,
-            dtype=np.float32,
-        )
-
-    def get_observation(self, sim_obs):
-        # return previous map for policy, but ensure to calculate the new map for the next update
-        return_value = self.previous_map.clone()
-        midlevel_obs = sim_obs["midlevel"]
-        egomotion_obs = sim_obs["egomotion"]
-        decoded_map = convert_midlevel_to_map(midlevel_obs, self.fc, self.upresnet)
-        dx = egomotion_obs
-        previous_map = egomotion_transform(self.previous_map, dx)
-        with torch.no_grad():
-            new_map = update_map(decoded_map, previous_map)
-            self.previous_map = new_map
-        return return_value[0, :, :, :]
-
-
-@registry.register_sensor(name='MAP_SENSOR')
-class HabitatSimMapSensor(Sensor):
-    sim_sensor_type: habitat_sim.SensorType
-    """
-        Custom class to create a map sensor.
-    """
-
-    def __init__(self, sim, config):
-        # self.sim_sensor_type = habitat_sim.SensorType.TENSOR ----> TENSOR DOESN'T EXIST IN 2019 TENSORFLOW :(
-        self.sim_sensor_type = habitat_sim.SensorType.COLOR
-        super().__init__(config=config)
-        self._sim = sim
-        self.image_number = 0
-        self.cone = self.vis_cone((MAP_DIMENSIONS[1], MAP_DIMENSIONS[2]), np.pi/1.1)
-        self.map_scale_factor = 4
-        self.map_upsample_factor = 2
-        self.global_map = None
-        self.origin = None
-        self.displacements = []
-
-    # Defines the name of the sensor in the sensor suite dictionary
-    def _get_uuid(self, *args: Any, **kwargs: Any) -> str:
-        return 'map'
-
-    # Defines the type of the sensor
-    def _get_sensor_type(self, *args: Any, **kwargs: Any) -> SensorTypes:
-        return self.sim_sensor_type
-
-    # Defines the size and range of the observations of the sensor
-    def _get_observation_space(self, *args: Any, **kwargs: Any) -> Space:
-        return spaces.Box(
-            low=0,
-            high=1,
-            shape=(MAP_DIMENSIONS[1], MAP_DIMENSIONS[2], MAP_DIMENSIONS[0]),
-            dtype=np.uint8,
-        )
-
-    def vis_cone(self, map_size, fov):
-        cone = np.zeros(map_size)
-
-        ci = np.floor(map_size[0]/2)
-        cj = np.floor(map_size[1]/2)
-        for ii in range(map_size[0]):
-            for jj in range(map_size[1]):
-                di = ii - ci
-                dj = jj - cj
-                angle = np.arctan2(dj, -di)
-                if((- fov/2)<angle<fov/2):
-                    cone[ii,jj] = 1
-                else:
-                    cone[ii,jj] = 0
-
-        return cone
-
-    def compute_global_map(self):
-        self.global_map = maps.get_topdown_map_sensor( # this is kinda not great, ideally we should only compute a map on reset and just reuse the same map file every step (differently translated)
-                sim=self._sim,
-                map_resolution=(MAP_DIMENSIONS[1] * self.map_scale_factor // self.map_upsample_factor, MAP_DIMENSIONS[2] * self.map_scale_factor // self.map_upsample_factor),
-                map_size=(MAP_SIZE[0]* self.map_scale_factor, MAP_SIZE[1]* self.map_scale_factor),
-            )
-        self.global_map = cv2.cv2.resize(self.global_map, (MAP_DIMENSIONS[1] * self.map_scale_factor, MAP_DIMENSIONS[2] * self.map_scale_factor))
-        # Compute origin
-
-    # This is called whenever reset is called or an action is taken
-    def get_observation(self, _) -> Any:
-
-        pos = (self._sim.get_agent_state().position[0],self._sim.get_agent_state().position[2])
-        sim_quat = self._sim.get_agent_state().rotation
-        alpha = -quat_to_angle_axis(sim_quat)[0] + np.pi/2
-
-        if self.global_map is None:
-            self.compute_global_map()
-            self.origin = np.array([pos[0], pos[1], alpha])
-            # plt.imsave('debug/global_map' + '.jpeg', self.global_map)
-
-        state = np.array([pos[0],pos[1],alpha])
-
-        world_displacement = state - self.origin  # displacement in the world frame
-
-        world_to_map_transformation_matrix = Affine2D().rotate_around(0, 0, np.pi/2-self.origin[2]).get_matrix()  # negative rotation to compensate for positive rotation
-        map_displacement = world_to_map_transformation_matrix @ world_displacement
-
-        di = np.floor(map_displacement[0] * (MAP_DIMENSIONS[1]/MAP_SIZE[0]))
-        dj = np.floor(map_displacement[1] * (MAP_DIMENSIONS[2]/MAP_SIZE[1]))
-
-        width = self.global_map.shape[0]
-        height = self.global_map.shape[1]
-        T = (Affine2D().rotate_around(width//2,height//2,-map_displacement[2]) + Affine2D().translate(tx=dj, ty=di)).get_matrix()
-
-        global_map_copy = np.copy(self.global_map)
-
-        if CUPYAVAILABLE:
-            output_map = cupy.asnumpy(ndc.affine_transform(cupy.asarray(global_map_copy), cupy.asarray(T)))
-        else:
-            output_map = nd.affine_transform(global_map_copy, T)
-
-        cy = height // 2
-        cx = width // 2
-
-        circle_map = cv2.merge((global_map_copy*128,global_map_copy*128,global_map_copy*128))
-        circle_map = cv2.circle(circle_map, (int(di+cx),int(dj+cy)), 3, (255,0,0), 2)
-
-        output_map = output_map[cx-width//(2*self.map_scale_factor):cx+width//(2*self.map_scale_factor),\
-                                cy-width//(2*self.map_scale_factor):cy+height//(2*self.map_scale_factor)]
-
-        output_map = self.cone * output_map
-
-        if self.image_number % DATASET_SAVE_PERIOD == 0:
-            self.displacements.append(np.concatenate((np.array([self.image_number]), map_displacement, np.array([di, dj]))))
-            if self.image_number == 1200:
-                with open('data/nuevo_displacements.npy', 'wb') as f:
-                    np.save(f, np.array(self.displacements))
-            # plt.imsave(os.path.join(DATASET_SAVE_FOLDER, 'maps', f'map_{self.current_scene_name}_{str((self.image_number // DATASET_SAVE_PERIOD) + START_IMAGE_NUMBER)}.jpeg'), output_map)
-            # plt.imsave(os.path.join(DATASET_SAVE_FOLDER, 'circle_maps', f'circle_map_{self.current_scene_name}_{str((self.image_number // DATASET_SAVE_PERIOD) + START_IMAGE_NUMBER)}.jpeg'), circle_map)
-
-        output_map = torch.unsqueeze(torch.from_numpy(output_map),0).to(torch.float32)
-        confmap = torch.unsqueeze(torch.from_numpy(self.cone),0).to(torch.float32)
-        output_map = torch.cat((output_map,confmap), dim=0)
-        output_map = output_map.permute(1, 2, 0)
-
-        # Assert we have only map and confidence channels
-        assert output_map.shape[2] == MAP_DIMENSIONS[0]
-
-        self.image_number = self.image_number + 1
-
-        return output_map
-
-
 @registry.register_simulator(name="Sim-v0")
 class HabitatSim(habitat_sim.Simulator, Simulator):
     r"""Simulator wrapper over habitat-sim
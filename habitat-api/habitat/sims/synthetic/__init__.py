@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from habitat.core.registry import registry
+from habitat.core.simulator import Simulator
+
+
+def _try_register_synthetic_sim():
+    try:
+        import scipy
+
+        has_scipy = True
+    except ImportError as e:
+        has_scipy = False
+        scipy_import_error = e
+
+    if has_scipy:
+        from habitat.sims.synthetic.synthetic_simulator import SyntheticSim
+    else:
+
+        @registry.register_simulator(name="SyntheticSim-v0")
+        class SyntheticSimImportError(Simulator):
+            def __init__(self, *args, **kwargs):
+                raise scipy_import_error
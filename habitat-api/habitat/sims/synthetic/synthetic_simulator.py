@@ -0,0 +1,641 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+r"""Stand-in simulator for benchmarking without habitat-sim or scene data.
+
+Every scene id is turned into a procedurally generated floorplan (rooms cut
+by walls with doors, plus a few box obstacles per room) on a square grid.
+The navigable cells of the grid are the navmesh: geodesic distances are the
+exact shortest paths on the 8-connected grid, observations are raycast from
+the grid, which costs about as much per step as a cheap renderer.
+The same scene id always gives the same floorplan.
+"""
+
+import math
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import scipy.ndimage as nd
+from gym import spaces
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from habitat.core.dataset import Episode
+from habitat.core.registry import registry
+from habitat.core.simulator import (
+    AgentState,
+    Config,
+    Observations,
+    SensorSuite,
+    SensorTypes,
+    ShortestPathPoint,
+    Simulator,
+)
+from habitat.core.spaces import Space
+from habitat.sims.habitat_simulator.actions import HabitatSimActions
+from habitat.utils import profiling_utils
+from habitat.utils.geometry_utils import quaternion_from_coeff
+
+FLOORPLAN_SIZE = 12.0  # side of the square floorplan in metres
+CELL_SIZE = 0.05  # side of a navmesh grid cell in metres
+WALL_THICKNESS = 0.1
+WALL_HEIGHT = 2.5
+MIN_ROOM_SIZE = 2.5  # rooms are not split below twice this size
+DOOR_WIDTH = 1.0
+OBSTACLES_PER_ROOM = 2
+# obstacles keep this clearance to the walls so that doors stay reachable
+OBSTACLE_MARGIN = 0.6
+MAX_DEPTH = 10.0
+# bound on the cached distance fields, one per set of goals
+DISTANCE_CACHE_SIZE = 64
+
+# 8-connected neighbourhood, the other half of the edges is symmetric
+_NEIGHBOUR_OFFSETS = [(0, 1), (1, 0), (1, 1), (1, -1)]
+
+
+def scene_seed(scene: str) -> int:
+    r"""Seed of the floorplan of scene, stable across processes and runs."""
+    return zlib.crc32(scene.encode("utf-8"))
+
+
+class SyntheticFloorplan:
+    r"""Procedurally generated floorplan of a scene and its grid navmesh.
+
+    World coordinates map to the grid as :py:`x -> column`, :py:`z -> row`,
+    the floor is at :py:`y = 0`.
+
+    Args:
+        scene: scene id, seeds the floorplan.
+        agent_radius: cells closer than this to an obstacle are not
+            navigable.
+    """
+
+    def __init__(self, scene: str, agent_radius: float = 0.1) -> None:
+        self.scene = scene
+        rng = np.random.RandomState(scene_seed(scene))
+        self.size = int(round(FLOORPLAN_SIZE / CELL_SIZE))
+        wall = max(1, int(round(WALL_THICKNESS / CELL_SIZE)))
+
+        # -1 for walls, room index for the cells of a room, obstacles get
+        # indices after the rooms
+        self.labels = np.full((self.size, self.size), -1, dtype=np.int32)
+        rooms: List[Tuple[int, int, int, int]] = []
+        doors = np.zeros_like(self.labels, dtype=bool)
+        self._split(
+            rng,
+            (wall, wall, self.size - wall, self.size - wall),
+            wall,
+            rooms,
+            doors,
+        )
+        for index, (r0, c0, r1, c1) in enumerate(rooms):
+            self.labels[r0:r1, c0:c1] = index
+        # a door belongs to the closest room
+        self.labels[doors] = self._closest_labels()[doors]
+        self.num_rooms = len(rooms)
+
+        label = self.num_rooms
+        margin = int(round(OBSTACLE_MARGIN / CELL_SIZE))
+        for r0, c0, r1, c1 in rooms:
+            for _ in range(OBSTACLES_PER_ROOM):
+                height, width = rng.randint(6, 16, size=2)
+                if r1 - r0 - 2 * margin <= height or (
+                    c1 - c0 - 2 * margin <= width
+                ):
+                    continue
+                row = rng.randint(r0 + margin, r1 - margin - height)
+                col = rng.randint(c0 + margin, c1 - margin - width)
+                self.labels[row : row + height, col : col + width] = label
+                label += 1
+        self.free = (self.labels >= 0) & (self.labels < self.num_rooms)
+
+        # walls take the label and colour of the room they face
+        self.surface_labels = self._closest_labels()
+        palette = rng.randint(40, 230, size=(label, 3)).astype(np.uint8)
+        self.colors = palette[self.surface_labels]
+
+        self.clearance = nd.distance_transform_edt(self.free) * CELL_SIZE
+        self.navigable = self.clearance > agent_radius
+        self._build_graph()
+        self._distance_cache: Dict[Tuple[int, ...], np.ndarray] = {}
+
+    def _closest_labels(self) -> np.ndarray:
+        r"""Returns the label of the closest labelled cell of every cell."""
+        _, (rows, cols) = nd.distance_transform_edt(
+            self.labels < 0, return_indices=True
+        )
+        return self.labels[rows, cols]
+
+    def _split(self, rng, rect, wall, rooms, doors) -> None:
+        r"""Recursively splits rect along its longer side with a wall that
+        has one door, rects that are too small to split become rooms.
+        """
+        r0, c0, r1, c1 = rect
+        min_size = int(round(MIN_ROOM_SIZE / CELL_SIZE))
+        door_width = int(round(DOOR_WIDTH / CELL_SIZE))
+        height, width = r1 - r0, c1 - c0
+        if max(height, width) < 2 * min_size + wall:
+            rooms.append(rect)
+            return
+
+        if height >= width:
+            split = rng.randint(r0 + min_size, r1 - min_size - wall + 1)
+            door = rng.randint(c0, c1 - door_width + 1)
+            doors[split : split + wall, door : door + door_width] = True
+            self._split(rng, (r0, c0, split, c1), wall, rooms, doors)
+            self._split(rng, (split + wall, c0, r1, c1), wall, rooms, doors)
+        else:
+            split = rng.randint(c0 + min_size, c1 - min_size - wall + 1)
+            door = rng.randint(r0, r1 - door_width + 1)
+            doors[door : door + door_width, split : split + wall] = True
+            self._split(rng, (r0, c0, r1, split), wall, rooms, doors)
+            self._split(rng, (r0, split + wall, r1, c1), wall, rooms, doors)
+
+    def _build_graph(self) -> None:
+        navigable = self.navigable
+        self.node_index = np.full(navigable.shape, -1, dtype=np.int64)
+        self.node_index[navigable] = np.arange(navigable.sum())
+        self.node_cells = np.argwhere(navigable)
+
+        sources, targets, weights = [], [], []
+        n = self.size
+        for dr, dc in _NEIGHBOUR_OFFSETS:
+            rows = slice(0, n - dr)
+            cols = slice(max(0, -dc), n - max(0, dc))
+            next_rows = slice(dr, n)
+            next_cols = slice(max(0, dc), n - max(0, -dc))
+            edge = navigable[rows, cols] & navigable[next_rows, next_cols]
+            if dr != 0 and dc != 0:
+                # no cutting corners past an obstacle
+                edge &= navigable[next_rows, cols] & navigable[rows, next_cols]
+            sources.append(self.node_index[rows, cols][edge])
+            targets.append(self.node_index[next_rows, next_cols][edge])
+            weights.append(
+                np.full(edge.sum(), CELL_SIZE * math.hypot(dr, dc))
+            )
+
+        sources = np.concatenate(sources)
+        targets = np.concatenate(targets)
+        weights = np.concatenate(weights)
+        num_nodes = len(self.node_cells)
+        self.graph = csr_matrix(
+            (
+                np.concatenate([weights, weights]),
+                (
+                    np.concatenate([sources, targets]),
+                    np.concatenate([targets, sources]),
+                ),
+            ),
+            shape=(num_nodes, num_nodes),
+        )
+
+        labels, components = nd.label(navigable, structure=np.ones((3, 3)))
+        self.islands = labels
+        self.island_radii = np.zeros(components + 1)
+        for island, cells in enumerate(nd.find_objects(labels), start=1):
+            members = np.argwhere(labels[cells] == island)
+            centroid = members.mean(axis=0)
+            self.island_radii[island] = CELL_SIZE * np.sqrt(
+                ((members - centroid) ** 2).sum(axis=1).max()
+            )
+
+    def cell(self, position) -> Tuple[int, int]:
+        row = int(math.floor(position[2] / CELL_SIZE))
+        col = int(math.floor(position[0] / CELL_SIZE))
+        return (
+            min(max(row, 0), self.size - 1),
+            min(max(col, 0), self.size - 1),
+        )
+
+    def position(self, cell) -> np.ndarray:
+        return np.array(
+            [(cell[1] + 0.5) * CELL_SIZE, 0.0, (cell[0] + 0.5) * CELL_SIZE],
+            dtype=np.float32,
+        )
+
+    def contains(self, position) -> bool:
+        return 0 <= position[0] < FLOORPLAN_SIZE and (
+            0 <= position[2] < FLOORPLAN_SIZE
+        )
+
+    def is_navigable(self, position) -> bool:
+        return self.contains(position) and bool(
+            self.navigable[self.cell(position)]
+        )
+
+    def snap(self, position) -> int:
+        r"""Returns the node of the navigable cell closest to position."""
+        cell = self.cell(position)
+        if self.navigable[cell]:
+            return int(self.node_index[cell])
+        distances = np.abs(self.node_cells - np.array(cell)).sum(axis=1)
+        return int(np.argmin(distances))
+
+    def distance_field(self, goals: List[Any]) -> np.ndarray:
+        r"""Returns the geodesic distance of every node to the closest of
+        goals, cached for the last :ref:`DISTANCE_CACHE_SIZE` sets of goals.
+        """
+        goal_nodes = tuple(sorted({self.snap(goal) for goal in goals}))
+        field = self._distance_cache.get(goal_nodes)
+        if field is None:
+            field = dijkstra(
+                self.graph,
+                directed=False,
+                indices=list(goal_nodes),
+                min_only=True,
+            )
+            if len(self._distance_cache) >= DISTANCE_CACHE_SIZE:
+                self._distance_cache.pop(next(iter(self._distance_cache)))
+            self._distance_cache[goal_nodes] = field
+        return field
+
+    def geodesic_distance(self, position_a, goals: List[Any]) -> float:
+        return float(self.distance_field(goals)[self.snap(position_a)])
+
+    def shortest_path(self, position_a, position_b) -> List[np.ndarray]:
+        r"""Returns the corners of the grid path from position_a to
+        position_b, empty if position_b is not reachable.
+        """
+        start = self.snap(position_a)
+        end = self.snap(position_b)
+        distances, predecessors = dijkstra(
+            self.graph, directed=False, indices=end, return_predecessors=True
+        )
+        if not np.isfinite(distances[start]):
+            return []
+
+        nodes = [start]
+        while nodes[-1] != end:
+            nodes.append(int(predecessors[nodes[-1]]))
+        cells = self.node_cells[nodes]
+        steps = np.diff(cells, axis=0)
+        turns = np.any(steps[1:] != steps[:-1], axis=1)
+        corners = [0] + list(np.nonzero(turns)[0] + 1) + [len(cells) - 1]
+        return [self.position(cells[index]) for index in sorted(set(corners))]
+
+    def sample_navigable_point(
+        self, rng: np.random.RandomState
+    ) -> List[float]:
+        node = rng.randint(len(self.node_cells))
+        return self.position(self.node_cells[node]).tolist()
+
+    def raycast(
+        self, position, heading: float, width: int, hfov: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        r"""Casts one ray per image column.
+
+        Returns:
+            the distance along the view direction to the first wall or
+            obstacle of every column (at most :ref:`MAX_DEPTH`) and the grid
+            cell it hits.
+        """
+        focal = (width / 2) / math.tan(hfov / 2)
+        offsets = np.arctan((width / 2 - 0.5 - np.arange(width)) / focal)
+        angles = heading + offsets
+        steps = np.arange(CELL_SIZE / 2, MAX_DEPTH, CELL_SIZE / 2)
+        # forward is -z, turning left increases the heading
+        xs = position[0] - np.outer(np.sin(angles), steps)
+        zs = position[2] - np.outer(np.cos(angles), steps)
+        cols = np.clip((xs / CELL_SIZE).astype(np.int64), 0, self.size - 1)
+        rows = np.clip((zs / CELL_SIZE).astype(np.int64), 0, self.size - 1)
+
+        blocked = ~self.free[rows, cols]
+        hit = blocked.any(axis=1)
+        first = np.where(hit, blocked.argmax(axis=1), len(steps) - 1)
+        column = np.arange(width)
+        distances = steps[first] * np.cos(offsets)
+        return distances, (rows[column, first], cols[column, first])
+
+    def render(
+        self,
+        position,
+        heading: float,
+        resolution: Tuple[int, int],
+        hfov: float,
+        camera_height: float,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        r"""Returns the rgb, depth and semantic images seen from position."""
+        height, width = resolution
+        distances, hit_cells = self.raycast(position, heading, width, hfov)
+        focal = (width / 2) / math.tan(hfov / 2)
+        horizon = height / 2
+        rows = np.arange(height, dtype=np.float64)[:, None] + 0.5
+
+        top = horizon - focal * (WALL_HEIGHT - camera_height) / distances
+        bottom = horizon + focal * camera_height / distances
+        is_wall = (rows >= top) & (rows < bottom)
+        below = rows >= horizon
+        with np.errstate(divide="ignore"):
+            plane_depth = np.where(
+                below,
+                focal * camera_height / (rows - horizon),
+                focal * (WALL_HEIGHT - camera_height) / (horizon - rows),
+            )
+        depth = np.where(is_wall, distances, plane_depth)
+        depth = np.minimum(depth, MAX_DEPTH).astype(np.float32)
+
+        shade = np.clip(1.0 - depth / (1.5 * MAX_DEPTH), 0.3, 1.0)[..., None]
+        wall_colors = self.colors[hit_cells][None].astype(np.float32)
+        plane_colors = np.where(below[..., None], 110.0, 200.0)
+        rgb = np.where(is_wall[..., None], wall_colors, plane_colors) * shade
+        rgb = rgb.astype(np.uint8)
+
+        semantic = np.where(
+            is_wall, self.surface_labels[hit_cells][None] + 1, 0
+        ).astype(np.int32)
+        return rgb, depth, semantic
+
+
+@registry.register_simulator(name="SyntheticSim-v0")
+class SyntheticSim(Simulator):
+    r"""Simulator over :ref:`SyntheticFloorplan`, a stand-in for
+    :ref:`HabitatSim` to benchmark the training stack without habitat-sim or
+    scene data.
+
+    Supports the sensors of the task and the sensors of
+    :py:`habitat.sims.habitat_simulator.sensors`: colour, depth and semantic
+    sensors get raycast images, the others read the agent state. The
+    actions are those of the v0 action space, forward steps stop at the
+    first obstacle instead of sliding along it.
+
+    Args:
+        config: configuration for initializing the simulator.
+    """
+
+    def __init__(self, config: Config) -> None:
+        self.habitat_config = config
+        agent_config = self._get_agent_config()
+
+        sim_sensors = []
+        for sensor_name in agent_config.SENSORS:
+            sensor_cfg = getattr(self.habitat_config, sensor_name)
+            sensor_type = registry.get_sensor(sensor_cfg.TYPE)
+
+            assert sensor_type is not None, "invalid sensor type {}".format(
+                sensor_cfg.TYPE
+            )
+
+            sim_sensors.append(sensor_type(self, sensor_cfg))
+
+        self._sensor_suite = SensorSuite(sim_sensors)
+        self._actions = {
+            HabitatSimActions.STOP: self._stop,
+            HabitatSimActions.MOVE_FORWARD: self._move_forward,
+            HabitatSimActions.TURN_LEFT: self._turn_left,
+            HabitatSimActions.TURN_RIGHT: self._turn_right,
+        }
+        self._action_space = spaces.Discrete(len(self._actions))
+
+        self._current_scene = None
+        self._floorplan = None
+        self._position = np.zeros(3, dtype=np.float32)
+        self._heading = 0.0
+        self._prev_sim_obs: Dict[str, Any] = {}
+        self.seed(self.habitat_config.SEED)
+        self._load_scene(self.habitat_config.SCENE)
+
+    @property
+    def sensor_suite(self) -> SensorSuite:
+        return self._sensor_suite
+
+    @property
+    def action_space(self) -> Space:
+        return self._action_space
+
+    @property
+    def floorplan(self) -> SyntheticFloorplan:
+        return self._floorplan
+
+    def _get_agent_config(self, agent_id: Optional[int] = None) -> Any:
+        if agent_id is None:
+            agent_id = self.habitat_config.DEFAULT_AGENT_ID
+        agent_name = self.habitat_config.AGENTS[agent_id]
+        agent_config = getattr(self.habitat_config, agent_name)
+        return agent_config
+
+    def _load_scene(self, scene: str) -> None:
+        self._current_scene = scene
+        self._floorplan = SyntheticFloorplan(
+            scene, agent_radius=self._get_agent_config().RADIUS
+        )
+        self.set_agent_state(
+            self._floorplan.sample_navigable_point(
+                np.random.RandomState(scene_seed(scene))
+            ),
+            [0, 0, 0, 1],
+        )
+
+    def _update_agents_state(self) -> bool:
+        agent_cfg = self._get_agent_config()
+        if agent_cfg.IS_SET_START_STATE:
+            self.set_agent_state(
+                agent_cfg.START_POSITION, agent_cfg.START_ROTATION
+            )
+            return True
+        return False
+
+    def seed(self, seed: int) -> None:
+        self._rng = np.random.RandomState(seed)
+
+    def reconfigure(self, habitat_config: Config) -> None:
+        self.habitat_config = habitat_config
+        if habitat_config.SCENE != self._current_scene:
+            self._load_scene(habitat_config.SCENE)
+        self._update_agents_state()
+
+    def get_sensor_observations(self) -> Dict[str, Any]:
+        sim_obs: Dict[str, Any] = {}
+        for sensor in self._sensor_suite.sensors.values():
+            if sensor.sensor_type not in (
+                SensorTypes.COLOR,
+                SensorTypes.DEPTH,
+                SensorTypes.SEMANTIC,
+            ):
+                continue
+            rgb, depth, semantic = self._floorplan.render(
+                self._position,
+                self._heading,
+                sensor.observation_space.shape[:2],
+                math.radians(sensor.config.HFOV),
+                sensor.config.POSITION[1],
+            )
+            sim_obs[sensor.uuid] = {
+                SensorTypes.COLOR: rgb,
+                SensorTypes.DEPTH: depth,
+                SensorTypes.SEMANTIC: semantic,
+            }[sensor.sensor_type]
+        return sim_obs
+
+    def reset(self) -> Observations:
+        self._update_agents_state()
+        sim_obs = self.get_sensor_observations()
+        self._prev_sim_obs = sim_obs
+        return self._sensor_suite.get_observations(sim_obs)
+
+    def step(self, action) -> Observations:
+        profiling_utils.range_push("synthetic_simulator.py step")
+        collided = self._actions[action]()
+        sim_obs = self.get_sensor_observations()
+        sim_obs["collided"] = collided
+        self._prev_sim_obs = sim_obs
+        observations = self._sensor_suite.get_observations(sim_obs)
+        profiling_utils.range_pop()  # synthetic_simulator.py step
+        return observations
+
+    def _stop(self) -> bool:
+        return False
+
+    def _move_forward(self) -> bool:
+        step_size = self.habitat_config.FORWARD_STEP_SIZE
+        direction = np.array(
+            [-math.sin(self._heading), 0.0, -math.cos(self._heading)]
+        )
+        num_substeps = max(1, int(math.ceil(step_size / (CELL_SIZE / 2))))
+        for substep in range(1, num_substeps + 1):
+            position = self._position + direction * (
+                step_size * substep / num_substeps
+            )
+            if not self._floorplan.is_navigable(position):
+                return True
+            self._position = position.astype(np.float32)
+        return False
+
+    def _turn_left(self) -> bool:
+        self._heading += math.radians(self.habitat_config.TURN_ANGLE)
+        return False
+
+    def _turn_right(self) -> bool:
+        self._heading -= math.radians(self.habitat_config.TURN_ANGLE)
+        return False
+
+    def render(self, mode: str = "rgb") -> Any:
+        observations = self._sensor_suite.get_observations(
+            self.get_sensor_observations()
+        )
+        output = observations.get(mode)
+        assert output is not None, "mode {} sensor is not active".format(mode)
+        if not isinstance(output, np.ndarray):
+            output = output.to("cpu").numpy()
+        return output
+
+    def geodesic_distance(
+        self, position_a, position_b, episode: Optional[Episode] = None
+    ) -> float:
+        if isinstance(position_b[0], (list, np.ndarray)):
+            goals = list(position_b)
+        else:
+            goals = [position_b]
+        return self._floorplan.geodesic_distance(position_a, goals)
+
+    def action_space_shortest_path(
+        self, source: AgentState, targets: List[AgentState], agent_id: int = 0
+    ) -> List[ShortestPathPoint]:
+        raise NotImplementedError(
+            "This function is no longer implemented. Please use the greedy "
+            "follower instead"
+        )
+
+    @property
+    def up_vector(self):
+        return np.array([0.0, 1.0, 0.0])
+
+    @property
+    def forward_vector(self):
+        return -np.array([0.0, 0.0, 1.0])
+
+    def is_navigable_path(self, position_a, position_b) -> bool:
+        return np.isfinite(self.geodesic_distance(position_a, position_b))
+
+    def get_straight_shortest_path_points(self, position_a, position_b):
+        return self._floorplan.shortest_path(position_a, position_b)
+
+    def sample_navigable_point(self) -> List[float]:
+        return self._floorplan.sample_navigable_point(self._rng)
+
+    def is_navigable(self, point: List[float]) -> bool:
+        return self._floorplan.is_navigable(point)
+
+    def semantic_annotations(self):
+        return None
+
+    def get_agent_state(self, agent_id: int = 0) -> AgentState:
+        assert agent_id == 0, "No support of multi agent in {} yet.".format(
+            self.__class__.__name__
+        )
+        return AgentState(
+            position=self._position.copy(),
+            rotation=quaternion_from_coeff(
+                [
+                    0.0,
+                    math.sin(self._heading / 2),
+                    0.0,
+                    math.cos(self._heading / 2),
+                ]
+            ),
+        )
+
+    def set_agent_state(
+        self,
+        position: List[float],
+        rotation: List[float],
+        agent_id: int = 0,
+        reset_sensors: bool = True,
+    ) -> bool:
+        r"""Places the agent at position, with the heading of rotation
+        around the up axis.
+
+        Args:
+            position: list containing 3 entries for (x, y, z).
+            rotation: unit quaternion or list with 4 entries for
+                (x, y, z, w).
+            agent_id: int identification of agent from multiagent setup.
+            reset_sensors: unused, the sensors have no state of their own.
+
+        Returns:
+            True
+        """
+        if not isinstance(rotation, np.quaternion):
+            rotation = quaternion_from_coeff(rotation)
+        self._position = np.array(position, dtype=np.float32)
+        self._heading = 2 * math.atan2(rotation.y, rotation.w)
+        return True
+
+    def get_observations_at(
+        self,
+        position: Optional[List[float]] = None,
+        rotation: Optional[List[float]] = None,
+        keep_agent_at_new_pose: bool = False,
+    ) -> Optional[Observations]:
+        current_state = self.get_agent_state()
+        if position is not None and rotation is not None:
+            self.set_agent_state(position, rotation)
+
+        sim_obs = self.get_sensor_observations()
+        self._prev_sim_obs = sim_obs
+        observations = self._sensor_suite.get_observations(sim_obs)
+        if not keep_agent_at_new_pose:
+            self.set_agent_state(
+                current_state.position, current_state.rotation
+            )
+        return observations
+
+    def distance_to_closest_obstacle(self, position, max_search_radius=2.0):
+        return min(
+            float(self._floorplan.clearance[self._floorplan.cell(position)]),
+            max_search_radius,
+        )
+
+    def island_radius(self, position):
+        cell = self._floorplan.node_cells[self._floorplan.snap(position)]
+        island = self._floorplan.islands[tuple(cell)]
+        return float(self._floorplan.island_radii[island])
+
+    @property
+    def previous_step_collided(self):
+        return self._prev_sim_obs.get("collided", False)
+
+    def close(self) -> None:
+        pass
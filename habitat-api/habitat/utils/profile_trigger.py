@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+r"""On-demand CPU profiling of long-running processes.
+
+A :ref:`ProfileTrigger` profiles its process for a fixed window when the
+trigger file in its output directory is touched, or when the process
+receives ``SIGUSR2``, and writes the profile next to the trigger file::
+
+    touch <output_dir>/profile.trigger   # every process of the run
+    kill -USR2 <pid>                     # a single process
+
+The ``"sample"`` mode samples the stacks of all threads from a background
+thread and writes them as collapsed stacks (``<name>_<pid>_<time>.collapsed``,
+readable by ``flamegraph.pl``). The ``"cprofile"`` mode runs :py:`cProfile`
+on the thread that polls the trigger and writes a ``.pstats`` file, its
+window ends at the first poll after it elapsed.
+"""
+
+import cProfile
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+from habitat.core.logging import logger
+
+TRIGGER_FILE_NAME = "profile.trigger"
+PROFILER_MODES = ("sample", "cprofile")
+# seconds between two checks of the trigger file
+TRIGGER_CHECK_INTERVAL = 1.0
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return "{} ({}:{})".format(
+        code.co_name, code.co_filename, code.co_firstlineno
+    )
+
+
+class StackSampler(threading.Thread):
+    r"""Counts the collapsed stacks of all other threads of the process
+    every interval seconds, until stop is set.
+    """
+
+    def __init__(self, interval: float) -> None:
+        super().__init__(name="StackSampler", daemon=True)
+        self.interval = interval
+        self.stacks = Counter()
+        self.stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self.stop_event.wait(self.interval):
+            thread_names = {
+                thread.ident: thread.name for thread in threading.enumerate()
+            }
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == self.ident:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                labels.append(thread_names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(labels))] += 1
+
+
+class ProfileTrigger:
+    r"""Profiles the process for seconds when the trigger file is touched
+    or on ``SIGUSR2``. :ref:`poll` must be called regularly, it is cheap
+    when nothing is triggered.
+
+    Args:
+        output_dir: directory of the trigger file and of the profiles.
+        name: prefix of the profile files of this process.
+        seconds: length of the profiling window.
+        mode: ``"sample"`` or ``"cprofile"``.
+        sample_interval: seconds between two stack samples.
+        install_signal_handler: profile on ``SIGUSR2``, only possible from
+            the main thread.
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        name: str,
+        seconds: float = 30.0,
+        mode: str = "sample",
+        sample_interval: float = 0.01,
+        install_signal_handler: bool = True,
+    ) -> None:
+        assert mode in PROFILER_MODES, "mode must be one of {}".format(
+            PROFILER_MODES
+        )
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self.name = name
+        self.seconds = seconds
+        self.mode = mode
+        self.sample_interval = sample_interval
+        self._trigger_path = os.path.join(output_dir, TRIGGER_FILE_NAME)
+        # a trigger file left over from a previous window or run does not
+        # start a profile
+        self._trigger_mtime = self._get_trigger_mtime()
+        self._next_check = time.monotonic() + TRIGGER_CHECK_INTERVAL
+        self._end = None
+        self._profiler: Optional[cProfile.Profile] = None
+        self._sampler: Optional[StackSampler] = None
+        self._lock = threading.RLock()
+
+        if (
+            install_signal_handler
+            and threading.current_thread() is threading.main_thread()
+        ):
+            signal.signal(signal.SIGUSR2, lambda signum, frame: self.start())
+
+    def _get_trigger_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self._trigger_path).st_mtime
+        except OSError:
+            return None
+
+    @property
+    def active(self) -> bool:
+        return self._end is not None
+
+    def poll(self) -> None:
+        r"""Starts a profile if the trigger file was touched since the last
+        check and ends the current one if its window elapsed.
+        """
+        now = time.monotonic()
+        if self._end is not None and now >= self._end:
+            self.stop()
+        if now < self._next_check:
+            return
+        self._next_check = now + TRIGGER_CHECK_INTERVAL
+        mtime = self._get_trigger_mtime()
+        if mtime is not None and mtime != self._trigger_mtime:
+            self._trigger_mtime = mtime
+            self.start()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._end is not None:
+                return
+            self._end = time.monotonic() + self.seconds
+            if self.mode == "cprofile":
+                self._profiler = cProfile.Profile()
+                self._profiler.enable()
+            else:
+                self._sampler = StackSampler(self.sample_interval)
+                self._sampler.start()
+                timer = threading.Timer(self.seconds, self.stop)
+                timer.daemon = True
+                timer.start()
+        logger.info(
+            "{}: profiling for {:.0f}s ({})".format(
+                self.name, self.seconds, self.mode
+            )
+        )
+
+    def stop(self) -> None:
+        r"""Ends the current profile and writes it to the output dir."""
+        with self._lock:
+            if self._end is None:
+                return
+            self._end = None
+            profiler, self._profiler = self._profiler, None
+            sampler, self._sampler = self._sampler, None
+
+        path = os.path.join(
+            self.output_dir,
+            "{}_{}_{}".format(
+                self.name, os.getpid(), time.strftime("%Y%m%d-%H%M%S")
+            ),
+        )
+        if profiler is not None:
+            profiler.disable()
+            path += ".pstats"
+            profiler.dump_stats(path)
+        else:
+            sampler.stop_event.set()
+            sampler.join()
+            path += ".collapsed"
+            with open(path, "w") as f:
+                for stack, count in sampler.stacks.most_common():
+                    f.write("{} {}\n".format(stack, count))
+        logger.info("{}: wrote profile {}".format(self.name, path))
@@ -1,9 +1,121 @@
+r"""Named profiling ranges.
+
+``range_push``/``range_pop`` emit NVTX ranges when CUDA is available, for
+Nsight Systems. After ``enable_cpu_profiling`` they also record every range
+with ``time.perf_counter_ns`` and the native thread id into an in-memory ring
+buffer, which ``flush_cpu_profile`` writes to a sqlite file with the
+``NVTX_EVENTS`` table of Nsight, so ``compare_profiles.py`` summarizes and
+diffs CPU-only runs the same way.
+"""
+
+import atexit
+import itertools
+import sqlite3
+import threading
+import time
+
 import torch
 
+# default number of ranges kept by the CPU profiler, older ranges are
+# overwritten
+DEFAULT_CPU_PROFILE_CAPACITY = 1000000
+
+_use_nvtx = None
+_cpu_profiler = None
+_cpu_profile_path = None
+
+
+class CpuRangeProfiler:
+    r"""Records the closed ranges of every thread into a ring buffer of
+    ``(start, end, text, thread id)`` tuples.
+    """
+
+    def __init__(self, capacity=DEFAULT_CPU_PROFILE_CAPACITY):
+        self._capacity = capacity
+        self._events = [None] * capacity
+        # next() of itertools.count is atomic under the GIL
+        self._counter = itertools.count()
+        self._local = threading.local()
+
+    def push(self, msg):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append((msg, time.perf_counter_ns()))
+
+    def pop(self):
+        end = time.perf_counter_ns()
+        stack = getattr(self._local, "stack", None)
+        # ranges pushed before the profiler was enabled
+        if not stack:
+            return
+        msg, start = stack.pop()
+        self._events[next(self._counter) % self._capacity] = (
+            start,
+            end,
+            msg,
+            threading.get_native_id(),
+        )
+
+    def events(self):
+        r"""Returns the recorded ranges, at most the last capacity of them.
+        """
+        return [event for event in self._events if event is not None]
+
+    def flush(self, path):
+        r"""Writes the recorded ranges to the NVTX_EVENTS table of the
+        sqlite file at path, replacing its previous content.
+        """
+        conn = sqlite3.connect(path)
+        try:
+            conn.execute("DROP TABLE IF EXISTS NVTX_EVENTS")
+            conn.execute(
+                "CREATE TABLE NVTX_EVENTS (start INTEGER NOT NULL, "
+                "end INTEGER, text TEXT, globalTid INTEGER)"
+            )
+            conn.executemany(
+                "INSERT INTO NVTX_EVENTS VALUES (?, ?, ?, ?)", self.events()
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def enable_cpu_profiling(path, capacity=DEFAULT_CPU_PROFILE_CAPACITY):
+    r"""Starts recording the ranges of this process, they are written to
+    the sqlite file at path by ``flush_cpu_profile`` or at exit.
+    """
+    global _cpu_profiler, _cpu_profile_path
+    if _cpu_profiler is None:
+        atexit.register(flush_cpu_profile)
+    _cpu_profiler = CpuRangeProfiler(capacity)
+    _cpu_profile_path = path
+
+
+def flush_cpu_profile():
+    r"""Writes the ranges recorded since ``enable_cpu_profiling`` to its
+    sqlite file.
+    """
+    if _cpu_profiler is not None:
+        _cpu_profiler.flush(_cpu_profile_path)
+
+
+def _nvtx_enabled():
+    global _use_nvtx
+    if _use_nvtx is None:
+        _use_nvtx = torch.cuda.is_available()
+    return _use_nvtx
+
+
 def range_push(msg):
-    if torch.cuda.is_available():
+    if _cpu_profiler is not None:
+        _cpu_profiler.push(msg)
+    if _use_nvtx or (_use_nvtx is None and _nvtx_enabled()):
         torch.cuda.nvtx.range_push(msg)
 
+
 def range_pop():
-    if torch.cuda.is_available():
-        torch.cuda.nvtx.range_pop()
\ No newline at end of file
+    if _cpu_profiler is not None:
+        _cpu_profiler.pop()
+    if _use_nvtx or (_use_nvtx is None and _nvtx_enabled()):
+        torch.cuda.nvtx.range_pop()
@@ -5,6 +5,13 @@
 # LICENSE file in the root directory of this source tree.
 
 from habitat_baselines.common.base_trainer import BaseRLTrainer, BaseTrainer
+from habitat_baselines.rl.ddppo.algo.ddppo_trainer import DDPPOTrainer
 from habitat_baselines.rl.ppo.ppo_trainer import PPOTrainer, RolloutStorage
 
-__all__ = ["BaseTrainer", "BaseRLTrainer", "PPOTrainer", "RolloutStorage"]
+__all__ = [
+    "BaseTrainer",
+    "BaseRLTrainer",
+    "PPOTrainer",
+    "DDPPOTrainer",
+    "RolloutStorage",
+]
@@ -5,7 +5,7 @@
 # LICENSE file in the root directory of this source tree.
 
 import random
-from typing import Type, Union
+from typing import Optional, Type, Union
 
 import numpy as np
 
@@ -35,10 +35,37 @@ def make_env_fn(
     return env
 
 
+def retarget_env_fn(
+    env: Union[Env, RLEnv], config: Config, env_class: Type[Union[Env, RLEnv]]
+) -> Union[Env, RLEnv]:
+    r"""Moves env to config, keeping its simulator when env is of type
+    env_class and can be retargeted to config, otherwise replaces it by a
+    new env. This is to be passed in as an argument when creating VectorEnv.
+
+    Args:
+        env: current env of the worker.
+        config: root exp config of the new env.
+        env_class: class type of the new env.
+
+    Returns:
+        env object to use from now on.
+    """
+    if type(env) is env_class and env.can_retarget(config):
+        dataset = make_dataset(
+            config.TASK_CONFIG.DATASET.TYPE, config=config.TASK_CONFIG.DATASET
+        )
+        env.retarget(config=config, dataset=dataset)
+        env.seed(config.TASK_CONFIG.SEED)
+        return env
+    env.close()
+    return make_env_fn(config, env_class)
+
+
 def construct_envs(
     config: Config,
     env_class: Type[Union[Env, RLEnv]],
     workers_ignore_signals: bool = False,
+    envs: Optional[VectorEnv] = None,
 ) -> VectorEnv:
     r"""Create VectorEnv object with specified config and env class type.
     To allow better performance, dataset are split into small ones for
@@ -48,6 +75,8 @@ def construct_envs(
     :param necessary to create individual environments.
     :param env_class: class type of the envs to be created.
     :param workers_ignore_signals: Passed to :ref:`habitat.VectorEnv`'s constructor
+    :param envs: VectorEnv of config.NUM_PROCESSES workers to reuse: its
+        workers are retargeted to the new envs instead of starting new ones.
 
     :return: VectorEnv object created according to specification.
     """
@@ -98,9 +127,26 @@ def construct_envs(
         proc_config.freeze()
         configs.append(proc_config)
 
+    env_fn_args = tuple(zip(configs, env_classes))
+    if envs is not None:
+        envs.retarget(env_fn_args)
+        return envs
+
+    profile_trigger_kwargs = None
+    if config.PROFILE_TRIGGER_DIR != "":
+        profile_trigger_kwargs = dict(
+            output_dir=config.PROFILE_TRIGGER_DIR,
+            seconds=config.PROFILE_TRIGGER_SECONDS,
+            mode=config.PROFILE_TRIGGER_MODE,
+        )
+
     envs = habitat.VectorEnv(
         make_env_fn=make_env_fn,
-        env_fn_args=tuple(tuple(zip(configs, env_classes))),
+        env_fn_args=env_fn_args,
         workers_ignore_signals=workers_ignore_signals,
+        use_shared_memory=config.USE_SHARED_MEMORY_OBSERVATIONS,
+        profile_trigger_kwargs=profile_trigger_kwargs,
+        retarget_env_fn=retarget_env_fn,
+        forkserver_preload=config.FORKSERVER_PRELOAD,
     )
     return envs
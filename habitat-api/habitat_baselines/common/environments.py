@@ -10,11 +10,12 @@ in habitat. Customized environments should be registered using
 ``@baseline_registry.register_env(name="myEnv")` for reusability
 """
 
-from typing import Optional, Type
+from typing import Any, Dict, Optional, Type
 
 import habitat
 from habitat import Config, Dataset
 from habitat_baselines.common.baseline_registry import baseline_registry
+from habitat_baselines.common.memory_utils import env_memory_report
 
 
 def get_env_class(env_name: str) -> Type[habitat.RLEnv]:
@@ -32,14 +33,28 @@ def get_env_class(env_name: str) -> Type[habitat.RLEnv]:
 @baseline_registry.register_env(name="NavRLEnv")
 class NavRLEnv(habitat.RLEnv):
     def __init__(self, config: Config, dataset: Optional[Dataset] = None):
+        self._setup_rl_config(config)
+        super().__init__(self._core_env_config, dataset)
+
+    def _setup_rl_config(self, config: Config) -> None:
         self._rl_config = config.RL
         self._core_env_config = config.TASK_CONFIG
         self._reward_measure_name = self._rl_config.REWARD_MEASURE
         self._success_measure_name = self._rl_config.SUCCESS_MEASURE
+        self._log_component_times = config.LOG_COMPONENT_TIMES
 
         self._previous_measure = None
         self._previous_action = None
-        super().__init__(self._core_env_config, dataset)
+
+    def can_retarget(self, config: Config) -> bool:
+        return super().can_retarget(config.TASK_CONFIG)
+
+    def retarget(
+        self, config: Config, dataset: Optional[Dataset] = None
+    ) -> None:
+        self._setup_rl_config(config)
+        self.reward_range = self.get_reward_range()
+        super().retarget(self._core_env_config, dataset)
 
     def reset(self):
         self._previous_action = None
@@ -82,4 +97,10 @@ class NavRLEnv(habitat.RLEnv):
         return done
 
     def get_info(self, observations):
-        return self.habitat_env.get_metrics()
+        info = self.habitat_env.get_metrics()
+        if self._log_component_times:
+            info["component_times"] = self.habitat_env.pop_timings()
+        return info
+
+    def memory_report(self, tracemalloc_top: int = 0) -> Dict[str, Any]:
+        return env_memory_report(self.habitat_env, tracemalloc_top)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+r"""Memory accounting of training runs: byte estimates of the tensors,
+arrays and modules held by the components of the trainer and of the env
+workers, resident set sizes and tracemalloc top allocation sites.
+"""
+
+import pickle
+import sys
+import tracemalloc
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import torch
+from torch import nn
+
+# number of episodes pickled to estimate the memory of a dataset
+EPISODE_SAMPLE_SIZE = 100
+
+
+def rss_bytes(pid: Any = "self") -> Optional[int]:
+    r"""Returns the resident set size of process pid in bytes, or None if
+    /proc is not available.
+    """
+    try:
+        with open("/proc/{}/status".format(pid)) as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _value_bytes(value: Any) -> int:
+    if isinstance(value, torch.Tensor):
+        return value.element_size() * value.nelement()
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, nn.Module):
+        return sum(
+            _value_bytes(tensor)
+            for tensor in list(value.parameters()) + list(value.buffers())
+        )
+    if isinstance(value, dict):
+        return sum(_value_bytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_value_bytes(v) for v in value)
+    return 0
+
+
+def object_bytes(obj: Any) -> int:
+    r"""Returns the bytes of the tensors, arrays and module parameters and
+    buffers held by obj, directly or in dicts, lists and tuples of its
+    attributes. Other objects referenced by obj are not followed, so a
+    sensor does not count the simulator it points to.
+    """
+    if isinstance(obj, (torch.Tensor, np.ndarray, nn.Module, dict, list)):
+        return _value_bytes(obj)
+    return sum(_value_bytes(value) for value in vars(obj).values())
+
+
+def visualpriors_bytes() -> int:
+    r"""Returns the bytes of the visualpriors networks loaded in this
+    process, which caches them on its classes.
+    """
+    transforms = sys.modules.get("visualpriors.transforms")
+    if transforms is None:
+        return 0
+    return sum(
+        _value_bytes(getattr(transforms, name).feature_task_to_net)
+        for name in ("VisualPriorRepresentation", "VisualPriorPredictedLabel")
+        if hasattr(transforms, name)
+    )
+
+
+def episode_bytes(episodes: List[Any]) -> int:
+    r"""Estimates the memory of episodes from the pickled size of the first
+    EPISODE_SAMPLE_SIZE of them.
+    """
+    if len(episodes) == 0:
+        return 0
+    sample = episodes[:EPISODE_SAMPLE_SIZE]
+    return len(pickle.dumps(sample)) * len(episodes) // len(sample)
+
+
+def top_allocations(limit: int) -> List[Tuple[str, int]]:
+    r"""Returns the limit source lines that allocated the most memory still
+    alive, with their bytes. The first call starts tracemalloc and returns
+    nothing, allocations are only traced from then on.
+    """
+    if limit <= 0:
+        return []
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+        return []
+    statistics = tracemalloc.take_snapshot().statistics("lineno")
+    return [(str(stat.traceback[0]), stat.size) for stat in statistics[:limit]]
+
+
+def env_memory_report(env: Any, tracemalloc_top: int = 0) -> Dict[str, Any]:
+    r"""Returns the memory report of a habitat Env, to be run inside its
+    worker.
+
+    Args:
+        env: the habitat Env.
+        tracemalloc_top: number of top allocation sites to include.
+
+    Returns:
+        dict with the RSS of the process, the bytes of every sensor, of the
+        visualpriors networks and of the dataset episodes, and the top
+        allocation sites.
+    """
+    components = {}
+    for suite in (env.sim.sensor_suite, env.task.sensor_suite):
+        for uuid, sensor in suite.sensors.items():
+            components["sensor." + uuid] = object_bytes(sensor)
+    components["visualpriors"] = visualpriors_bytes()
+    components["episodes"] = episode_bytes(env.episodes)
+    return dict(
+        rss=rss_bytes(),
+        components=components,
+        top_allocations=top_allocations(tracemalloc_top),
+    )
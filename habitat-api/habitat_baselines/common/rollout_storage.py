@@ -4,14 +4,94 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
-from collections import defaultdict
+from typing import Dict, Optional
 
+import numpy as np
 import torch
 
+OBSERVATION_STORAGE_NATIVE = "native"
+OBSERVATION_STORAGE_FP16 = "fp16"
+OBSERVATION_STORAGE_UINT8 = "uint8"
+# largest high - low of a sensor stored as uint8. Spaces written as
+# unbounded with the float32 limits would make the quantization step
+# overflow, and 256 levels are meaningless over a wider range anyway
+UINT8_STORAGE_MAX_RANGE = 1e6
+
+
+@torch.jit.script
+def _gae_returns_from_td_errors(
+    returns: torch.Tensor,
+    deltas: torch.Tensor,
+    value_preds: torch.Tensor,
+    masks: torch.Tensor,
+    num_steps: int,
+    gamma: float,
+    tau: float,
+) -> None:
+    r"""Writes the GAE returns of the first num_steps steps into returns
+    from their TD errors deltas, walking back over the rollout with a single
+    running advantage.
+    """
+    discounts = gamma * tau * masks[1 : num_steps + 1]
+    gae = torch.zeros_like(deltas[0])
+    for i in range(num_steps):
+        step = num_steps - 1 - i
+        gae = deltas[step] + discounts[step] * gae
+        returns[step] = gae
+    returns[:num_steps] += value_preds[:num_steps]
+
+
+@torch.jit.script
+def _compute_gae_returns(
+    returns: torch.Tensor,
+    rewards: torch.Tensor,
+    value_preds: torch.Tensor,
+    masks: torch.Tensor,
+    num_steps: int,
+    gamma: float,
+    tau: float,
+) -> None:
+    r"""Writes the GAE returns of the first num_steps steps into returns.
+    The TD errors are computed for all steps at once, only the recurrence is
+    a (compiled) loop.
+    """
+    deltas = (
+        rewards[:num_steps]
+        + gamma * value_preds[1 : num_steps + 1] * masks[1 : num_steps + 1]
+        - value_preds[:num_steps]
+    )
+    _gae_returns_from_td_errors(
+        returns, deltas, value_preds, masks, num_steps, gamma, tau
+    )
+
+
+@torch.jit.script
+def _compute_discounted_returns(
+    returns: torch.Tensor,
+    rewards: torch.Tensor,
+    masks: torch.Tensor,
+    num_steps: int,
+    gamma: float,
+) -> None:
+    r"""Writes the discounted returns of the first num_steps steps into
+    returns, returns[num_steps] must hold the bootstrap value.
+    """
+    discounts = gamma * masks[1 : num_steps + 1]
+    for i in range(num_steps):
+        step = num_steps - 1 - i
+        returns[step] = rewards[step] + discounts[step] * returns[step + 1]
+
 
 class RolloutStorage:
     r"""Class for storing rollout information for RL trainers.
 
+    Observations are stored in the dtype of their observation space by
+    default, or in a compressed form selected per sensor through
+    :ref:`observation_storage`: ``"fp16"`` stores half precision floats and
+    ``"uint8"`` linearly quantizes the sensor between the bounds of its
+    observation space. Observations are converted back to float when they
+    are read with :ref:`get_observations` or batched by
+    :ref:`recurrent_generator`.
     """
 
     def __init__(
@@ -22,15 +102,61 @@ class RolloutStorage:
         action_space,
         recurrent_hidden_state_size,
         num_recurrent_layers=1,
+        observation_storage: Optional[Dict[str, str]] = None,
     ):
+        if observation_storage is None:
+            observation_storage = {}
+
         self.observations = {}
+        self._quantization = {}
+        self._observation_staging = {}
 
         for sensor in observation_space.spaces:
+            space = observation_space.spaces[sensor]
+            storage = observation_storage.get(
+                sensor, OBSERVATION_STORAGE_NATIVE
+            )
+            if storage == OBSERVATION_STORAGE_NATIVE:
+                dtype = torch.from_numpy(
+                    np.zeros(0, dtype=getattr(space, "dtype", np.float32))
+                ).dtype
+            elif storage == OBSERVATION_STORAGE_FP16:
+                dtype = torch.float16
+            elif storage == OBSERVATION_STORAGE_UINT8:
+                low = np.broadcast_to(space.low, space.shape)
+                high = np.broadcast_to(space.high, space.shape)
+                value_range = high.astype(np.float64) - low
+                if not (
+                    np.isfinite(low).all()
+                    and np.isfinite(high).all()
+                    and np.isfinite(value_range).all()
+                    and value_range.max(initial=0.0)
+                    <= UINT8_STORAGE_MAX_RANGE
+                ):
+                    raise ValueError(
+                        "Sensor {} needs finite observation space bounds at "
+                        "most {} apart to be stored as uint8".format(
+                            sensor, UINT8_STORAGE_MAX_RANGE
+                        )
+                    )
+                low = torch.tensor(low, dtype=torch.float)
+                self._quantization[sensor] = (
+                    low,
+                    (torch.tensor(high, dtype=torch.float) - low) / 255.0,
+                )
+                dtype = torch.uint8
+            else:
+                raise ValueError(
+                    "Unknown observation storage {} for sensor {}".format(
+                        storage, sensor
+                    )
+                )
+
             self.observations[sensor] = torch.zeros(
-                num_steps + 1,
-                num_envs,
-                *observation_space.spaces[sensor].shape
+                num_steps + 1, num_envs, *space.shape, dtype=dtype
             )
+        # insert_observations always quantizes on the host
+        self._host_quantization = dict(self._quantization)
 
         self.recurrent_hidden_states = torch.zeros(
             num_steps + 1,
@@ -60,9 +186,15 @@ class RolloutStorage:
         self.num_steps = num_steps
         self.step = 0
 
+        self._incremental_gae = None
+        self._gae_deltas = None
+        self._gae_step = 0
+
     def to(self, device):
         for sensor in self.observations:
             self.observations[sensor] = self.observations[sensor].to(device)
+        for sensor, (low, scale) in self._quantization.items():
+            self._quantization[sensor] = (low.to(device), scale.to(device))
 
         self.recurrent_hidden_states = self.recurrent_hidden_states.to(device)
         self.rewards = self.rewards.to(device)
@@ -72,6 +204,8 @@ class RolloutStorage:
         self.actions = self.actions.to(device)
         self.prev_actions = self.prev_actions.to(device)
         self.masks = self.masks.to(device)
+        if self._incremental_gae is not None:
+            self._gae_deltas = self._gae_deltas.to(device)
 
     def insert(
         self,
@@ -83,22 +217,186 @@ class RolloutStorage:
         rewards,
         masks,
     ):
-        for sensor in observations:
-            self.observations[sensor][self.step + 1].copy_(
-                observations[sensor]
-            )
-        self.recurrent_hidden_states[self.step + 1].copy_(
-            recurrent_hidden_states
+        self.insert_at(
+            self.step,
+            slice(None),
+            observations,
+            recurrent_hidden_states,
+            actions,
+            action_log_probs,
+            value_preds,
+            rewards,
+            masks,
         )
-        self.actions[self.step].copy_(actions)
-        self.prev_actions[self.step + 1].copy_(actions)
-        self.action_log_probs[self.step].copy_(action_log_probs)
-        self.value_preds[self.step].copy_(value_preds)
-        self.rewards[self.step].copy_(rewards)
-        self.masks[self.step + 1].copy_(masks)
+
+        if self._incremental_gae is not None and self.step > 0:
+            self._store_td_error(self.step - 1)
 
         self.step = self.step + 1
 
+    def enable_incremental_returns(self, gamma, tau):
+        r"""Computes the TD error of every step while the rollout is
+        collected with :ref:`insert`, as soon as the value of the next step
+        is known. :ref:`compute_returns` then only adds the TD error of the
+        last step and walks back over the rollout once.
+
+        Rollouts written with :ref:`insert_at` are not accumulated and fall
+        back to the full computation.
+        """
+        self._incremental_gae = (gamma, tau)
+        self._gae_deltas = torch.zeros_like(self.rewards)
+        self._reset_incremental_returns()
+
+    def _reset_incremental_returns(self):
+        self._gae_step = 0
+
+    def _store_td_error(self, step):
+        gamma, _ = self._incremental_gae
+        self._gae_deltas[step] = (
+            self.rewards[step]
+            + gamma * self.value_preds[step + 1] * self.masks[step + 1]
+            - self.value_preds[step]
+        )
+        self._gae_step = step + 1
+
+    def insert_at(
+        self,
+        step,
+        env_slice,
+        observations,
+        recurrent_hidden_states,
+        actions,
+        action_log_probs,
+        value_preds,
+        rewards,
+        masks,
+    ):
+        r"""Writes the transition taken at :ref:`step` by the envs selected by
+        :ref:`env_slice` without advancing :ref:`self.step`. Used when groups
+        of envs are stepped independently of each other.
+
+        Args:
+            step: index of the step the actions were taken at, or a
+                LongTensor with the step of every selected env when the envs
+                are not in lockstep.
+            env_slice: slice or LongTensor of indices selecting the envs in
+                the env dimension.
+            observations: dict of batched observations for the selected envs
+                or None if they were written with insert_observations.
+        """
+        if observations is not None:
+            self.set_observations(step + 1, observations, env_slice=env_slice)
+        self.recurrent_hidden_states.transpose(1, 2)[
+            step + 1, env_slice
+        ] = recurrent_hidden_states.transpose(0, 1)
+        self.actions[step, env_slice] = actions
+        self.prev_actions[step + 1, env_slice] = actions
+        self.action_log_probs[step, env_slice] = action_log_probs
+        self.value_preds[step, env_slice] = value_preds
+        self.rewards[step, env_slice] = rewards
+        self.masks[step + 1, env_slice] = masks
+
+    def get_recurrent_hidden_states(self, step, env_slice=slice(None)):
+        r"""Returns the :py:`(num_layers, num_selected_envs, hidden_size)`
+        recurrent hidden states stored at :ref:`step` for the envs selected by
+        :ref:`env_slice`. Accepts the same indices as :ref:`insert_at`.
+        """
+        return self.recurrent_hidden_states.transpose(1, 2)[
+            step, env_slice
+        ].transpose(0, 1)
+
+    def set_observations(self, step, observations, env_slice=slice(None)):
+        r"""Writes a batch of float observations into the storage slot of
+        :ref:`step`, compressing them according to the storage of each
+        sensor.
+
+        Args:
+            step: index of the slot in the time dimension.
+            observations: dict of ``(num_envs, ...)`` observation tensors.
+            env_slice: slice or LongTensor of indices selecting the envs the
+                batch belongs to.
+        """
+        for sensor in observations:
+            value = observations[sensor]
+            if sensor in self._quantization:
+                low, scale = self._quantization[sensor]
+                value = ((value - low) / scale).round_().clamp_(0, 255)
+            self.observations[sensor][step, env_slice] = value
+
+    def insert_observations(self, step, observations, env_slice=slice(None)):
+        r"""Writes the per-env observations returned by the environments
+        straight into the storage slot of :ref:`step` without building an
+        intermediate float batch. Every observation is converted once into the
+        storage dtype. When the storage is not on the host, the slot is filled
+        from a preallocated host staging buffer with a single copy per sensor.
+
+        Args:
+            step: index of the slot in the time dimension, or a LongTensor
+                with the slot of every env when the envs are not in lockstep.
+            observations: list of observation dicts, one per env, as returned
+                by ``VectorEnv.reset`` or ``VectorEnv.step``.
+            env_slice: slice or LongTensor of indices selecting the envs the
+                observations belong to.
+        """
+        for sensor, storage in self.observations.items():
+            if storage.device.type != "cpu":
+                target = self._get_observation_staging(sensor)[
+                    : len(observations)
+                ]
+            elif torch.is_tensor(env_slice):
+                steps = step.tolist() if torch.is_tensor(step) else None
+                target = [
+                    storage[step if steps is None else steps[offset], index]
+                    for offset, index in enumerate(env_slice.tolist())
+                ]
+            else:
+                target = storage[step, env_slice]
+
+            quantization = self._host_quantization.get(sensor)
+            for env_index, observation in enumerate(observations):
+                value = torch.as_tensor(observation[sensor])
+                if quantization is not None:
+                    low, scale = quantization
+                    value = (
+                        ((value.to(dtype=torch.float) - low) / scale)
+                        .round_()
+                        .clamp_(0, 255)
+                    )
+                target[env_index].copy_(value)
+
+            if storage.device.type != "cpu":
+                # indexing with device tensors needs the values on the same
+                # device. The copy is synchronous: the staging buffer is
+                # overwritten by the next call
+                storage[step, env_slice] = target.to(storage.device)
+
+    def _get_observation_staging(self, sensor):
+        if sensor not in self._observation_staging:
+            storage = self.observations[sensor]
+            self._observation_staging[sensor] = torch.empty(
+                storage.size()[1:],
+                dtype=storage.dtype,
+                pin_memory=torch.cuda.is_available(),
+            )
+        return self._observation_staging[sensor]
+
+    def get_observations(self, step, env_slice=slice(None)):
+        r"""Returns the observations stored at :ref:`step` for the envs
+        selected by :ref:`env_slice` as float tensors.
+        """
+        return {
+            sensor: self._decode_observation(
+                sensor, observation[step, env_slice]
+            )
+            for sensor, observation in self.observations.items()
+        }
+
+    def _decode_observation(self, sensor, observation):
+        if sensor in self._quantization:
+            low, scale = self._quantization[sensor]
+            return observation.to(dtype=torch.float) * scale + low
+        return observation.to(dtype=torch.float)
+
     def after_update(self):
         for sensor in self.observations:
             self.observations[sensor][0].copy_(
@@ -111,28 +409,134 @@ class RolloutStorage:
         self.masks[0].copy_(self.masks[self.step])
         self.prev_actions[0].copy_(self.prev_actions[self.step])
         self.step = 0
+        self._reset_incremental_returns()
 
     def compute_returns(self, next_value, use_gae, gamma, tau):
         if use_gae:
             self.value_preds[self.step] = next_value
-            gae = 0
-            for step in reversed(range(self.step)):
-                delta = (
-                    self.rewards[step]
-                    + gamma * self.value_preds[step + 1] * self.masks[step + 1]
-                    - self.value_preds[step]
+            if (
+                self._incremental_gae == (gamma, tau)
+                and self.step > 0
+                and self._gae_step == self.step - 1
+            ):
+                self._store_td_error(self.step - 1)
+                _gae_returns_from_td_errors(
+                    self.returns,
+                    self._gae_deltas,
+                    self.value_preds,
+                    self.masks,
+                    self.step,
+                    gamma,
+                    tau,
+                )
+            else:
+                _compute_gae_returns(
+                    self.returns,
+                    self.rewards,
+                    self.value_preds,
+                    self.masks,
+                    self.step,
+                    gamma,
+                    tau,
                 )
-                gae = delta + gamma * tau * self.masks[step + 1] * gae
-                self.returns[step] = gae + self.value_preds[step]
         else:
             self.returns[self.step] = next_value
-            for step in reversed(range(self.step)):
-                self.returns[step] = (
-                    self.returns[step + 1] * gamma * self.masks[step + 1]
-                    + self.rewards[step]
-                )
+            _compute_discounted_returns(
+                self.returns, self.rewards, self.masks, self.step, gamma
+            )
+
+    def compute_vtrace_returns(
+        self,
+        values,
+        next_value,
+        action_log_probs,
+        gamma,
+        rho_clip=1.0,
+        c_clip=1.0,
+    ):
+        r"""Computes V-trace targets (Espeholt et al. 2018,
+        https://arxiv.org/abs/1802.01561) for a rollout collected by a stale
+        behaviour policy. The stored value predictions and action log probs
+        are replaced with the ones of the learner, so that the PPO ratio is
+        taken with respect to the learner and the policy lag is only corrected
+        by the truncated importance weights.
+
+        Args:
+            values: ``(step, num_envs, 1)`` values of the learner.
+            next_value: ``(num_envs, 1)`` value of the learner at step.
+            action_log_probs: ``(step, num_envs, 1)`` log probs of the stored
+                actions under the learner.
+            gamma: discount factor.
+            rho_clip: truncation of the importance weights of the TD errors.
+            c_clip: truncation of the importance weights of the traces.
+
+        Returns:
+            ``(step, num_envs, 1)`` policy gradient advantages.
+        """
+        num_steps = self.step
+        rhos = torch.exp(action_log_probs - self.action_log_probs[:num_steps])
+        clipped_rhos = rhos.clamp(max=rho_clip)
+        cs = rhos.clamp(max=c_clip)
+
+        self.action_log_probs[:num_steps] = action_log_probs
+        self.value_preds[:num_steps] = values
+        self.value_preds[num_steps] = next_value
+        self.returns[num_steps] = next_value
+
+        discounts = gamma * self.masks[1 : num_steps + 1]
+        deltas = clipped_rhos * (
+            self.rewards[:num_steps]
+            + discounts * self.value_preds[1 : num_steps + 1]
+            - self.value_preds[:num_steps]
+        )
+        vs_minus_v = torch.zeros_like(next_value)
+        for step in reversed(range(num_steps)):
+            vs_minus_v = deltas[step] + discounts[step] * cs[step] * vs_minus_v
+            self.returns[step] = self.value_preds[step] + vs_minus_v
+
+        return clipped_rhos * (
+            self.rewards[:num_steps]
+            + discounts * self.returns[1 : num_steps + 1]
+            - self.value_preds[:num_steps]
+        )
+
+    def start_from(self, rollouts):
+        r"""Starts a new rollout from the last step of :p:`rollouts`, the
+        equivalent of :ref:`after_update` when rollouts alternate between two
+        storages.
+        """
+        for sensor in self.observations:
+            self.observations[sensor][0].copy_(
+                rollouts.observations[sensor][rollouts.step]
+            )
+
+        self.recurrent_hidden_states[0].copy_(
+            rollouts.recurrent_hidden_states[rollouts.step]
+        )
+        self.masks[0].copy_(rollouts.masks[rollouts.step])
+        self.prev_actions[0].copy_(rollouts.prev_actions[rollouts.step])
+        self.step = 0
+        self._reset_incremental_returns()
+
+    def recurrent_generator(self, advantages, num_mini_batch, chunk_length=0):
+        r"""Yields minibatches of whole env trajectories for the recurrent
+        policy, with the (T, N, ...) tensors flattened to (T * N, ...).
+
+        The envs of a minibatch are gathered with a single index_select per
+        tensor over a random permutation of the envs, so every sensor is
+        copied once per minibatch and stays in its storage dtype until it is
+        decoded. With a single minibatch the stored tensors are returned as
+        views without any copy.
+
+        With a chunk_length, the trajectories are split along time instead,
+        see :ref:`chunked_recurrent_generator`.
+        """
+        if chunk_length > 0:
+            yield from self.chunked_recurrent_generator(
+                advantages, num_mini_batch, chunk_length
+            )
+            return
 
-    def recurrent_generator(self, advantages, num_mini_batch):
         num_processes = self.rewards.size(1)
         assert num_processes >= num_mini_batch, (
             "Trainer requires the number of processes ({}) "
@@ -140,91 +544,111 @@ class RolloutStorage:
             "trainer mini batches ({}).".format(num_processes, num_mini_batch)
         )
         num_envs_per_batch = num_processes // num_mini_batch
-        perm = torch.randperm(num_processes)
+        T = self.step
+        perm = torch.randperm(num_processes, device=self.rewards.device)
         for start_ind in range(0, num_processes, num_envs_per_batch):
-            observations_batch = defaultdict(list)
-
-            recurrent_hidden_states_batch = []
-            actions_batch = []
-            prev_actions_batch = []
-            value_preds_batch = []
-            return_batch = []
-            masks_batch = []
-            old_action_log_probs_batch = []
-            adv_targ = []
-
-            for offset in range(num_envs_per_batch):
-                ind = perm[start_ind + offset]
-
-                for sensor in self.observations:
-                    observations_batch[sensor].append(
-                        self.observations[sensor][: self.step, ind]
-                    )
-
-                recurrent_hidden_states_batch.append(
-                    self.recurrent_hidden_states[0, :, ind]
-                )
-
-                actions_batch.append(self.actions[: self.step, ind])
-                prev_actions_batch.append(self.prev_actions[: self.step, ind])
-                value_preds_batch.append(self.value_preds[: self.step, ind])
-                return_batch.append(self.returns[: self.step, ind])
-                masks_batch.append(self.masks[: self.step, ind])
-                old_action_log_probs_batch.append(
-                    self.action_log_probs[: self.step, ind]
-                )
-
-                adv_targ.append(advantages[: self.step, ind])
-
-            T, N = self.step, num_envs_per_batch
-
-            # These are all tensors of size (T, N, -1)
-            for sensor in observations_batch:
-                observations_batch[sensor] = torch.stack(
-                    observations_batch[sensor], 1
-                )
+            if num_envs_per_batch == num_processes:
+                # The whole rollout is the minibatch, the env order does not
+                # matter
+                def gather(tensor):
+                    return tensor[:T].flatten(0, 1)
+
+                recurrent_hidden_states_batch = self.recurrent_hidden_states[
+                    0
+                ]
+            else:
+                ind = perm[start_ind : start_ind + num_envs_per_batch]
+
+                def gather(tensor):
+                    return tensor[:T].index_select(1, ind).flatten(0, 1)
+
+                # States is just a (num_recurrent_layers, N, -1) tensor
+                recurrent_hidden_states_batch = self.recurrent_hidden_states[
+                    0
+                ].index_select(1, ind)
+
+            observations_batch = {
+                sensor: self._decode_observation(sensor, gather(observation))
+                for sensor, observation in self.observations.items()
+            }
 
-            actions_batch = torch.stack(actions_batch, 1)
-            prev_actions_batch = torch.stack(prev_actions_batch, 1)
-            value_preds_batch = torch.stack(value_preds_batch, 1)
-            return_batch = torch.stack(return_batch, 1)
-            masks_batch = torch.stack(masks_batch, 1)
-            old_action_log_probs_batch = torch.stack(
-                old_action_log_probs_batch, 1
+            yield (
+                observations_batch,
+                recurrent_hidden_states_batch,
+                gather(self.actions),
+                gather(self.prev_actions),
+                gather(self.value_preds),
+                gather(self.returns),
+                gather(self.masks),
+                gather(self.action_log_probs),
+                gather(advantages),
             )
-            adv_targ = torch.stack(adv_targ, 1)
 
-            # States is just a (num_recurrent_layers, N, -1) tensor
-            recurrent_hidden_states_batch = torch.stack(
-                recurrent_hidden_states_batch, 1
+    def chunked_recurrent_generator(
+        self, advantages, num_mini_batch, chunk_length
+    ):
+        r"""Yields minibatches of fixed-length trajectory chunks for the
+        recurrent policy. Every env trajectory is cut into chunks of
+        chunk_length steps that start from the hidden state stored at their
+        first step, and the chunks of all envs are shuffled into
+        num_mini_batch minibatches of (chunk_length * chunks per minibatch,
+        ...) tensors. The minibatch size therefore does not depend on the
+        number of envs. Chunks that do not divide evenly are spread over the
+        minibatches.
+
+        The rollout length must be a multiple of chunk_length. Only a rollout
+        cut short by DD-PPO preemption can end with a partial chunk, whose
+        steps are left out.
+        """
+        if self.num_steps % chunk_length != 0:
+            raise ValueError(
+                "The rollout length ({}) must be a multiple of the recurrent "
+                "chunk length ({}).".format(self.num_steps, chunk_length)
             )
-
-            # Flatten the (T, N, ...) tensors to (T * N, ...)
-            for sensor in observations_batch:
-                observations_batch[sensor] = self._flatten_helper(
-                    T, N, observations_batch[sensor]
-                )
-
-            actions_batch = self._flatten_helper(T, N, actions_batch)
-            prev_actions_batch = self._flatten_helper(T, N, prev_actions_batch)
-            value_preds_batch = self._flatten_helper(T, N, value_preds_batch)
-            return_batch = self._flatten_helper(T, N, return_batch)
-            masks_batch = self._flatten_helper(T, N, masks_batch)
-            old_action_log_probs_batch = self._flatten_helper(
-                T, N, old_action_log_probs_batch
+        num_processes = self.rewards.size(1)
+        num_chunks = self.step // chunk_length
+        num_sequences = num_chunks * num_processes
+        assert num_sequences >= num_mini_batch, (
+            "Trainer requires the number of rollout chunks ({}) "
+            "to be greater than or equal to the number of "
+            "trainer mini batches ({}).".format(num_sequences, num_mini_batch)
+        )
+        device = self.rewards.device
+        perm = torch.randperm(num_sequences, device=device)
+        time_offsets = torch.arange(chunk_length, device=device).unsqueeze(1)
+        for batch in range(num_mini_batch):
+            start_ind = batch * num_sequences // num_mini_batch
+            end_ind = (batch + 1) * num_sequences // num_mini_batch
+            sequences = perm[start_ind:end_ind]
+            start_steps = (sequences // num_processes) * chunk_length
+            env_ind = sequences % num_processes
+            # (chunk_length, M) indices of every step of the chunks
+            step_ind = start_steps.unsqueeze(0) + time_offsets
+            env_step_ind = env_ind.unsqueeze(0).expand_as(step_ind)
+
+            def gather(tensor):
+                return tensor[step_ind, env_step_ind].flatten(0, 1)
+
+            # States is just a (num_recurrent_layers, M, -1) tensor
+            recurrent_hidden_states_batch = self.get_recurrent_hidden_states(
+                start_steps, env_ind
             )
-            adv_targ = self._flatten_helper(T, N, adv_targ)
+
+            observations_batch = {
+                sensor: self._decode_observation(sensor, gather(observation))
+                for sensor, observation in self.observations.items()
+            }
 
             yield (
                 observations_batch,
                 recurrent_hidden_states_batch,
-                actions_batch,
-                prev_actions_batch,
-                value_preds_batch,
-                return_batch,
-                masks_batch,
-                old_action_log_probs_batch,
-                adv_targ,
+                gather(self.actions),
+                gather(self.prev_actions),
+                gather(self.value_preds),
+                gather(self.returns),
+                gather(self.masks),
+                gather(self.action_log_probs),
+                gather(advantages),
             )
 
     @staticmethod
@@ -35,9 +35,45 @@ _C.SENSORS = ["RGB_SENSOR", "DEPTH_SENSOR"]
 _C.CHECKPOINT_FOLDER = "data/checkpoints"
 _C.NUM_UPDATES = 10000
 _C.LOG_INTERVAL = 10
+# Ship the seconds every env spent in each sensor and measure back in the
+# step infos and log their moving averages per env step at LOG_INTERVAL
+_C.LOG_COMPONENT_TIMES = False
 _C.LOG_FILE = "train.log"
 _C.CHECKPOINT_INTERVAL = 50
 _C.FORCE_BLIND_POLICY = False
+# Transport Box observations from env workers through preallocated
+# shared-memory buffers instead of pickling them through the pipes
+_C.USE_SHARED_MEMORY_OBSERVATIONS = False
+# Record the profiling_utils ranges of the trainer on the CPU and write them
+# to this sqlite file (NVTX_EVENTS schema, readable by compare_profiles.py),
+# keeping at most the last CPU_PROFILE_CAPACITY ranges
+_C.CPU_PROFILE_PATH = ""
+_C.CPU_PROFILE_CAPACITY = 1000000
+# Log the memory owned by the rollouts, the policy, the optimizer and the
+# sensors, visualpriors networks and episodes of every env worker, with the
+# RSS of all processes, at startup and every MEMORY_REPORT_INTERVAL updates
+# (0 disables it). The env workers are left out with use_decoupled_actor,
+# whose actor thread keeps them busy
+_C.MEMORY_REPORT_INTERVAL = 0
+# Also log the source lines holding the most memory in the trainer and in
+# the workers, traced with tracemalloc from the first report on (slow)
+_C.MEMORY_REPORT_TRACEMALLOC_TOP = 0
+# Profile the trainer and every env worker for PROFILE_TRIGGER_SECONDS when
+# PROFILE_TRIGGER_DIR/profile.trigger is touched, or a single process when
+# it receives SIGUSR2, and write one profile per process to
+# PROFILE_TRIGGER_DIR: collapsed stacks for flamegraph.pl ("sample") or a
+# .pstats file ("cprofile"). Empty disables the trigger
+_C.PROFILE_TRIGGER_DIR = ""
+_C.PROFILE_TRIGGER_SECONDS = 30.0
+_C.PROFILE_TRIGGER_MODE = "sample"
+# Modules imported once by the forkserver that starts the env workers, so
+# the workers inherit them instead of importing them again
+_C.FORKSERVER_PRELOAD = [
+    "torch",
+    "habitat",
+    "habitat_baselines.common.environments",
+    "habitat.sims.habitat_simulator.sensors",
+]
 # -----------------------------------------------------------------------------
 # EVAL CONFIG
 # -----------------------------------------------------------------------------
@@ -45,6 +81,9 @@ _C.EVAL = CN()
 # The split to evaluate on
 _C.EVAL.SPLIT = "val"
 _C.EVAL.USE_CKPT_CONFIG = True
+# Keep the env workers, their simulators and sensors alive between evaluated
+# checkpoints and retarget them to the config of the next checkpoint
+_C.EVAL.REUSE_ENVS = True
 # -----------------------------------------------------------------------------
 # REINFORCEMENT LEARNING (RL) ENVIRONMENT CONFIG
 # -----------------------------------------------------------------------------
@@ -60,6 +99,9 @@ _C.RL.PPO = CN()
 _C.RL.PPO.clip_param = 0.2
 _C.RL.PPO.ppo_epoch = 4
 _C.RL.PPO.num_mini_batch = 16
+# Split the rollout along time into chunks of this many steps for the
+# recurrent minibatches, must divide num_steps. 0 splits along envs only
+_C.RL.PPO.recurrent_chunk_length = 0
 _C.RL.PPO.value_loss_coef = 0.5
 _C.RL.PPO.entropy_coef = 0.01
 _C.RL.PPO.lr = 7e-4
@@ -67,13 +109,46 @@ _C.RL.PPO.eps = 1e-5
 _C.RL.PPO.max_grad_norm = 0.5
 _C.RL.PPO.num_steps = 5
 _C.RL.PPO.use_gae = True
+# Compute the GAE TD errors while the rollout is collected, leaving a single
+# backward pass over the rollout for its end
+_C.RL.PPO.use_incremental_returns = False
 _C.RL.PPO.use_linear_lr_decay = False
 _C.RL.PPO.use_linear_clip_decay = False
 _C.RL.PPO.gamma = 0.99
 _C.RL.PPO.tau = 0.95
 _C.RL.PPO.reward_window_size = 50
 _C.RL.PPO.use_normalized_advantage = True
+# Run evaluate_actions of the PPO update under autocast, "bf16" (CPU or
+# CUDA) or "fp16" (CUDA only, with loss scaling). Optimizer state, value
+# targets and losses stay in fp32
+_C.RL.PPO.autocast = ""
 _C.RL.PPO.hidden_size = 512
+# Sensors kept as half precision floats in the rollout storage
+_C.RL.PPO.fp16_observations = []
+# Sensors quantized to uint8 between their observation space bounds in the
+# rollout storage, other sensors are stored in their native dtype
+_C.RL.PPO.uint8_observations = []
+# Split the envs into two groups and run the policy on one group while the
+# other one is simulating
+_C.RL.PPO.use_double_buffered_sampler = False
+# Run the policy on the envs as soon as first_ready_fraction of them have
+# returned instead of waiting for all of them, so slow envs (scene loads,
+# map rebuilds) do not stall the others
+_C.RL.PPO.use_first_ready_sampler = False
+_C.RL.PPO.first_ready_fraction = 0.5
+# Keep stepping the envs in a background actor with a snapshot of the policy
+# while the learner updates on the previous rollout. The snapshot is
+# refreshed after every update and the policy lag is corrected with V-trace
+# importance weights truncated at vtrace_rho_clip and vtrace_c_clip
+_C.RL.PPO.use_decoupled_actor = False
+_C.RL.PPO.vtrace_rho_clip = 1.0
+_C.RL.PPO.vtrace_c_clip = 1.0
+# Collect rollouts with Policy.act_inference, which runs under
+# torch.inference_mode and skips the action distribution and its entropy.
+# inference_net can be "script" or "compile" to run a torch.jit.script or
+# torch.compile version of the policy net
+_C.RL.PPO.use_inference_act = False
+_C.RL.PPO.inference_net = ""
 # -----------------------------------------------------------------------------
 # DECENTRALIZED DISTRIBUTED PROXIMAL POLICY OPTIMIZATION (DD-PPO)
 # -----------------------------------------------------------------------------
@@ -0,0 +1,10 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from habitat_baselines.rl.ddppo.algo.ddppo import DDPPO
+from habitat_baselines.rl.ddppo.algo.ddppo_trainer import DDPPOTrainer
+
+__all__ = ["DDPPO", "DDPPOTrainer"]
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import os
+from typing import Tuple
+
+import torch.distributed as distrib
+
+DEFAULT_PORT = 8738
+DEFAULT_MASTER_ADDR = "127.0.0.1"
+
+
+def get_distrib_size() -> Tuple[int, int, int]:
+    r"""Reads the rank of this process from the SLURM environment variables
+    or, when not running under SLURM, from the ones set by
+    ``torch.distributed.run`` (``LOCAL_RANK``, ``RANK`` and ``WORLD_SIZE``).
+
+    Returns:
+        local rank, world rank and world size.
+    """
+    if "SLURM_JOBID" in os.environ and "SLURM_PROCID" in os.environ:
+        local_rank = int(os.environ["SLURM_LOCALID"])
+        world_rank = int(os.environ["SLURM_PROCID"])
+        world_size = int(os.environ["SLURM_NTASKS"])
+    else:
+        local_rank = int(os.environ.get("LOCAL_RANK", 0))
+        world_rank = int(os.environ.get("RANK", 0))
+        world_size = int(os.environ.get("WORLD_SIZE", 1))
+
+    return local_rank, world_rank, world_size
+
+
+def init_distrib(backend: str = "gloo") -> Tuple[int, distrib.TCPStore]:
+    r"""Initializes torch.distributed from the environment variables, see
+    :ref:`get_distrib_size`. ``MASTER_ADDR`` and ``MASTER_PORT`` give the
+    address of the TCPStore hosted by rank 0.
+
+    Args:
+        backend: backend of torch.distributed, gloo works on CPU-only nodes.
+
+    Returns:
+        local rank of this process and the TCPStore shared by all ranks.
+    """
+    assert (
+        distrib.is_available()
+    ), "torch.distributed must be available to use DD-PPO"
+
+    local_rank, world_rank, world_size = get_distrib_size()
+
+    master_port = int(os.environ.get("MASTER_PORT", DEFAULT_PORT))
+    master_addr = os.environ.get("MASTER_ADDR", DEFAULT_MASTER_ADDR)
+
+    tcp_store = distrib.TCPStore(
+        master_addr, master_port, world_size, world_rank == 0
+    )
+    distrib.init_process_group(
+        backend, store=tcp_store, rank=world_rank, world_size=world_size
+    )
+
+    return local_rank, tcp_store
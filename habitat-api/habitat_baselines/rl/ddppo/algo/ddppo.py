@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from typing import Tuple
+
+import torch
+import torch.distributed as distrib
+
+from habitat_baselines.rl.ppo import PPO
+
+EPS_PPO = 1e-5
+
+
+def distributed_mean_and_var(
+    values: torch.Tensor,
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    r"""Computes the mean and variance of a tensor over multiple workers.
+
+    This method is equivalent to first collecting all versions of values and
+    then computing the mean and variance locally over that.
+
+    Args:
+        values: (*,) shaped tensors to compute mean and variance over. Assumed
+            to be solely the workers local copy of this tensor, the resultant
+            mean and variance will be computed over _all_ workers version of
+            this tensor.
+
+    Returns:
+        mean and variance of values over all workers.
+    """
+    assert distrib.is_initialized(), "Distributed must be initialized"
+
+    world_size = distrib.get_world_size()
+    mean = values.mean()
+    distrib.all_reduce(mean)
+    mean /= world_size
+
+    sq_diff = (values - mean).pow(2).mean()
+    distrib.all_reduce(sq_diff)
+    var = sq_diff / world_size
+
+    return mean, var
+
+
+class DecentralizedDistributedMixin:
+    r"""Turns :ref:`PPO` into decentralized distributed PPO (Wijmans et al.
+    2019, https://arxiv.org/abs/1911.00357): every worker keeps its own copy
+    of the model and the gradients are averaged over all workers after every
+    backward pass, so the copies stay identical.
+    """
+
+    def init_distributed(self) -> None:
+        r"""Makes the model of every worker start from the one of rank 0."""
+        for param in self.actor_critic.state_dict().values():
+            distrib.broadcast(param, src=0)
+
+    def get_advantages(self, rollouts):
+        # Only the steps collected before a preemption are valid
+        advantages = (
+            rollouts.returns[: rollouts.step]
+            - rollouts.value_preds[: rollouts.step]
+        )
+        return self._normalize_advantages(advantages)
+
+    def _normalize_advantages(self, advantages):
+        if not self.use_normalized_advantage:
+            return advantages
+
+        mean, var = distributed_mean_and_var(advantages)
+
+        return (advantages - mean) / (var.sqrt() + EPS_PPO)
+
+    def after_backward(self, loss):
+        super().after_backward(loss)
+
+        params = [
+            param
+            for param in self.actor_critic.parameters()
+            if param.requires_grad
+        ]
+        # Unused parameters contribute zeros so that every worker reduces a
+        # buffer of the same size
+        grads = torch.cat(
+            [
+                param.grad.reshape(-1)
+                if param.grad is not None
+                else torch.zeros_like(param).reshape(-1)
+                for param in params
+            ]
+        )
+        distrib.all_reduce(grads)
+        grads /= distrib.get_world_size()
+
+        offset = 0
+        for param in params:
+            numel = param.numel()
+            param.grad = grads[offset : offset + numel].view_as(param)
+            offset += numel
+
+
+class DDPPO(DecentralizedDistributedMixin, PPO):
+    pass
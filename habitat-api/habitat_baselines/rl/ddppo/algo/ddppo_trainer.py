@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import contextlib
+import json
+import os
+import random
+import time
+from collections import defaultdict, deque
+
+import numpy as np
+import torch
+import torch.distributed as distrib
+from torch.optim.lr_scheduler import LambdaLR
+
+from habitat import Config, logger
+from habitat_baselines.common.baseline_registry import baseline_registry
+from habitat_baselines.common.env_utils import construct_envs
+from habitat_baselines.common.environments import get_env_class
+from habitat_baselines.common.rollout_storage import RolloutStorage
+from habitat_baselines.common.tensorboard_utils import TensorboardWriter
+from habitat_baselines.common.utils import linear_decay
+from habitat_baselines.rl.ddppo.algo.ddp_utils import init_distrib
+from habitat_baselines.rl.ddppo.algo.ddppo import DDPPO
+from habitat_baselines.rl.ppo.ppo_trainer import PPOTrainer
+from policies.get_policy import get_current_policy_object
+
+from habitat.utils import profiling_utils
+
+
+@baseline_registry.register_trainer(name="ddppo")
+class DDPPOTrainer(PPOTrainer):
+    r"""Trainer class for decentralized distributed PPO.
+    Paper: https://arxiv.org/abs/1911.00357.
+
+    Every process (rank) owns its own VectorEnv and copy of the model. The
+    gradients are averaged over all ranks through torch.distributed, so the
+    ranks can be spread over several CPU-only nodes with the gloo backend.
+    Launch one process per rank, e.g. locally with
+    :py:`python -m torch.distributed.run --nproc_per_node 4 run.py ...`.
+    """
+
+    # DD-PPO cuts rollouts short to mitigate the straggler effect.
+    # All rollouts contribute equally to the model update, so this threshold
+    # limits how short a rollout can be as a fraction of num_steps
+    SHORT_ROLLOUT_THRESHOLD: float = 0.25
+
+    def __init__(self, config=None):
+        super().__init__(config)
+        self.local_rank = 0
+        self.world_rank = 0
+        self.world_size = 1
+
+    def _setup_actor_critic_agent(self, ppo_cfg: Config) -> None:
+        r"""Sets up actor critic and agent for DD-PPO.
+
+        Args:
+            ppo_cfg: config node with relevant params
+
+        Returns:
+            None
+        """
+        logger.add_filehandler(self.config.LOG_FILE)
+
+        current_policy = get_current_policy_object(self.policy_name)
+
+        self.actor_critic = current_policy(
+            observation_space=self.envs.observation_spaces[0],
+            action_space=self.envs.action_spaces[0],
+            hidden_size=ppo_cfg.hidden_size,
+        )
+        self.actor_critic.to(self.device)
+
+        self.agent = DDPPO(
+            actor_critic=self.actor_critic,
+            clip_param=ppo_cfg.clip_param,
+            ppo_epoch=ppo_cfg.ppo_epoch,
+            num_mini_batch=ppo_cfg.num_mini_batch,
+            value_loss_coef=ppo_cfg.value_loss_coef,
+            entropy_coef=ppo_cfg.entropy_coef,
+            lr=ppo_cfg.lr,
+            eps=ppo_cfg.eps,
+            max_grad_norm=ppo_cfg.max_grad_norm,
+            use_normalized_advantage=ppo_cfg.use_normalized_advantage,
+            recurrent_chunk_length=ppo_cfg.recurrent_chunk_length,
+            autocast=ppo_cfg.autocast,
+        )
+
+    def _collect_rollout_preemptible(
+        self,
+        ppo_cfg,
+        rollouts,
+        current_episode_reward,
+        running_episode_stats,
+        num_rollouts_done_store,
+    ):
+        r"""Collects up to num_steps steps. Once RL.DDPPO.sync_frac of the
+        ranks are done with their rollout, the rollout of this rank is cut
+        short as soon as it has SHORT_ROLLOUT_THRESHOLD of its steps.
+
+        Returns:
+            pth_time, env_time and number of env steps.
+        """
+        pth_time = 0.0
+        env_time = 0.0
+        count_steps = 0
+        for step in range(ppo_cfg.num_steps):
+            if (
+                step >= ppo_cfg.num_steps * self.SHORT_ROLLOUT_THRESHOLD
+                and int(num_rollouts_done_store.get("num_done"))
+                > self.config.RL.DDPPO.sync_frac * self.world_size
+            ):
+                break
+
+            (
+                delta_pth_time,
+                delta_env_time,
+                delta_steps,
+            ) = self._collect_rollout_step(
+                rollouts, current_episode_reward, running_episode_stats
+            )
+            pth_time += delta_pth_time
+            env_time += delta_env_time
+            count_steps += delta_steps
+
+        num_rollouts_done_store.add("num_done", 1)
+        return pth_time, env_time, count_steps
+
+    def _update_agent(self, ppo_cfg, rollouts):
+        r"""Updates the agent with the same number of minibatches on every
+        rank. A preempted rollout can hold fewer full recurrent chunks than
+        num_mini_batch, so the number of minibatches is clamped to the
+        sequences of the shortest rollout over all ranks, every backward pass
+        all-reduces the gradients. If a rollout holds no full chunk, the
+        update falls back to whole-rollout sequences.
+        """
+        num_mini_batch = ppo_cfg.num_mini_batch
+        chunk_length = ppo_cfg.recurrent_chunk_length
+        if chunk_length > 0:
+            num_sequences = torch.tensor(
+                (rollouts.step // chunk_length) * self.envs.num_envs
+            )
+            distrib.all_reduce(num_sequences, op=distrib.ReduceOp.MIN)
+            num_sequences = int(num_sequences.item())
+            if num_sequences == 0:
+                chunk_length = 0
+                num_sequences = self.envs.num_envs
+            num_mini_batch = min(num_mini_batch, num_sequences)
+
+        self.agent.num_mini_batch = num_mini_batch
+        self.agent.recurrent_chunk_length = chunk_length
+        try:
+            return super()._update_agent(ppo_cfg, rollouts)
+        finally:
+            self.agent.num_mini_batch = ppo_cfg.num_mini_batch
+            self.agent.recurrent_chunk_length = ppo_cfg.recurrent_chunk_length
+
+    def _share_stats_ordering(self, running_episode_stats, tcp_store):
+        r"""Returns the sorted episode stat keys of rank 0, shared with every
+        rank through the store, so that the episode stats all_reduce has the
+        same shape on all ranks. Stats other ranks do not have are reduced as
+        zeros.
+        """
+        store = distrib.PrefixStore("episode_stats", tcp_store)
+        if self.world_rank == 0:
+            store.set("keys", json.dumps(sorted(running_episode_stats.keys())))
+        stats_ordering = json.loads(store.get("keys").decode())
+
+        ignored = sorted(set(running_episode_stats) - set(stats_ordering))
+        if len(ignored) > 0:
+            logger.warning(
+                "rank {}: episode stats {} are not reported by rank 0 and "
+                "are not logged".format(self.world_rank, ignored)
+            )
+        return stats_ordering
+
+    def train(self) -> None:
+        r"""Main method for DD-PPO.
+
+        Returns:
+            None
+        """
+        profiling_utils.range_push("train")
+
+        self.local_rank, tcp_store = init_distrib(
+            self.config.RL.DDPPO.distrib_backend.lower()
+        )
+        # Stores the number of workers that have finished their rollout
+        num_rollouts_done_store = distrib.PrefixStore(
+            "rollout_tracker", tcp_store
+        )
+        num_rollouts_done_store.set("num_done", "0")
+
+        self.world_rank = distrib.get_rank()
+        self.world_size = distrib.get_world_size()
+        self._setup_cpu_profiling(".rank{}".format(self.world_rank))
+        self._setup_profile_trigger("trainer.rank{}".format(self.world_rank))
+
+        self.config.defrost()
+        self.config.TORCH_GPU_ID = self.local_rank
+        self.config.SIMULATOR_GPU_ID = self.local_rank
+        # Multiply by the number of simulators to make sure they also get
+        # unique seeds
+        self.config.TASK_CONFIG.SEED += (
+            self.world_rank * self.config.NUM_PROCESSES
+        )
+        self.config.freeze()
+
+        random.seed(self.config.TASK_CONFIG.SEED)
+        np.random.seed(self.config.TASK_CONFIG.SEED)
+        torch.manual_seed(self.config.TASK_CONFIG.SEED)
+
+        if torch.cuda.is_available():
+            self.device = torch.device("cuda", self.local_rank)
+            torch.cuda.set_device(self.device)
+        else:
+            self.device = torch.device("cpu")
+
+        self.envs = construct_envs(
+            self.config, get_env_class(self.config.ENV_NAME)
+        )
+
+        ppo_cfg = self.config.RL.PPO
+        if self.world_rank == 0 and not os.path.isdir(
+            self.config.CHECKPOINT_FOLDER
+        ):
+            os.makedirs(self.config.CHECKPOINT_FOLDER)
+
+        self._setup_actor_critic_agent(ppo_cfg)
+        self.agent.init_distributed()
+        self._setup_inference_act(ppo_cfg)
+
+        if self.world_rank == 0:
+            logger.info(
+                "agent number of trainable parameters: {}".format(
+                    sum(
+                        param.numel()
+                        for param in self.agent.parameters()
+                        if param.requires_grad
+                    )
+                )
+            )
+
+        rollouts = RolloutStorage(
+            ppo_cfg.num_steps,
+            self.envs.num_envs,
+            self.envs.observation_spaces[0],
+            self.envs.action_spaces[0],
+            ppo_cfg.hidden_size,
+            observation_storage=self._get_observation_storage(ppo_cfg),
+        )
+        rollouts.to(self.device)
+        if ppo_cfg.use_incremental_returns and ppo_cfg.use_gae:
+            rollouts.enable_incremental_returns(ppo_cfg.gamma, ppo_cfg.tau)
+
+        observations = self.envs.reset()
+        rollouts.insert_observations(0, observations)
+        observations = None
+
+        current_episode_reward = torch.zeros(self.envs.num_envs, 1)
+        running_episode_stats = dict(
+            count=torch.zeros(self.envs.num_envs, 1),
+            reward=torch.zeros(self.envs.num_envs, 1),
+        )
+        window_episode_stats = defaultdict(
+            lambda: deque(maxlen=ppo_cfg.reward_window_size)
+        )
+        # keys of the episode stats all_reduce, shared by all ranks after the
+        # first rollout
+        stats_ordering = None
+
+        t_start = time.time()
+        env_time = 0
+        pth_time = 0
+        count_steps = 0
+        count_checkpoints = 0
+
+        lr_scheduler = LambdaLR(
+            optimizer=self.agent.optimizer,
+            lr_lambda=lambda x: linear_decay(x, self.config.NUM_UPDATES),
+        )
+
+        with (
+            TensorboardWriter(
+                self.config.TENSORBOARD_DIR, flush_secs=self.flush_secs
+            )
+            if self.world_rank == 0
+            else contextlib.suppress()
+        ) as writer:
+            for update in range(self.config.NUM_UPDATES):
+                profiling_utils.range_push("train loop body")
+                if self._profile_trigger is not None:
+                    self._profile_trigger.poll()
+                if ppo_cfg.use_linear_lr_decay:
+                    lr_scheduler.step()
+
+                if ppo_cfg.use_linear_clip_decay:
+                    self.agent.clip_param = ppo_cfg.clip_param * linear_decay(
+                        update, self.config.NUM_UPDATES
+                    )
+
+                (
+                    delta_pth_time,
+                    delta_env_time,
+                    count_steps_delta,
+                ) = self._collect_rollout_preemptible(
+                    ppo_cfg,
+                    rollouts,
+                    current_episode_reward,
+                    running_episode_stats,
+                    num_rollouts_done_store,
+                )
+                pth_time += delta_pth_time
+                env_time += delta_env_time
+
+                (
+                    delta_pth_time,
+                    value_loss,
+                    action_loss,
+                    dist_entropy,
+                ) = self._update_agent(ppo_cfg, rollouts)
+                pth_time += delta_pth_time
+
+                if stats_ordering is None:
+                    stats_ordering = self._share_stats_ordering(
+                        running_episode_stats, tcp_store
+                    )
+                stats = torch.stack(
+                    [
+                        running_episode_stats[k]
+                        if k in running_episode_stats
+                        else torch.zeros_like(running_episode_stats["count"])
+                        for k in stats_ordering
+                    ],
+                    0,
+                )
+                distrib.all_reduce(stats)
+
+                for i, k in enumerate(stats_ordering):
+                    window_episode_stats[k].append(stats[i].clone())
+
+                stats = torch.tensor(
+                    [value_loss, action_loss, count_steps_delta],
+                    dtype=torch.float,
+                )
+                distrib.all_reduce(stats)
+                count_steps += int(stats[2].item())
+
+                if self.world_rank == 0:
+                    num_rollouts_done_store.set("num_done", "0")
+
+                    losses = [
+                        stats[0].item() / self.world_size,
+                        stats[1].item() / self.world_size,
+                    ]
+                    deltas = {
+                        k: (
+                            (v[-1] - v[0]).sum().item()
+                            if len(v) > 1
+                            else v[0].sum().item()
+                        )
+                        for k, v in window_episode_stats.items()
+                    }
+                    deltas["count"] = max(deltas["count"], 1.0)
+
+                    writer.add_scalar(
+                        "reward",
+                        deltas["reward"] / deltas["count"],
+                        count_steps,
+                    )
+
+                    # Check to see if there are any metrics
+                    # that haven't been logged yet
+                    metrics = {
+                        k: v / deltas["count"]
+                        for k, v in deltas.items()
+                        if k not in {"reward", "count"}
+                    }
+                    if len(metrics) > 0:
+                        writer.add_scalars("metrics", metrics, count_steps)
+
+                    writer.add_scalars(
+                        "losses",
+                        {k: l for l, k in zip(losses, ["value", "policy"])},
+                        count_steps,
+                    )
+
+                    # log stats
+                    if update > 0 and update % self.config.LOG_INTERVAL == 0:
+                        logger.info(
+                            "update: {}\tfps: {:.3f}\t".format(
+                                update, count_steps / (time.time() - t_start)
+                            )
+                        )
+
+                        logger.info(
+                            "update: {}\tenv-time: {:.3f}s\tpth-time: {:.3f}s\t"
+                            "frames: {}".format(
+                                update, env_time, pth_time, count_steps
+                            )
+                        )
+
+                        logger.info(
+                            "Average window size: {}  {}".format(
+                                len(window_episode_stats["count"]),
+                                "  ".join(
+                                    "{}: {:.3f}".format(k, v / deltas["count"])
+                                    for k, v in deltas.items()
+                                    if k != "count"
+                                ),
+                            )
+                        )
+
+                    # checkpoint model
+                    if update % self.config.CHECKPOINT_INTERVAL == 0:
+                        self.save_checkpoint(
+                            f"ckpt.{count_checkpoints}.pth",
+                            dict(step=count_steps),
+                        )
+                        count_checkpoints += 1
+                profiling_utils.range_pop()  # train loop body
+
+            self.envs.close()
+            if self._profile_trigger is not None:
+                self._profile_trigger.stop()
+
+        profiling_utils.range_pop()  # train
+        profiling_utils.flush_cpu_profile()
@@ -83,9 +83,54 @@ class RNNStateEncoder(nn.Module):
         hidden_states = self._pack_hidden(hidden_states)
         return x, hidden_states
 
+    def _select_hidden(self, hidden_states, index):
+        if isinstance(hidden_states, tuple):
+            return tuple(v[:, index] for v in hidden_states)
+
+        return hidden_states[:, index]
+
+    @staticmethod
+    def _build_pack_info(masks):
+        r"""Splits the (T, N) masks into one sequence per env and episode.
+        A sequence starts at t=0 and at every step with a zero mask.
+
+        Returns:
+            flat_index: (max_len, S) indices of the steps of every sequence
+                in the (T * N) flattened steps, 0 past the sequence end.
+            valid: (max_len, S) bool tensor of the real steps.
+            lengths: (S,) CPU tensor of the sequence lengths.
+            envs: (S,) env of every sequence.
+            starts: (S,) first step of every sequence.
+            last_sequences: (N,) sequence ending the rollout of every env.
+        """
+        t, n = masks.size()
+        episode_starts = masks.cpu() == 0.0
+        episode_starts[0] = True
+        # env-major, so the sequences of an env are consecutive and in order
+        envs, starts = episode_starts.t().nonzero(as_tuple=True)
+        ends = torch.full_like(starts, t)
+        same_env = envs[1:] == envs[:-1]
+        ends[:-1][same_env] = starts[1:][same_env]
+        lengths = ends - starts
+        last_sequences = (ends == t).nonzero(as_tuple=True)[0]
+
+        steps = starts.unsqueeze(0) + torch.arange(
+            int(lengths.max())
+        ).unsqueeze(1)
+        valid = steps < ends.unsqueeze(0)
+        flat_index = torch.where(
+            valid, steps * n + envs.unsqueeze(0), torch.zeros_like(steps)
+        )
+        return flat_index, valid, lengths, envs, starts, last_sequences
+
     def seq_forward(self, x, hidden_states, masks):
         r"""Forward for a sequence of length T
 
+        Every env's rollout is cut at its own episode boundaries and all the
+        resulting sequences go through the RNN as a single packed sequence,
+        starting from the stored hidden state for the first one of every env
+        and from zeros after an episode boundary.
+
         Args:
             x: (T, N, -1) Tensor that has been flattened to (T * N, -1)
             hidden_states: The starting hidden state.
@@ -95,45 +140,44 @@ class RNNStateEncoder(nn.Module):
         # x is a (T, N, -1) tensor flattened to (T * N, -1)
         n = hidden_states.size(1)
         t = int(x.size(0) / n)
-
-        # unflatten
-        x = x.view(t, n, x.size(1))
         masks = masks.view(t, n)
 
-        # steps in sequence which have zero for any agent. Assume t=0 has
-        # a zero in it.
-        has_zeros = (masks[1:] == 0.0).any(dim=-1).nonzero().squeeze().cpu()
-
-        # +1 to correct the masks[1:]
-        if has_zeros.dim() == 0:
-            has_zeros = [has_zeros.item() + 1]  # handle scalar
-        else:
-            has_zeros = (has_zeros + 1).numpy().tolist()
-
-        # add t=0 and t=T to the list
-        has_zeros = [0] + has_zeros + [t]
-
-        hidden_states = self._unpack_hidden(hidden_states)
-        outputs = []
-        for i in range(len(has_zeros) - 1):
-            # process steps that don't have any zeros in masks together
-            start_idx = has_zeros[i]
-            end_idx = has_zeros[i + 1]
-
-            rnn_scores, hidden_states = self.rnn(
-                x[start_idx:end_idx],
-                self._mask_hidden(
-                    hidden_states, masks[start_idx].view(1, -1, 1)
-                ),
-            )
-
-            outputs.append(rnn_scores)
+        (
+            flat_index,
+            valid,
+            lengths,
+            envs,
+            starts,
+            last_sequences,
+        ) = self._build_pack_info(masks)
+        flat_index = flat_index.to(x.device)
+        valid = valid.to(x.device)
+        envs = envs.to(x.device)
+        starts = starts.to(x.device)
+        last_sequences = last_sequences.to(x.device)
+
+        # The mask at the first step keeps the stored hidden state of the
+        # first sequence of an env (if the episode continues) and resets the
+        # others
+        hidden_states = self._mask_hidden(
+            self._select_hidden(self._unpack_hidden(hidden_states), envs),
+            masks[starts, envs].view(1, -1, 1),
+        )
+        packed_scores, hidden_states = self.rnn(
+            nn.utils.rnn.pack_padded_sequence(
+                x[flat_index], lengths, enforce_sorted=False
+            ),
+            hidden_states,
+        )
+        rnn_scores, _ = nn.utils.rnn.pad_packed_sequence(packed_scores)
 
-        # x is a (T, N, -1) tensor
-        x = torch.cat(outputs, dim=0)
-        x = x.view(t * n, -1)  # flatten
+        # back to the (T * N, -1) flattened steps
+        x = rnn_scores.new_empty(t * n, rnn_scores.size(-1))
+        x[flat_index[valid]] = rnn_scores[valid]
 
-        hidden_states = self._pack_hidden(hidden_states)
+        hidden_states = self._pack_hidden(
+            self._select_hidden(hidden_states, last_sequences)
+        )
         return x, hidden_states
 
     def forward(self, x, hidden_states, masks):
@@ -18,6 +18,9 @@ from habitat_baselines.common.utils import CategoricalNet, Flatten
 from habitat_baselines.rl.models.rnn_state_encoder import RNNStateEncoder
 from habitat_baselines.rl.models.simple_cnn import SimpleCNN
 
+# torch.inference_mode only exists from torch 1.9 on
+_inference_mode = getattr(torch, "inference_mode", torch.no_grad)
+
 
 class Policy(nn.Module):
     def __init__(self, net, dim_actions):
@@ -29,10 +32,25 @@ class Policy(nn.Module):
             self.net.output_size, self.dim_actions
         )
         self.critic = CriticHead(self.net.output_size)
+        self._inference_net = None
+
+    def __getstate__(self):
+        # The inference net wraps self.net, copies fall back to their own net
+        state = self.__dict__.copy()
+        state["_inference_net"] = None
+        return state
 
     def forward(self, *x):
         raise NotImplementedError
 
+    def set_inference_net(self, net):
+        r"""Makes :ref:`act_inference` run net instead of self.net, e.g. a
+        scripted or compiled version of self.net sharing its parameters.
+        None goes back to self.net. The net is not registered as a submodule
+        so it is not saved twice in checkpoints.
+        """
+        self.__dict__["_inference_net"] = net
+
     def act(
         self,
         observations,
@@ -56,6 +74,48 @@ class Policy(nn.Module):
 
         return value, action, action_log_probs, rnn_hidden_states
 
+    @_inference_mode()
+    def act_inference(
+        self,
+        observations,
+        rnn_hidden_states,
+        prev_actions,
+        masks,
+        deterministic=False,
+        out=None,
+    ):
+        r"""Same as :ref:`act` for rollout collection, without autograd.
+        Runs under torch.inference_mode, samples the action and its log
+        probability straight from the logits without building the action
+        distribution and without computing its entropy.
+
+        Args:
+            out: optional (value, action, action_log_probs) tensors of the
+                batch size the outputs are written into, e.g. the slots of
+                the rollout storage, instead of allocating new ones.
+        """
+        net = self.net if self._inference_net is None else self._inference_net
+        features, rnn_hidden_states = net(
+            observations, rnn_hidden_states, prev_actions, masks
+        )
+        value = self.critic(features)
+        logits = self.action_distribution.linear(features)
+        log_probs = torch.log_softmax(logits, dim=-1)
+        if deterministic:
+            action = logits.argmax(dim=-1, keepdim=True)
+        else:
+            # Gumbel-max trick, -log of an Exp(1) sample is Gumbel(0, 1)
+            gumbel = torch.empty_like(logits).exponential_().log_().neg_()
+            action = (log_probs + gumbel).argmax(dim=-1, keepdim=True)
+        action_log_probs = log_probs.gather(-1, action)
+
+        if out is not None:
+            for output, result in zip(out, (value, action, action_log_probs)):
+                output.copy_(result)
+            value, action, action_log_probs = out
+
+        return value, action, action_log_probs, rnn_hidden_states
+
     def get_value(self, observations, rnn_hidden_states, prev_actions, masks):
         features, _ = self.net(
             observations, rnn_hidden_states, prev_actions, masks
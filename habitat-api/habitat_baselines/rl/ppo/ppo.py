@@ -4,6 +4,8 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
+import contextlib
+
 import torch
 import torch.nn as nn
 import torch.optim as optim
@@ -12,6 +14,8 @@ from habitat.utils import profiling_utils
 
 EPS_PPO = 1e-5
 
+AUTOCAST_DTYPES = {"bf16": torch.bfloat16, "fp16": torch.float16}
+
 
 class PPO(nn.Module):
     def __init__(
@@ -27,6 +31,8 @@ class PPO(nn.Module):
         max_grad_norm=None,
         use_clipped_value_loss=True,
         use_normalized_advantage=True,
+        recurrent_chunk_length=0,
+        autocast="",
     ):
 
         super().__init__()
@@ -50,19 +56,51 @@ class PPO(nn.Module):
         )
         self.device = next(actor_critic.parameters()).device
         self.use_normalized_advantage = use_normalized_advantage
+        self.recurrent_chunk_length = recurrent_chunk_length
+
+        # evaluate_actions runs in autocast_dtype, the parameters, the
+        # optimizer state and the losses stay in fp32
+        self.autocast_dtype = AUTOCAST_DTYPES.get(autocast)
+        assert autocast == "" or self.autocast_dtype is not None, (
+            "Unknown autocast mode {}".format(autocast)
+        )
+        self.grad_scaler = None
+        if self.autocast_dtype == torch.float16:
+            assert self.device.type == "cuda", "fp16 autocast requires CUDA"
+            # Only fp16 gradients can underflow, bf16 keeps the fp32 range
+            self.grad_scaler = torch.cuda.amp.GradScaler()
 
     def forward(self, *x):
         raise NotImplementedError
 
     def get_advantages(self, rollouts):
         advantages = rollouts.returns[:-1] - rollouts.value_preds[:-1]
+        return self._normalize_advantages(advantages)
+
+    def _normalize_advantages(self, advantages):
         if not self.use_normalized_advantage:
             return advantages
 
         return (advantages - advantages.mean()) / (advantages.std() + EPS_PPO)
 
-    def update(self, rollouts):
-        advantages = self.get_advantages(rollouts)
+    def _autocast(self):
+        if self.autocast_dtype is None:
+            return contextlib.suppress()
+        return torch.autocast(self.device.type, dtype=self.autocast_dtype)
+
+    def update(self, rollouts, advantages=None):
+        r"""Runs the PPO epochs on :p:`rollouts`.
+
+        Args:
+            rollouts: RolloutStorage with computed returns.
+            advantages: optional ``(num_steps, num_envs, 1)`` advantages
+                replacing ``returns - value_preds``, e.g. the V-trace policy
+                gradient advantages of a decoupled actor.
+        """
+        if advantages is None:
+            advantages = self.get_advantages(rollouts)
+        else:
+            advantages = self._normalize_advantages(advantages)
 
         value_loss_epoch = 0
         action_loss_epoch = 0
@@ -70,7 +108,7 @@ class PPO(nn.Module):
 
         for e in range(self.ppo_epoch):
             data_generator = rollouts.recurrent_generator(
-                advantages, self.num_mini_batch
+                advantages, self.num_mini_batch, self.recurrent_chunk_length
             )
 
             for sample in data_generator:
@@ -88,19 +126,24 @@ class PPO(nn.Module):
 
                 # Reshape to do in a single forward pass for all steps
                 profiling_utils.range_push("evaluate_actions (for surrogate loss)")
-                (
-                    values,
-                    action_log_probs,
-                    dist_entropy,
-                    _,
-                ) = self.actor_critic.evaluate_actions(
-                    obs_batch,
-                    recurrent_hidden_states_batch,
-                    prev_actions_batch,
-                    masks_batch,
-                    actions_batch,
-                )
+                with self._autocast():
+                    (
+                        values,
+                        action_log_probs,
+                        dist_entropy,
+                        _,
+                    ) = self.actor_critic.evaluate_actions(
+                        obs_batch,
+                        recurrent_hidden_states_batch,
+                        prev_actions_batch,
+                        masks_batch,
+                        actions_batch,
+                    )
                 profiling_utils.range_pop()  # evaluate_actions (for surrogate loss)
+                if self.autocast_dtype is not None:
+                    values = values.float()
+                    action_log_probs = action_log_probs.float()
+                    dist_entropy = dist_entropy.float()
 
                 ratio = torch.exp(
                     action_log_probs - old_action_log_probs_batch
@@ -138,12 +181,19 @@ class PPO(nn.Module):
 
                 self.before_backward(total_loss)
                 profiling_utils.range_push("backward (for surrogate loss)")
-                total_loss.backward()
+                if self.grad_scaler is None:
+                    total_loss.backward()
+                else:
+                    self.grad_scaler.scale(total_loss).backward()
                 profiling_utils.range_pop()  # backward (for surrogate loss)
                 self.after_backward(total_loss)
 
                 self.before_step()
-                self.optimizer.step()
+                if self.grad_scaler is None:
+                    self.optimizer.step()
+                else:
+                    self.grad_scaler.step(self.optimizer)
+                    self.grad_scaler.update()
                 self.after_step()
 
                 value_loss_epoch += value_loss.item()
@@ -166,6 +216,8 @@ class PPO(nn.Module):
 
     def before_step(self):
         profiling_utils.range_push("before_step (for optimize)")
+        if self.grad_scaler is not None:
+            self.grad_scaler.unscale_(self.optimizer)
         nn.utils.clip_grad_norm_(
             self.actor_critic.parameters(), self.max_grad_norm
         )
@@ -4,9 +4,12 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
+import copy
 import os
 import time
 from collections import defaultdict, deque
+from queue import Queue
+from threading import Lock, Thread
 from typing import Any, Dict, List, Optional
 
 from config.config import CURRENT_POLICY
@@ -16,13 +19,22 @@ import torch
 import tqdm
 from torch.optim.lr_scheduler import LambdaLR
 
-from habitat import Config, logger
+from habitat import Config, VectorEnv, logger
 from habitat.utils.visualizations.utils import observations_to_image
 from habitat_baselines.common.base_trainer import BaseRLTrainer
 from habitat_baselines.common.baseline_registry import baseline_registry
 from habitat_baselines.common.env_utils import construct_envs
 from habitat_baselines.common.environments import get_env_class
-from habitat_baselines.common.rollout_storage import RolloutStorage
+from habitat_baselines.common.memory_utils import (
+    object_bytes,
+    rss_bytes,
+    top_allocations,
+)
+from habitat_baselines.common.rollout_storage import (
+    OBSERVATION_STORAGE_FP16,
+    OBSERVATION_STORAGE_UINT8,
+    RolloutStorage,
+)
 from habitat_baselines.common.tensorboard_utils import TensorboardWriter
 from habitat_baselines.common.utils import (
     batch_obs,
@@ -33,6 +45,7 @@ from habitat_baselines.rl.ppo import PPO
 from policies.get_policy import get_current_policy_object
 
 from habitat.utils import profiling_utils
+from habitat.utils.profile_trigger import ProfileTrigger
 
 @baseline_registry.register_trainer(name="ppo")
 class PPOTrainer(BaseRLTrainer):
@@ -51,6 +64,17 @@ class PPOTrainer(BaseRLTrainer):
 
         self._static_encoder = False
         self._encoder = None
+        self._use_inference_act = False
+        # name of the policy in policies.get_policy
+        self.policy_name = CURRENT_POLICY
+        # seconds spent in every sensor and measure of the envs and the env
+        # steps they cover, accumulated from the infos since the last update
+        self._component_times = defaultdict(float)
+        self._component_time_steps = 0
+        self._profile_trigger = None
+        # envs of the last evaluated checkpoint, kept for the next one with
+        # EVAL.REUSE_ENVS
+        self._eval_envs = None
 
     def _setup_actor_critic_agent(self, ppo_cfg: Config) -> None:
         r"""Sets up actor critic and agent for PPO.
@@ -63,7 +87,7 @@ class PPOTrainer(BaseRLTrainer):
         """
         logger.add_filehandler(self.config.LOG_FILE)
 
-        current_policy = get_current_policy_object(CURRENT_POLICY)
+        current_policy = get_current_policy_object(self.policy_name)
 
         self.actor_critic = current_policy(
             observation_space=self.envs.observation_spaces[0],
@@ -83,6 +107,110 @@ class PPOTrainer(BaseRLTrainer):
             eps=ppo_cfg.eps,
             max_grad_norm=ppo_cfg.max_grad_norm,
             use_normalized_advantage=ppo_cfg.use_normalized_advantage,
+            recurrent_chunk_length=ppo_cfg.recurrent_chunk_length,
+            autocast=ppo_cfg.autocast,
+        )
+
+    def _setup_inference_act(self, ppo_cfg: Config) -> None:
+        r"""Makes rollout collection act through Policy.act_inference if
+        RL.PPO.use_inference_act is set, with the policy net scripted or
+        compiled according to RL.PPO.inference_net.
+
+        Args:
+            ppo_cfg: config node with relevant params
+
+        Returns:
+            None
+        """
+        self._use_inference_act = ppo_cfg.use_inference_act
+        if not self._use_inference_act or ppo_cfg.inference_net == "":
+            return
+
+        if ppo_cfg.inference_net == "script":
+            prepare_net = torch.jit.script
+        elif ppo_cfg.inference_net == "compile":
+            prepare_net = getattr(torch, "compile", None)
+            if prepare_net is None:
+                logger.warning(
+                    "torch.compile is not available, acting with the eager "
+                    "policy net"
+                )
+                return
+        else:
+            raise ValueError(
+                "Unknown RL.PPO.inference_net {}".format(
+                    ppo_cfg.inference_net
+                )
+            )
+
+        try:
+            inference_net = prepare_net(self.actor_critic.net)
+        except Exception as e:
+            logger.warning(
+                "Could not {} the policy net, acting with the eager net: "
+                "{}".format(ppo_cfg.inference_net, e)
+            )
+            return
+        self.actor_critic.set_inference_net(inference_net)
+
+    def _setup_cpu_profiling(self, suffix: str = "") -> None:
+        r"""Records the profiling_utils ranges of this process on the CPU if
+        CPU_PROFILE_PATH is set, written at the end of training.
+
+        Args:
+            suffix: inserted before the extension of CPU_PROFILE_PATH, to
+                give every process its own file
+
+        Returns:
+            None
+        """
+        if self.config.CPU_PROFILE_PATH == "":
+            return
+        root, ext = os.path.splitext(self.config.CPU_PROFILE_PATH)
+        profiling_utils.enable_cpu_profiling(
+            root + suffix + (ext or ".sqlite"),
+            self.config.CPU_PROFILE_CAPACITY,
+        )
+
+    def _setup_profile_trigger(self, name: str = "trainer") -> None:
+        r"""Lets PROFILE_TRIGGER_DIR/profile.trigger or SIGUSR2 start a
+        profile of the trainer if PROFILE_TRIGGER_DIR is set, polled once
+        per update.
+
+        Args:
+            name: prefix of the profile files of this process
+
+        Returns:
+            None
+        """
+        if self.config.PROFILE_TRIGGER_DIR == "":
+            return
+        self._profile_trigger = ProfileTrigger(
+            self.config.PROFILE_TRIGGER_DIR,
+            name,
+            seconds=self.config.PROFILE_TRIGGER_SECONDS,
+            mode=self.config.PROFILE_TRIGGER_MODE,
+        )
+
+    def _act(
+        self,
+        actor_critic,
+        observations,
+        rnn_hidden_states,
+        prev_actions,
+        masks,
+        out=None,
+    ):
+        r"""Runs the policy for rollout collection, through act_inference
+        if RL.PPO.use_inference_act is set. out is only used by
+        act_inference.
+        """
+        if self._use_inference_act:
+            return actor_critic.act_inference(
+                observations, rnn_hidden_states, prev_actions, masks, out=out
+            )
+        return actor_critic.act(
+            observations, rnn_hidden_states, prev_actions, masks
         )
 
     def save_checkpoint(
@@ -120,7 +248,11 @@ class PPOTrainer(BaseRLTrainer):
         """
         return torch.load(checkpoint_path, *args, **kwargs)
 
-    METRICS_BLACKLIST = {"top_down_map", "collisions.is_collision"}
+    METRICS_BLACKLIST = {
+        "top_down_map",
+        "collisions.is_collision",
+        "component_times",
+    }
 
     @classmethod
     def _extract_scalars_from_info(
@@ -160,19 +292,178 @@ class PPOTrainer(BaseRLTrainer):
 
         return results
 
+    @staticmethod
+    def _get_observation_storage(ppo_cfg: Config) -> Dict[str, str]:
+        r"""Maps sensors to their compressed rollout storage as configured in
+        RL.PPO, sensors not listed there are stored in their native dtype.
+        """
+        observation_storage = {}
+        for sensor in ppo_cfg.fp16_observations:
+            observation_storage[sensor] = OBSERVATION_STORAGE_FP16
+        for sensor in ppo_cfg.uint8_observations:
+            observation_storage[sensor] = OBSERVATION_STORAGE_UINT8
+        return observation_storage
+
+    def _update_episode_stats(
+        self,
+        rewards,
+        dones,
+        infos,
+        current_episode_reward,
+        running_episode_stats,
+        env_slice=slice(None),
+    ):
+        r"""Accumulates the rewards and episode metrics returned by the envs
+        selected by env_slice.
+
+        Returns:
+            rewards and masks tensors of the selected envs.
+        """
+        rewards = torch.tensor(
+            rewards, dtype=torch.float, device=current_episode_reward.device
+        )
+        rewards = rewards.unsqueeze(1)
+
+        masks = torch.tensor(
+            [[0.0] if done else [1.0] for done in dones],
+            dtype=torch.float,
+            device=current_episode_reward.device,
+        )
+
+        current_episode_reward[env_slice] += rewards
+        running_episode_stats["reward"][env_slice] += (
+            1 - masks
+        ) * current_episode_reward[env_slice]
+        running_episode_stats["count"][env_slice] += 1 - masks
+        for k, v in self._extract_scalars_from_infos(infos).items():
+            v = torch.tensor(
+                v, dtype=torch.float, device=current_episode_reward.device
+            ).unsqueeze(1)
+            if k not in running_episode_stats:
+                running_episode_stats[k] = torch.zeros_like(
+                    running_episode_stats["count"]
+                )
+
+            running_episode_stats[k][env_slice] += (1 - masks) * v
+
+        current_episode_reward[env_slice] *= masks
+
+        for info in infos:
+            for k, v in info.get("component_times", {}).items():
+                self._component_times[k] += v
+        self._component_time_steps += len(infos)
+
+        return rewards, masks
+
+    def _pop_component_times(self) -> Dict[str, float]:
+        r"""Returns the mean seconds per env step spent in every sensor and
+        measure since the previous call.
+        """
+        component_times = self._component_times
+        num_steps = max(self._component_time_steps, 1)
+        self._component_times = defaultdict(float)
+        self._component_time_steps = 0
+        return {k: v / num_steps for k, v in component_times.items()}
+
+    def _log_memory_report(
+        self,
+        writer: TensorboardWriter,
+        count_steps: int,
+        rollouts: RolloutStorage,
+        include_workers: bool = True,
+    ) -> None:
+        r"""Logs the bytes held by the components of the trainer and of the
+        env workers and their RSS to the log file and to tensorboard.
+
+        Args:
+            writer: tensorboard writer object for logging to tensorboard
+            count_steps: current number of env steps
+            rollouts: rollout storage of the trainer
+            include_workers: also query the env workers, which must not be
+                stepping
+
+        Returns:
+            None
+        """
+        tracemalloc_top = self.config.MEMORY_REPORT_TRACEMALLOC_TOP
+        components = {"trainer.rollouts": object_bytes(rollouts)}
+        for name, module in self.actor_critic.named_children():
+            if name != "net":
+                components["trainer.policy." + name] = object_bytes(module)
+        for name, module in self.actor_critic.net.named_children():
+            components["trainer.policy.net." + name] = object_bytes(module)
+        components["trainer.optimizer"] = object_bytes(
+            self.agent.optimizer.state
+        )
+        if self.device.type == "cuda":
+            components["trainer.cuda_allocated"] = torch.cuda.memory_allocated(
+                self.device
+            )
+        rss = {"trainer": rss_bytes()}
+        top = {"trainer": top_allocations(tracemalloc_top)}
+
+        if include_workers:
+            reports = self.envs.call(
+                ["memory_report"] * self.envs.num_envs,
+                [dict(tracemalloc_top=tracemalloc_top)] * self.envs.num_envs,
+            )
+            for index, report in enumerate(reports):
+                for k, v in report["components"].items():
+                    components["workers." + k] = (
+                        components.get("workers." + k, 0) + v
+                    )
+                rss["worker{}".format(index)] = report["rss"]
+                top["worker{}".format(index)] = report["top_allocations"]
+
+        mb = {k: v / 2 ** 20 for k, v in components.items()}
+        writer.add_scalars("memory_mb", mb, count_steps)
+        writer.add_scalars(
+            "rss_mb",
+            {k: v / 2 ** 20 for k, v in rss.items() if v is not None},
+            count_steps,
+        )
+        logger.info(
+            "memory (MB, workers summed): {}".format(
+                "  ".join(
+                    "{}: {:.1f}".format(k, v)
+                    for k, v in sorted(mb.items(), key=lambda item: -item[1])
+                )
+            )
+        )
+        logger.info(
+            "RSS (MB): {}".format(
+                "  ".join(
+                    "{}: {:.1f}".format(k, v / 2 ** 20)
+                    for k, v in rss.items()
+                    if v is not None
+                )
+            )
+        )
+        for process, allocations in top.items():
+            for location, size in allocations:
+                logger.info(
+                    "tracemalloc {}: {:.1f} MB at {}".format(
+                        process, size / 2 ** 20, location
+                    )
+                )
+
     def _collect_rollout_step(
-        self, rollouts, current_episode_reward, running_episode_stats
+        self,
+        rollouts,
+        current_episode_reward,
+        running_episode_stats,
+        actor_critic=None,
     ):
         profiling_utils.range_push("_collect_rollout_step")
         pth_time = 0.0
         env_time = 0.0
+        if actor_critic is None:
+            actor_critic = self.actor_critic
 
         t_sample_action = time.time()
         # sample actions
         with torch.no_grad():
-            step_observation = {
-                k: v[rollouts.step] for k, v in rollouts.observations.items()
-            }
+            step_observation = rollouts.get_observations(rollouts.step)
 
             profiling_utils.range_push("act (run policy)")
             (
@@ -180,11 +471,17 @@ class PPOTrainer(BaseRLTrainer):
                 actions,
                 actions_log_probs,
                 recurrent_hidden_states,
-            ) = self.actor_critic.act(
+            ) = self._act(
+                actor_critic,
                 step_observation,
                 rollouts.recurrent_hidden_states[rollouts.step],
                 rollouts.prev_actions[rollouts.step],
                 rollouts.masks[rollouts.step],
+                out=(
+                    rollouts.value_preds[rollouts.step],
+                    rollouts.actions[rollouts.step],
+                    rollouts.action_log_probs[rollouts.step],
+                ),
             )
             profiling_utils.range_pop()  # act (run policy)
 
@@ -198,37 +495,17 @@ class PPOTrainer(BaseRLTrainer):
         env_time += time.time() - t_step_env
 
         t_update_stats = time.time()
-        batch = batch_obs(observations, device=self.device)
-        rewards = torch.tensor(
-            rewards, dtype=torch.float, device=current_episode_reward.device
-        )
-        rewards = rewards.unsqueeze(1)
-
-        masks = torch.tensor(
-            [[0.0] if done else [1.0] for done in dones],
-            dtype=torch.float,
-            device=current_episode_reward.device,
-        )
-
-        current_episode_reward += rewards
-        running_episode_stats["reward"] += (1 - masks) * current_episode_reward
-        running_episode_stats["count"] += 1 - masks
-        for k, v in self._extract_scalars_from_infos(infos).items():
-            v = torch.tensor(
-                v, dtype=torch.float, device=current_episode_reward.device
-            ).unsqueeze(1)
-            if k not in running_episode_stats:
-                running_episode_stats[k] = torch.zeros_like(
-                    running_episode_stats["count"]
-                )
-
-            running_episode_stats[k] += (1 - masks) * v
-
-        current_episode_reward *= masks
-
         if self._static_encoder:
+            batch = batch_obs(observations, device=self.device)
             with torch.no_grad():
                 batch["visual_features"] = self._encoder(batch)
+        else:
+            rollouts.insert_observations(rollouts.step + 1, observations)
+            batch = None
+
+        rewards, masks = self._update_episode_stats(
+            rewards, dones, infos, current_episode_reward, running_episode_stats
+        )
 
         rollouts.insert(
             batch,
@@ -245,13 +522,297 @@ class PPOTrainer(BaseRLTrainer):
         profiling_utils.range_pop()  # _collect_rollout_step
         return pth_time, env_time, self.envs.num_envs
 
+    def _act_and_async_step(self, rollouts, step, env_slice):
+        r"""Runs the policy on the envs selected by env_slice at step and
+        starts stepping them without waiting for the results.
+
+        Returns:
+            policy outputs of the selected envs.
+        """
+        with torch.no_grad():
+            profiling_utils.range_push("act (run policy)")
+            policy_outputs = self._act(
+                self.actor_critic,
+                rollouts.get_observations(step, env_slice),
+                rollouts.recurrent_hidden_states[step][:, env_slice],
+                rollouts.prev_actions[step, env_slice],
+                rollouts.masks[step, env_slice],
+            )
+            profiling_utils.range_pop()  # act (run policy)
+
+        actions = policy_outputs[1]
+        for offset, index_env in enumerate(
+            range(*env_slice.indices(self.envs.num_envs))
+        ):
+            self.envs.async_step_at(index_env, actions[offset][0].item())
+        return policy_outputs
+
+    def _wait_and_insert(
+        self,
+        rollouts,
+        step,
+        env_slice,
+        policy_outputs,
+        current_episode_reward,
+        running_episode_stats,
+    ):
+        r"""Waits for the envs selected by env_slice and stores the
+        transitions they took at step.
+
+        Returns:
+            time spent waiting for the envs and time spent storing the
+            transitions.
+        """
+        t_step_env = time.time()
+        outputs = [
+            self.envs.wait_step_at(index_env)
+            for index_env in range(*env_slice.indices(self.envs.num_envs))
+        ]
+        observations, rewards, dones, infos = [list(x) for x in zip(*outputs)]
+        env_time = time.time() - t_step_env
+
+        t_update_stats = time.time()
+        rollouts.insert_observations(step + 1, observations, env_slice)
+        rewards, masks = self._update_episode_stats(
+            rewards,
+            dones,
+            infos,
+            current_episode_reward,
+            running_episode_stats,
+            env_slice,
+        )
+        (
+            values,
+            actions,
+            actions_log_probs,
+            recurrent_hidden_states,
+        ) = policy_outputs
+        rollouts.insert_at(
+            step,
+            env_slice,
+            None,
+            recurrent_hidden_states,
+            actions,
+            actions_log_probs,
+            values,
+            rewards,
+            masks,
+        )
+        return env_time, time.time() - t_update_stats
+
+    def _collect_rollout_double_buffered(
+        self, rollouts, current_episode_reward, running_episode_stats
+    ):
+        r"""Collects a full rollout with the envs split into two groups that
+        are stepped in turns: the policy runs on one group while the other
+        group is simulating.
+
+        Returns:
+            pth_time, env_time, number of env steps and the inference time
+            that overlapped with simulation.
+        """
+        profiling_utils.range_push("_collect_rollout_double_buffered")
+        assert rollouts.step == 0, "rollouts must be empty"
+        num_envs = self.envs.num_envs
+        groups = [slice(0, num_envs // 2), slice(num_envs // 2, num_envs)]
+        pth_time = 0.0
+        env_time = 0.0
+        overlap_time = 0.0
+
+        t_sample_action = time.time()
+        policy_outputs = [
+            self._act_and_async_step(rollouts, 0, groups[0]),
+            None,
+        ]
+        pth_time += time.time() - t_sample_action
+
+        for step in range(rollouts.num_steps):
+            # runs while group 0 is simulating
+            t_sample_action = time.time()
+            policy_outputs[1] = self._act_and_async_step(
+                rollouts, step, groups[1]
+            )
+            delta_pth_time = time.time() - t_sample_action
+            pth_time += delta_pth_time
+            overlap_time += delta_pth_time
+
+            delta_env_time, delta_pth_time = self._wait_and_insert(
+                rollouts,
+                step,
+                groups[0],
+                policy_outputs[0],
+                current_episode_reward,
+                running_episode_stats,
+            )
+            env_time += delta_env_time
+            pth_time += delta_pth_time
+
+            if step + 1 < rollouts.num_steps:
+                # runs while group 1 is simulating
+                t_sample_action = time.time()
+                policy_outputs[0] = self._act_and_async_step(
+                    rollouts, step + 1, groups[0]
+                )
+                delta_pth_time = time.time() - t_sample_action
+                pth_time += delta_pth_time
+                overlap_time += delta_pth_time
+
+            delta_env_time, delta_pth_time = self._wait_and_insert(
+                rollouts,
+                step,
+                groups[1],
+                policy_outputs[1],
+                current_episode_reward,
+                running_episode_stats,
+            )
+            env_time += delta_env_time
+            pth_time += delta_pth_time
+
+        rollouts.step = rollouts.num_steps
+
+        profiling_utils.range_pop()  # _collect_rollout_double_buffered
+        return (
+            pth_time,
+            env_time,
+            rollouts.num_steps * num_envs,
+            overlap_time,
+        )
+
+    def _collect_rollout_first_ready(
+        self,
+        rollouts,
+        current_episode_reward,
+        running_episode_stats,
+        min_ready,
+    ):
+        r"""Collects a full rollout without stepping the envs in lockstep.
+        Every env keeps its own step index in the rollout; the policy runs on
+        the envs as soon as at least min_ready of them have returned, so a
+        slow env only delays itself until the rollout is full.
+
+        Returns:
+            pth_time, env_time and number of env steps.
+        """
+        profiling_utils.range_push("_collect_rollout_first_ready")
+        assert rollouts.step == 0, "rollouts must be empty"
+        num_envs = self.envs.num_envs
+        device = rollouts.masks.device
+        pth_time = 0.0
+        env_time = 0.0
+
+        env_steps = [0] * num_envs
+        pending_values = torch.zeros_like(rollouts.value_preds[0])
+        pending_actions = torch.zeros_like(rollouts.actions[0])
+        pending_action_log_probs = torch.zeros_like(
+            rollouts.action_log_probs[0]
+        )
+        pending_hidden_states = torch.zeros_like(
+            rollouts.recurrent_hidden_states[0]
+        )
+
+        pending = []
+        ready = list(range(num_envs))
+        while True:
+            t_sample_action = time.time()
+            active = [
+                index_env
+                for index_env in ready
+                if env_steps[index_env] < rollouts.num_steps
+            ]
+            if len(active) > 0:
+                env_indices = torch.tensor(
+                    active, dtype=torch.long, device=device
+                )
+                steps = torch.tensor(
+                    [env_steps[index_env] for index_env in active],
+                    dtype=torch.long,
+                    device=device,
+                )
+                with torch.no_grad():
+                    profiling_utils.range_push("act (run policy)")
+                    (
+                        values,
+                        actions,
+                        actions_log_probs,
+                        recurrent_hidden_states,
+                    ) = self._act(
+                        self.actor_critic,
+                        rollouts.get_observations(steps, env_indices),
+                        rollouts.get_recurrent_hidden_states(
+                            steps, env_indices
+                        ),
+                        rollouts.prev_actions[steps, env_indices],
+                        rollouts.masks[steps, env_indices],
+                    )
+                    profiling_utils.range_pop()  # act (run policy)
+
+                for offset, index_env in enumerate(active):
+                    self.envs.async_step_at(
+                        index_env, actions[offset][0].item()
+                    )
+                pending_values[env_indices] = values
+                pending_actions[env_indices] = actions
+                pending_action_log_probs[env_indices] = actions_log_probs
+                pending_hidden_states[:, env_indices] = recurrent_hidden_states
+                pending.extend(active)
+            pth_time += time.time() - t_sample_action
+
+            if len(pending) == 0:
+                break
+
+            t_step_env = time.time()
+            ready, outputs = self.envs.wait_step_ready(pending, min_ready)
+            observations, rewards, dones, infos = [
+                list(x) for x in zip(*outputs)
+            ]
+            pending = [
+                index_env for index_env in pending if index_env not in ready
+            ]
+            env_time += time.time() - t_step_env
+
+            t_update_stats = time.time()
+            env_indices = torch.tensor(ready, dtype=torch.long, device=device)
+            steps = torch.tensor(
+                [env_steps[index_env] for index_env in ready],
+                dtype=torch.long,
+                device=device,
+            )
+            rollouts.insert_observations(steps + 1, observations, env_indices)
+            # the episode stats stay on their own device, indexed writes need
+            # indices and values on the device of the written tensor
+            rewards, masks = self._update_episode_stats(
+                rewards,
+                dones,
+                infos,
+                current_episode_reward,
+                running_episode_stats,
+                env_indices.to(current_episode_reward.device),
+            )
+            rollouts.insert_at(
+                steps,
+                env_indices,
+                None,
+                pending_hidden_states[:, env_indices],
+                pending_actions[env_indices],
+                pending_action_log_probs[env_indices],
+                pending_values[env_indices],
+                rewards.to(device),
+                masks.to(device),
+            )
+            for index_env in ready:
+                env_steps[index_env] += 1
+            pth_time += time.time() - t_update_stats
+
+        rollouts.step = rollouts.num_steps
+
+        profiling_utils.range_pop()  # _collect_rollout_first_ready
+        return pth_time, env_time, rollouts.num_steps * num_envs
+
     def _update_agent(self, ppo_cfg, rollouts):
         profiling_utils.range_push("_update_agent")
         t_update_model = time.time()
         with torch.no_grad():
-            last_observation = {
-                k: v[rollouts.step] for k, v in rollouts.observations.items()
-            }
+            last_observation = rollouts.get_observations(rollouts.step)
             next_value = self.actor_critic.get_value(
                 last_observation,
                 rollouts.recurrent_hidden_states[rollouts.step],
@@ -275,12 +836,231 @@ class PPOTrainer(BaseRLTrainer):
             dist_entropy,
         )
 
+    def _start_actor(
+        self, rollouts_list, current_episode_reward, running_episode_stats
+    ):
+        r"""Starts a thread that keeps stepping the envs with a snapshot of
+        the policy while the learner updates it. The actor fills the storages
+        of rollouts_list in turns; a filled storage is handed to the learner
+        with :ref:`_wait_for_rollout` and given back with
+        :ref:`_release_rollout` once the update is done.
+        """
+        self._actor_policy = copy.deepcopy(self.actor_critic)
+        self._actor_lock = Lock()
+        self._published_state = None
+        self._policy_version = 0
+        self._free_rollouts = Queue()
+        self._full_rollouts = Queue()
+        for rollouts in rollouts_list[1:]:
+            self._free_rollouts.put(rollouts)
+
+        self._actor = Thread(
+            target=self._run_actor,
+            args=(
+                rollouts_list[0],
+                current_episode_reward,
+                running_episode_stats,
+            ),
+        )
+        self._actor.daemon = True
+        self._actor.start()
+
+    def _run_actor(
+        self, rollouts, current_episode_reward, running_episode_stats
+    ):
+        profiling_utils.range_push("_run_actor")
+        actor_version = 0
+        try:
+            while rollouts is not None:
+                with self._actor_lock:
+                    if self._policy_version != actor_version:
+                        self._actor_policy.load_state_dict(
+                            self._published_state
+                        )
+                        actor_version = self._policy_version
+
+                pth_time = 0.0
+                env_time = 0.0
+                count_steps = 0
+                for step in range(rollouts.num_steps):
+                    (
+                        delta_pth_time,
+                        delta_env_time,
+                        delta_steps,
+                    ) = self._collect_rollout_step(
+                        rollouts,
+                        current_episode_reward,
+                        running_episode_stats,
+                        actor_critic=self._actor_policy,
+                    )
+                    pth_time += delta_pth_time
+                    env_time += delta_env_time
+                    count_steps += delta_steps
+
+                # the episode stats and component times are only touched by
+                # this thread, the learner gets its own copies
+                episode_stats = {
+                    k: v.clone() for k, v in running_episode_stats.items()
+                }
+                self._full_rollouts.put(
+                    (
+                        rollouts,
+                        episode_stats,
+                        self._pop_component_times(),
+                        actor_version,
+                        pth_time,
+                        env_time,
+                        count_steps,
+                    )
+                )
+
+                next_rollouts = self._free_rollouts.get()
+                if next_rollouts is not None:
+                    next_rollouts.start_from(rollouts)
+                rollouts = next_rollouts
+        except Exception as e:
+            self._full_rollouts.put(e)
+        profiling_utils.range_pop()  # _run_actor
+
+    def _wait_for_rollout(self):
+        r"""Blocks until the actor has filled a rollout.
+
+        Returns:
+            the rollouts, a snapshot of the running episode stats, the
+            component times of the rollout, the policy lag in updates, and
+            the pth_time, env_time and number of env steps of the actor.
+        """
+        item = self._full_rollouts.get()
+        if isinstance(item, Exception):
+            raise item
+        (
+            rollouts,
+            episode_stats,
+            component_times,
+            actor_version,
+            pth_time,
+            env_time,
+            count_steps,
+        ) = item
+        policy_lag = self._policy_version - actor_version
+        return (
+            rollouts,
+            episode_stats,
+            component_times,
+            policy_lag,
+            pth_time,
+            env_time,
+            count_steps,
+        )
+
+    def _release_rollout(self, rollouts):
+        r"""Publishes the updated policy to the actor and gives the storage
+        of a rollout the learner is done with back to it.
+        """
+        state = {
+            k: v.detach().clone()
+            for k, v in self.actor_critic.state_dict().items()
+        }
+        with self._actor_lock:
+            self._published_state = state
+            self._policy_version += 1
+        self._free_rollouts.put(rollouts)
+
+    def _stop_actor(self):
+        r"""Lets the actor finish its current rollout and joins it."""
+        while not self._free_rollouts.empty():
+            self._free_rollouts.get()
+        self._free_rollouts.put(None)
+        self._actor.join()
+
+    def _evaluate_rollout(self, rollouts):
+        r"""Returns the ``(step, num_envs, 1)`` values and log probs of the
+        stored actions under the learner. Every step is evaluated: the envs
+        are split in num_mini_batch groups, as the PPO update splits them
+        without chunks, and each group is evaluated over the whole rollout
+        from the stored initial hidden state.
+        """
+        num_steps, num_envs = rollouts.step, rollouts.rewards.size(1)
+        values = torch.empty_like(rollouts.value_preds[:num_steps])
+        action_log_probs = torch.empty_like(
+            rollouts.action_log_probs[:num_steps]
+        )
+        evaluated = torch.zeros(num_envs, dtype=torch.bool)
+        num_envs_per_batch = max(1, num_envs // self.agent.num_mini_batch)
+        for start in range(0, num_envs, num_envs_per_batch):
+            env_slice = slice(start, start + num_envs_per_batch)
+            observations = {
+                sensor: observation.flatten(0, 1)
+                for sensor, observation in rollouts.get_observations(
+                    slice(0, num_steps), env_slice
+                ).items()
+            }
+            (
+                batch_values,
+                batch_action_log_probs,
+                _,
+                _,
+            ) = self.actor_critic.evaluate_actions(
+                observations,
+                rollouts.recurrent_hidden_states[0, :, env_slice],
+                rollouts.prev_actions[:num_steps, env_slice].flatten(0, 1),
+                rollouts.masks[:num_steps, env_slice].flatten(0, 1),
+                rollouts.actions[:num_steps, env_slice].flatten(0, 1),
+            )
+            values[:, env_slice] = batch_values.view(num_steps, -1, 1)
+            action_log_probs[:, env_slice] = batch_action_log_probs.view(
+                num_steps, -1, 1
+            )
+            evaluated[env_slice] = True
+
+        assert evaluated.all(), "V-trace left envs without learner values"
+        return values, action_log_probs
+
+    def _update_agent_vtrace(self, ppo_cfg, rollouts):
+        r"""Updates the agent on a rollout collected by a stale policy, with
+        V-trace targets and advantages computed under the learner.
+        """
+        profiling_utils.range_push("_update_agent_vtrace")
+        t_update_model = time.time()
+        with torch.no_grad():
+            values, action_log_probs = self._evaluate_rollout(rollouts)
+            last_observation = rollouts.get_observations(rollouts.step)
+            next_value = self.actor_critic.get_value(
+                last_observation,
+                rollouts.recurrent_hidden_states[rollouts.step],
+                rollouts.prev_actions[rollouts.step],
+                rollouts.masks[rollouts.step],
+            ).detach()
+
+        advantages = rollouts.compute_vtrace_returns(
+            values,
+            next_value,
+            action_log_probs,
+            ppo_cfg.gamma,
+            rho_clip=ppo_cfg.vtrace_rho_clip,
+            c_clip=ppo_cfg.vtrace_c_clip,
+        )
+
+        value_loss, action_loss, dist_entropy = self.agent.update(
+            rollouts, advantages
+        )
+
+        profiling_utils.range_pop()  # _update_agent_vtrace
+        return (
+            time.time() - t_update_model,
+            value_loss,
+            action_loss,
+            dist_entropy,
+        )
+
     def train(self) -> None:
         r"""Main method for training PPO.
 
         Returns:
             None
         """
+        self._setup_cpu_profiling()
+        self._setup_profile_trigger()
         profiling_utils.range_push("train")
 
         self.envs = construct_envs(
@@ -296,6 +1076,7 @@ class PPOTrainer(BaseRLTrainer):
         if not os.path.isdir(self.config.CHECKPOINT_FOLDER):
             os.makedirs(self.config.CHECKPOINT_FOLDER)
         self._setup_actor_critic_agent(ppo_cfg)
+        self._setup_inference_act(ppo_cfg)
         logger.info(
             "agent number of parameters: {}".format(
                 sum(param.numel() for param in self.agent.parameters())
@@ -308,19 +1089,14 @@ class PPOTrainer(BaseRLTrainer):
             self.envs.observation_spaces[0],
             self.envs.action_spaces[0],
             ppo_cfg.hidden_size,
+            observation_storage=self._get_observation_storage(ppo_cfg),
         )
         rollouts.to(self.device)
+        if ppo_cfg.use_incremental_returns and ppo_cfg.use_gae:
+            rollouts.enable_incremental_returns(ppo_cfg.gamma, ppo_cfg.tau)
 
         observations = self.envs.reset()
-        batch = batch_obs(observations, device=self.device)
-
-        for sensor in rollouts.observations:
-            rollouts.observations[sensor][0].copy_(batch[sensor])
-
-        # batch and observations may contain shared PyTorch CUDA
-        # tensors.  We must explicitly clear them here otherwise
-        # they will be kept in memory for the entire duration of training!
-        batch = None
+        rollouts.insert_observations(0, observations)
         observations = None
 
         current_episode_reward = torch.zeros(self.envs.num_envs, 1)
@@ -331,10 +1107,31 @@ class PPOTrainer(BaseRLTrainer):
         window_episode_stats = defaultdict(
             lambda: deque(maxlen=ppo_cfg.reward_window_size)
         )
+        window_component_times = defaultdict(
+            lambda: deque(maxlen=ppo_cfg.reward_window_size)
+        )
+
+        if ppo_cfg.use_decoupled_actor:
+            next_rollouts = RolloutStorage(
+                ppo_cfg.num_steps,
+                self.envs.num_envs,
+                self.envs.observation_spaces[0],
+                self.envs.action_spaces[0],
+                ppo_cfg.hidden_size,
+                observation_storage=self._get_observation_storage(ppo_cfg),
+            )
+            next_rollouts.to(self.device)
+            self._start_actor(
+                [rollouts, next_rollouts],
+                current_episode_reward,
+                running_episode_stats,
+            )
 
         t_start = time.time()
         env_time = 0
         pth_time = 0
+        overlap_time = 0
+        policy_lag = 0
         count_steps = 0
         count_checkpoints = 0
 
@@ -348,6 +1145,19 @@ class PPOTrainer(BaseRLTrainer):
         ) as writer:
             for update in range(self.config.NUM_UPDATES):
                 profiling_utils.range_push("train loop body")
+                if self._profile_trigger is not None:
+                    self._profile_trigger.poll()
+                if (
+                    self.config.MEMORY_REPORT_INTERVAL > 0
+                    and update % self.config.MEMORY_REPORT_INTERVAL == 0
+                ):
+                    self._log_memory_report(
+                        writer,
+                        count_steps,
+                        rollouts,
+                        include_workers=not ppo_cfg.use_decoupled_actor,
+                    )
+
                 if ppo_cfg.use_linear_lr_decay:
                     lr_scheduler.step()
 
@@ -356,29 +1166,99 @@ class PPOTrainer(BaseRLTrainer):
                         update, self.config.NUM_UPDATES
                     )
 
-                for step in range(ppo_cfg.num_steps):
+                episode_stats = running_episode_stats
+                if ppo_cfg.use_decoupled_actor:
                     (
+                        rollouts,
+                        episode_stats,
+                        component_times,
+                        policy_lag,
                         delta_pth_time,
                         delta_env_time,
                         delta_steps,
-                    ) = self._collect_rollout_step(
+                    ) = self._wait_for_rollout()
+                    pth_time += delta_pth_time
+                    env_time += delta_env_time
+                    count_steps += delta_steps
+                elif (
+                    ppo_cfg.use_double_buffered_sampler
+                    and self.envs.num_envs > 1
+                    and not self._static_encoder
+                ):
+                    (
+                        delta_pth_time,
+                        delta_env_time,
+                        delta_steps,
+                        delta_overlap_time,
+                    ) = self._collect_rollout_double_buffered(
                         rollouts, current_episode_reward, running_episode_stats
                     )
                     pth_time += delta_pth_time
                     env_time += delta_env_time
                     count_steps += delta_steps
+                    overlap_time += delta_overlap_time
+                elif (
+                    ppo_cfg.use_first_ready_sampler
+                    and not self._static_encoder
+                ):
+                    (
+                        delta_pth_time,
+                        delta_env_time,
+                        delta_steps,
+                    ) = self._collect_rollout_first_ready(
+                        rollouts,
+                        current_episode_reward,
+                        running_episode_stats,
+                        max(
+                            1,
+                            int(
+                                ppo_cfg.first_ready_fraction
+                                * self.envs.num_envs
+                            ),
+                        ),
+                    )
+                    pth_time += delta_pth_time
+                    env_time += delta_env_time
+                    count_steps += delta_steps
+                else:
+                    for step in range(ppo_cfg.num_steps):
+                        (
+                            delta_pth_time,
+                            delta_env_time,
+                            delta_steps,
+                        ) = self._collect_rollout_step(
+                            rollouts,
+                            current_episode_reward,
+                            running_episode_stats,
+                        )
+                        pth_time += delta_pth_time
+                        env_time += delta_env_time
+                        count_steps += delta_steps
 
-                (
-                    delta_pth_time,
-                    value_loss,
-                    action_loss,
-                    dist_entropy,
-                ) = self._update_agent(ppo_cfg, rollouts)
+                if ppo_cfg.use_decoupled_actor:
+                    (
+                        delta_pth_time,
+                        value_loss,
+                        action_loss,
+                        dist_entropy,
+                    ) = self._update_agent_vtrace(ppo_cfg, rollouts)
+                    self._release_rollout(rollouts)
+                else:
+                    (
+                        delta_pth_time,
+                        value_loss,
+                        action_loss,
+                        dist_entropy,
+                    ) = self._update_agent(ppo_cfg, rollouts)
                 pth_time += delta_pth_time
-                
 
-                for k, v in running_episode_stats.items():
+
+                for k, v in episode_stats.items():
                     window_episode_stats[k].append(v.clone())
+                if not ppo_cfg.use_decoupled_actor:
+                    component_times = self._pop_component_times()
+                for k, v in component_times.items():
+                    window_component_times[k].append(v)
 
                 deltas = {
                     k: (
@@ -428,6 +1308,21 @@ class PPOTrainer(BaseRLTrainer):
                         )
                     )
 
+                    if ppo_cfg.use_decoupled_actor:
+                        logger.info(
+                            "update: {}\tactor policy lag: {} updates".format(
+                                update, policy_lag
+                            )
+                        )
+
+                    if overlap_time > 0:
+                        logger.info(
+                            "update: {}\toverlapped pth-time: {:.3f}s "
+                            "({:.1%} of pth-time)".format(
+                                update, overlap_time, overlap_time / pth_time
+                            )
+                        )
+
                     logger.info(
                         "Average window size: {}  {}".format(
                             len(window_episode_stats["count"]),
@@ -439,6 +1334,27 @@ class PPOTrainer(BaseRLTrainer):
                         )
                     )
 
+                    if len(window_component_times) > 0:
+                        component_ms = {
+                            k: 1000 * np.mean(v)
+                            for k, v in window_component_times.items()
+                        }
+                        writer.add_scalars(
+                            "component_ms_per_step", component_ms, count_steps
+                        )
+                        logger.info(
+                            "update: {}\tms per env step: {}".format(
+                                update,
+                                "  ".join(
+                                    "{}: {:.3f}".format(k, v)
+                                    for k, v in sorted(
+                                        component_ms.items(),
+                                        key=lambda item: -item[1],
+                                    )
+                                ),
+                            )
+                        )
+
                 # checkpoint model
                 if update % self.config.CHECKPOINT_INTERVAL == 0:
                     self.save_checkpoint(
@@ -446,9 +1362,48 @@ class PPOTrainer(BaseRLTrainer):
                     )
                     count_checkpoints += 1
                 profiling_utils.range_pop()  # train loop body
+            if ppo_cfg.use_decoupled_actor:
+                self._stop_actor()
             self.envs.close()
+            if self._profile_trigger is not None:
+                self._profile_trigger.stop()
 
         profiling_utils.range_pop()  # train
+        profiling_utils.flush_cpu_profile()
+
+    def eval(self) -> None:
+        try:
+            super().eval()
+        finally:
+            self._close_eval_envs()
+
+    def _construct_eval_envs(self, config: Config) -> VectorEnv:
+        r"""Returns the envs to evaluate a checkpoint with config: the
+        workers of the previous checkpoint retargeted to config with
+        EVAL.REUSE_ENVS, which skips starting processes and simulators, or
+        new ones.
+
+        Args:
+            config: eval config of the checkpoint
+
+        Returns:
+            VectorEnv of the checkpoint
+        """
+        envs, self._eval_envs = self._eval_envs, None
+        if envs is not None and (
+            not config.EVAL.REUSE_ENVS
+            or envs.num_envs != config.NUM_PROCESSES
+        ):
+            envs.close()
+            envs = None
+        return construct_envs(
+            config, get_env_class(config.ENV_NAME), envs=envs
+        )
+
+    def _close_eval_envs(self) -> None:
+        if self._eval_envs is not None:
+            self._eval_envs.close()
+            self._eval_envs = None
 
     def _eval_checkpoint(
         self,
@@ -490,7 +1445,7 @@ class PPOTrainer(BaseRLTrainer):
             config.freeze()
 
         logger.info(f"env config: {config}")
-        self.envs = construct_envs(config, get_env_class(config.ENV_NAME))
+        self.envs = self._construct_eval_envs(config)
         self._setup_actor_critic_agent(ppo_cfg)
 
         self.agent.load_state_dict(ckpt_dict["state_dict"])
@@ -666,4 +1621,8 @@ class PPOTrainer(BaseRLTrainer):
         if len(metrics) > 0:
             writer.add_scalars("eval_metrics", metrics, step_id)
 
-        self.envs.close()
+        if config.EVAL.REUSE_ENVS:
+            self.envs.resume_all()
+            self._eval_envs = self.envs
+        else:
+            self.envs.close()
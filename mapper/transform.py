@@ -19,9 +19,8 @@ Processing graph:
 # from torchvision import datasets, transforms
 import torch
 import torch.nn.functional as F
-from matplotlib.transforms import Affine2D
 
-from config.config import MAP_SIZE, MAP_DIMENSIONS, device
+from config.config import MAP_SIZE, MAP_DIMENSIONS
 
 
 def egomotion_transform(input_map_tensor, dX):
@@ -51,6 +50,8 @@ def tensor_transform(input_map_tensor, transform):
     Returns: concatenated image tensor to pass into FCN  (batch_size, 8*len(representation_names), 16, 16)
 
     """
+    from matplotlib.transforms import Affine2D
+
     # Construct a 2d rotation and transformation matrix (using scipy functions)
     width, height = MAP_DIMENSIONS[2], MAP_DIMENSIONS[1]
 
@@ -58,7 +59,7 @@ def tensor_transform(input_map_tensor, transform):
     for t in transform:
         t = t[0] # reduce dimension of transform to get actual transform values
         T.append(torch.tensor((Affine2D().rotate_around(width // 2, height // 2, t[2]) + Affine2D().translate(
-            tx=t[0], ty=t[1])).get_matrix()[0:2, :], dtype=torch.float, device=device))
+            tx=t[0], ty=t[1])).get_matrix()[0:2, :], dtype=torch.float, device=input_map_tensor.device))
     T = torch.stack(T)
 
     # unsqueezed_tensor = torch.unsqueeze(input_map_tensor,0)
@@ -11,7 +11,7 @@ networks/update.py
 
 import torch
 
-from config.config import BATCHSIZE, MAP_DIMENSIONS, device
+from config.config import BATCHSIZE, MAP_DIMENSIONS
 
 
 def update_map(update_matrix, previous_map, eps=1e-6):
@@ -46,3 +46,68 @@ class MapPlanner(nn.Module):
     def forward(self, new_map):
         """ Returns encoding for new map """
         return self.cnn(new_map)
+
+
+class CompactMapPlanner(nn.Module):
+    r"""Drop-in replacement of MapPlanner that downsamples the map with
+    strided convolutions and pools it to a 4x4 grid before the linear layer,
+    which keeps the coarse layout of the map with ~0.6M instead of ~59M
+    parameters.
+    """
+
+    def __init__(self, output_size):
+        super().__init__()
+
+        self.output_size = output_size
+
+        self.cnn = nn.Sequential(
+            nn.Conv2d(
+                in_channels=MAP_DIMENSIONS[0],
+                out_channels=16,
+                kernel_size=(5, 5),
+                stride=(2, 2),
+                padding=(2, 2),
+            ),
+            nn.ReLU(True),
+            nn.Conv2d(
+                in_channels=16,
+                out_channels=32,
+                kernel_size=(3, 3),
+                stride=(2, 2),
+                padding=(1, 1),
+            ),
+            nn.ReLU(True),
+            nn.Conv2d(
+                in_channels=32,
+                out_channels=64,
+                kernel_size=(3, 3),
+                stride=(2, 2),
+                padding=(1, 1),
+            ),
+            nn.ReLU(True),
+            nn.Conv2d(
+                in_channels=64,
+                out_channels=64,
+                kernel_size=(3, 3),
+                stride=(2, 2),
+                padding=(1, 1),
+            ),
+            nn.ReLU(True),
+            nn.AdaptiveAvgPool2d((4, 4)),
+            Flatten(),
+            nn.Linear(64 * 4 * 4, self.output_size),
+            nn.Tanh(),
+        )
+
+    def forward(self, new_map):
+        """ Returns encoding for new map """
+        return self.cnn(new_map)
+
+
+def get_map_planner_object(map_planner_name):
+    map_planner_objects = dict(
+        MapPlanner=MapPlanner,
+        CompactMapPlanner=CompactMapPlanner,
+    )
+
+    return map_planner_objects[map_planner_name]
@@ -12,7 +12,7 @@ policies/midlevel_map.py
 import torch
 
 from config.config import RESIDUAL_LAYERS_PER_BLOCK, RESIDUAL_NEURON_CHANNEL, RESIDUAL_SIZE, \
-    STRIDES, MAP_DIMENSIONS, DEBUG, BATCHSIZE, device
+    STRIDES, MAP_DIMENSIONS, DEBUG, BATCHSIZE, device, MAP_PLANNER
 from habitat.tasks.nav.nav import (
     IntegratedPointGoalGPSAndCompassSensor,
 )
@@ -23,7 +23,7 @@ from mapper.mid_level.decoder import UpResNet
 from mapper.mid_level.fc import FC
 from mapper.transform import egomotion_transform
 from mapper.update import update_map
-from planner.drrn_cnn import MapPlanner
+from planner.drrn_cnn import get_map_planner_object
 
 
 class PointNavDRRNPolicy(Policy):
@@ -49,7 +49,7 @@ class PointNavDRRNNet(Net):
 
         self._hidden_size = hidden_size
 
-        self.visual_encoder = MapPlanner(output_size=self._hidden_size)
+        self.visual_encoder = get_map_planner_object(MAP_PLANNER)(output_size=self._hidden_size)
 
         self.state_encoder = RNNStateEncoder(
             (0 if self.is_blind else self._hidden_size) + self._n_input_goal,